@@ -2,17 +2,21 @@ import json
 import logging
 import os
 import shutil
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Generic, Optional, TypeVar
 from urllib.parse import urlparse
 
 import chromadb
+import redis
 import requests
 from pydantic import BaseModel
 from sqlalchemy import JSON, Column, DateTime, Integer, func
 
 from open_webui.env import (
+    CONFIG_POLL_INTERVAL,
     DATA_DIR,
     DATABASE_URL,
     ENV,
@@ -22,6 +26,8 @@ from open_webui.env import (
     WEBUI_AUTH,
     WEBUI_FAVICON_URL,
     WEBUI_NAME,
+    WEBSOCKET_MANAGER,
+    WEBSOCKET_REDIS_URL,
     log,
 )
 from open_webui.internal.db import Base, get_db
@@ -76,17 +82,51 @@ def load_json_config():
         return json.load(file)
 
 
-def save_to_db(data):
+def save_to_db(data) -> int:
     with get_db() as db:
-        existing_config = db.query(Config).first()
+        existing_config = db.query(Config).order_by(Config.id.desc()).first()
         if not existing_config:
-            new_config = Config(data=data, version=0)
-            db.add(new_config)
+            existing_config = Config(data=data, version=1)
         else:
             existing_config.data = data
+            existing_config.version = Config.version + 1
             existing_config.updated_at = datetime.now()
-            db.add(existing_config)
+        db.add(existing_config)
         db.commit()
+        return existing_config.version
+
+
+def save_value_to_db(config_path: str, value, default_data: dict) -> tuple[dict, int]:
+    """
+    Set a single key in the latest config in the database, keeping the keys
+    other workers may have saved since this one loaded it.
+    """
+    with get_db() as db:
+        existing_config = (
+            db.query(Config).order_by(Config.id.desc()).with_for_update().first()
+        )
+        # A copy, the loaded config is shared and must not change under readers
+        data = json.loads(
+            json.dumps(existing_config.data if existing_config else default_data)
+        )
+
+        sub_config = data
+        path_parts = config_path.split(".")
+        for key in path_parts[:-1]:
+            if not isinstance(sub_config.get(key), dict):
+                sub_config[key] = {}
+            sub_config = sub_config[key]
+        sub_config[path_parts[-1]] = value
+
+        if not existing_config:
+            existing_config = Config(data=data, version=1)
+        else:
+            existing_config.data = data
+            existing_config.version = Config.version + 1
+            existing_config.updated_at = datetime.now()
+        db.add(existing_config)
+        db.commit()
+        return data, existing_config.version
 
 
 def reset_config():
@@ -160,7 +200,23 @@ def get_config():
         return config_entry.data if config_entry else DEFAULT_CONFIG
 
 
-CONFIG_DATA = get_config()
+def get_config_version() -> int:
+    with get_db() as db:
+        config_entry = db.query(Config.version).order_by(Config.id.desc()).first()
+        return config_entry.version if config_entry else 0
+
+
+def load_config() -> tuple[dict, int]:
+    with get_db() as db:
+        config_entry = db.query(Config).order_by(Config.id.desc()).first()
+        if config_entry:
+            return config_entry.data, config_entry.version
+        return DEFAULT_CONFIG, 0
+
+
+# Replaced as a whole on every change, never modified in place
+CONFIG_DATA, CONFIG_VERSION = load_config()
+CONFIG_LOCK = threading.Lock()
 
 
 def get_config_value(config_path: str):
@@ -178,21 +234,108 @@ PERSISTENT_CONFIG_REGISTRY = []
 
 
 def save_config(config):
-    global CONFIG_DATA
-    global PERSISTENT_CONFIG_REGISTRY
     try:
-        save_to_db(config)
-        CONFIG_DATA = config
-
-        # Trigger updates on all registered PersistentConfig entries
-        for config_item in PERSISTENT_CONFIG_REGISTRY:
-            config_item.update()
+        version = save_to_db(config)
+        apply_config(config, version)
+        config_watcher.publish(version)
     except Exception as e:
         log.exception(e)
         return False
     return True
 
 
+def apply_config(data: dict, version: int):
+    global CONFIG_DATA, CONFIG_VERSION
+    with CONFIG_LOCK:
+        CONFIG_DATA, CONFIG_VERSION = data, version
+
+        # Trigger updates on all registered PersistentConfig entries
+        for config_item in PERSISTENT_CONFIG_REGISTRY:
+            config_item.update()
+
+
+def reload_config():
+    data, version = load_config()
+    if version != CONFIG_VERSION:
+        apply_config(data, version)
+        log.info(f"Reloaded the config saved by another worker (version {version})")
+
+
+class ConfigWatcher:
+    """
+    Reloads the config when another worker saves it.
+
+    Workers publish the new version through Redis when the websocket manager
+    uses it. The version in the database is also polled every `interval`
+    seconds, for deployments without Redis and in case a message is missed.
+    """
+
+    def __init__(self, interval: float, redis_url: Optional[str] = None):
+        self.interval = interval
+        self.redis = redis.Redis.from_url(redis_url) if redis_url else None
+        self.channel = "open-webui:config"
+
+        self.stopped = threading.Event()
+        self.thread = None
+        self.pubsub_thread = None
+
+    def publish(self, version: int):
+        if self.redis:
+            try:
+                self.redis.publish(self.channel, version)
+            except Exception as e:
+                log.warning(f"Failed to publish the config version: {e}")
+
+    def start(self):
+        if self.thread is not None:
+            return
+
+        self.stopped.clear()
+        if self.interval > 0:
+            self.thread = threading.Thread(target=self.poll, daemon=True)
+            self.thread.start()
+
+        if self.redis:
+
+            def on_message(message):
+                if int(message["data"]) != CONFIG_VERSION:
+                    reload_config()
+
+            def on_error(e, pubsub, thread):
+                log.warning(f"Config change notifications failed: {e}")
+                time.sleep(1)
+
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{self.channel: on_message})
+                self.pubsub_thread = pubsub.run_in_thread(
+                    sleep_time=1, daemon=True, exception_handler=on_error
+                )
+            except Exception as e:
+                log.warning(f"Failed to subscribe to config changes: {e}")
+
+    def stop(self):
+        self.stopped.set()
+        self.thread = None
+        if self.pubsub_thread is not None:
+            self.pubsub_thread.stop()
+            self.pubsub_thread = None
+
+    def poll(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                if get_config_version() != CONFIG_VERSION:
+                    reload_config()
+            except Exception as e:
+                log.warning(f"Failed to check the config version: {e}")
+
+
+config_watcher = ConfigWatcher(
+    CONFIG_POLL_INTERVAL,
+    redis_url=WEBSOCKET_REDIS_URL if WEBSOCKET_MANAGER == "redis" else None,
+)
+
+
 T = TypeVar("T")
 
 
@@ -228,21 +371,18 @@ class PersistentConfig(Generic[T]):
 
     def update(self):
         new_value = get_config_value(self.config_path)
-        if new_value is not None:
+        if new_value is not None and new_value != self.value:
             self.value = new_value
+            self.config_value = new_value
             log.info(f"Updated {self.env_name} to new value {self.value}")
 
     def save(self):
         log.info(f"Saving '{self.env_name}' to the database")
-        path_parts = self.config_path.split(".")
-        sub_config = CONFIG_DATA
-        for key in path_parts[:-1]:
-            if key not in sub_config:
-                sub_config[key] = {}
-            sub_config = sub_config[key]
-        sub_config[path_parts[-1]] = self.value
-        save_to_db(CONFIG_DATA)
+        # Only this key, on top of what other workers saved in the meantime
+        data, version = save_value_to_db(self.config_path, self.value, CONFIG_DATA)
         self.config_value = self.value
+        apply_config(data, version)
+        config_watcher.publish(version)
 
 
 class AppConfig:
@@ -1394,6 +1534,12 @@ PGVECTOR_INITIALIZE_MAX_VECTOR_LENGTH = int(
     os.environ.get("PGVECTOR_INITIALIZE_MAX_VECTOR_LENGTH", "1536")
 )
 
+# BM25 index for hybrid search, persisted next to the vector store
+ENABLE_RAG_BM25_INDEX = (
+    os.environ.get("ENABLE_RAG_BM25_INDEX", "True").lower() == "true"
+)
+BM25_INDEX_DIR = os.environ.get("BM25_INDEX_DIR", f"{DATA_DIR}/vector_db/bm25")
+
 ####################################
 # Information Retrieval (RAG)
 ####################################
@@ -1446,6 +1592,9 @@ ENABLE_RAG_HYBRID_SEARCH = PersistentConfig(
     os.environ.get("ENABLE_RAG_HYBRID_SEARCH", "").lower() == "true",
 )
 
+# Max number of vector DB searches run concurrently for one retrieval
+RAG_QUERY_CONCURRENCY = int(os.environ.get("RAG_QUERY_CONCURRENCY", "8"))
+
 RAG_FILE_MAX_COUNT = PersistentConfig(
     "RAG_FILE_MAX_COUNT",
     "rag.file.max_count",
@@ -1509,6 +1658,24 @@ RAG_EMBEDDING_BATCH_SIZE = PersistentConfig(
     ),
 )
 
+ENABLE_RAG_EMBEDDING_CACHE = (
+    os.environ.get("ENABLE_RAG_EMBEDDING_CACHE", "True").lower() == "true"
+)
+RAG_EMBEDDING_CACHE_SIZE = int(os.environ.get("RAG_EMBEDDING_CACHE_SIZE", "10000"))
+# Memory the cached vectors may take, in bytes (float32, per worker)
+RAG_EMBEDDING_CACHE_MAX_SIZE = (
+    int(os.environ.get("RAG_EMBEDDING_CACHE_MAX_SIZE_MB", "128")) * 1024 * 1024
+)
+ENABLE_RAG_EMBEDDING_CACHE_DISK = (
+    os.environ.get("ENABLE_RAG_EMBEDDING_CACHE_DISK", "False").lower() == "true"
+)
+RAG_EMBEDDING_CACHE_DISK_MAX_ENTRIES = int(
+    os.environ.get("RAG_EMBEDDING_CACHE_DISK_MAX_ENTRIES", "200000")
+)
+RAG_EMBEDDING_CACHE_DIR = os.environ.get(
+    "RAG_EMBEDDING_CACHE_DIR", f"{CACHE_DIR}/embeddings"
+)
+
 RAG_RERANKING_MODEL = PersistentConfig(
     "RAG_RERANKING_MODEL",
     "rag.reranking_model",
@@ -1526,6 +1693,26 @@ RAG_RERANKING_MODEL_TRUST_REMOTE_CODE = (
     os.environ.get("RAG_RERANKING_MODEL_TRUST_REMOTE_CODE", "True").lower() == "true"
 )
 
+# Reranking requests made within RAG_RERANKING_MAX_WAIT ms of each other are
+# scored together, up to RAG_RERANKING_BATCH_SIZE pairs
+try:
+    RAG_RERANKING_BATCH_SIZE = int(os.environ.get("RAG_RERANKING_BATCH_SIZE", "32"))
+except ValueError:
+    RAG_RERANKING_BATCH_SIZE = 32
+
+try:
+    RAG_RERANKING_MAX_WAIT = (
+        float(os.environ.get("RAG_RERANKING_MAX_WAIT", "10")) / 1000
+    )
+except ValueError:
+    RAG_RERANKING_MAX_WAIT = 0.01
+
+# Chunks whose ColBERT token embeddings are kept in memory
+try:
+    RAG_RERANKING_CACHE_SIZE = int(os.environ.get("RAG_RERANKING_CACHE_SIZE", "2000"))
+except ValueError:
+    RAG_RERANKING_CACHE_SIZE = 2000
+
 
 RAG_TEXT_SPLITTER = PersistentConfig(
     "RAG_TEXT_SPLITTER",
@@ -1770,6 +1957,43 @@ RAG_WEB_SEARCH_CONCURRENT_REQUESTS = PersistentConfig(
     int(os.getenv("RAG_WEB_SEARCH_CONCURRENT_REQUESTS", "10")),
 )
 
+# Sites that haven't loaded this many seconds into a web search are dropped
+try:
+    RAG_WEB_SEARCH_TIMEOUT = float(os.environ.get("RAG_WEB_SEARCH_TIMEOUT", "15"))
+except ValueError:
+    RAG_WEB_SEARCH_TIMEOUT = 15.0
+
+# Pages loaded from one site at the same time, across all web searches
+try:
+    RAG_WEB_LOADER_PER_HOST_LIMIT = int(
+        os.environ.get("RAG_WEB_LOADER_PER_HOST_LIMIT", "2")
+    )
+except ValueError:
+    RAG_WEB_LOADER_PER_HOST_LIMIT = 2
+
+# Search results and the collections built from them are reused for
+# RAG_WEB_SEARCH_CACHE_TTL seconds, pages for RAG_WEB_PAGE_CACHE_TTL seconds
+# before they are revalidated with their ETag / Last-Modified
+ENABLE_RAG_WEB_SEARCH_CACHE = (
+    os.environ.get("ENABLE_RAG_WEB_SEARCH_CACHE", "True").lower() == "true"
+)
+try:
+    RAG_WEB_SEARCH_CACHE_TTL = int(os.environ.get("RAG_WEB_SEARCH_CACHE_TTL", "3600"))
+except ValueError:
+    RAG_WEB_SEARCH_CACHE_TTL = 3600
+try:
+    RAG_WEB_SEARCH_CACHE_SIZE = int(os.environ.get("RAG_WEB_SEARCH_CACHE_SIZE", "1000"))
+except ValueError:
+    RAG_WEB_SEARCH_CACHE_SIZE = 1000
+try:
+    RAG_WEB_PAGE_CACHE_TTL = int(os.environ.get("RAG_WEB_PAGE_CACHE_TTL", "3600"))
+except ValueError:
+    RAG_WEB_PAGE_CACHE_TTL = 3600
+try:
+    RAG_WEB_PAGE_CACHE_SIZE = int(os.environ.get("RAG_WEB_PAGE_CACHE_SIZE", "500"))
+except ValueError:
+    RAG_WEB_PAGE_CACHE_SIZE = 500
+
 
 ####################################
 # Images
@@ -2012,6 +2236,43 @@ WHISPER_MODEL_AUTO_UPDATE = (
     and os.environ.get("WHISPER_MODEL_AUTO_UPDATE", "").lower() == "true"
 )
 
+# Transcriptions run in parallel on this many replicas of the model,
+# splitting the CPU cores between them
+try:
+    WHISPER_WORKERS = int(os.environ.get("WHISPER_WORKERS", ""))
+except ValueError:
+    WHISPER_WORKERS = max(1, (os.cpu_count() or 1) // 4)
+
+# Long recordings are split at pauses into chunks of up to this many seconds
+try:
+    WHISPER_CHUNK_LENGTH = int(os.environ.get("WHISPER_CHUNK_LENGTH", "30"))
+except ValueError:
+    WHISPER_CHUNK_LENGTH = 30
+
+# Synthesized speech is evicted, least recently used first, beyond this size
+# and when it hasn't been used for this long
+try:
+    AUDIO_SPEECH_CACHE_MAX_SIZE = (
+        int(os.environ.get("AUDIO_SPEECH_CACHE_MAX_SIZE_MB", "1024")) * 1024 * 1024
+    )
+except ValueError:
+    AUDIO_SPEECH_CACHE_MAX_SIZE = 1024 * 1024 * 1024
+
+try:
+    AUDIO_SPEECH_CACHE_MAX_AGE = (
+        int(os.environ.get("AUDIO_SPEECH_CACHE_MAX_AGE_DAYS", "30")) * 24 * 60 * 60
+    )
+except ValueError:
+    AUDIO_SPEECH_CACHE_MAX_AGE = 30 * 24 * 60 * 60
+
+# Sentences of a streamed response synthesized at the same time
+try:
+    AUDIO_TTS_STREAM_CONCURRENCY = int(
+        os.environ.get("AUDIO_TTS_STREAM_CONCURRENCY", "3")
+    )
+except ValueError:
+    AUDIO_TTS_STREAM_CONCURRENCY = 3
+
 
 AUDIO_STT_OPENAI_API_BASE_URL = PersistentConfig(
     "AUDIO_STT_OPENAI_API_BASE_URL",
@@ -325,6 +325,24 @@ ENABLE_REALTIME_CHAT_SAVE = (
     os.environ.get("ENABLE_REALTIME_CHAT_SAVE", "False").lower() == "true"
 )
 
+# Streamed message content is buffered and written at most once per interval
+# (seconds) or once this many characters are pending, and always on completion
+REALTIME_CHAT_SAVE_INTERVAL = os.environ.get("REALTIME_CHAT_SAVE_INTERVAL", "1")
+
+try:
+    REALTIME_CHAT_SAVE_INTERVAL = float(REALTIME_CHAT_SAVE_INTERVAL)
+except Exception:
+    REALTIME_CHAT_SAVE_INTERVAL = 1.0
+
+REALTIME_CHAT_SAVE_MAX_PENDING = os.environ.get(
+    "REALTIME_CHAT_SAVE_MAX_PENDING", "4096"
+)
+
+try:
+    REALTIME_CHAT_SAVE_MAX_PENDING = int(REALTIME_CHAT_SAVE_MAX_PENDING)
+except Exception:
+    REALTIME_CHAT_SAVE_MAX_PENDING = 4096
+
 ####################################
 # REDIS
 ####################################
@@ -385,6 +403,22 @@ WEBSOCKET_MANAGER = os.environ.get("WEBSOCKET_MANAGER", "")
 
 WEBSOCKET_REDIS_URL = os.environ.get("WEBSOCKET_REDIS_URL", REDIS_URL)
 
+# Streamed chat:completion deltas are batched into one socket emit per interval
+# (seconds) or once this many characters are pending. 0 emits every delta.
+WEBSOCKET_EMIT_INTERVAL = os.environ.get("WEBSOCKET_EMIT_INTERVAL", "0.04")
+
+try:
+    WEBSOCKET_EMIT_INTERVAL = float(WEBSOCKET_EMIT_INTERVAL)
+except Exception:
+    WEBSOCKET_EMIT_INTERVAL = 0.04
+
+WEBSOCKET_EMIT_MAX_SIZE = os.environ.get("WEBSOCKET_EMIT_MAX_SIZE", "4096")
+
+try:
+    WEBSOCKET_EMIT_MAX_SIZE = int(WEBSOCKET_EMIT_MAX_SIZE)
+except Exception:
+    WEBSOCKET_EMIT_MAX_SIZE = 4096
+
 AIOHTTP_CLIENT_TIMEOUT = os.environ.get("AIOHTTP_CLIENT_TIMEOUT", "")
 
 if AIOHTTP_CLIENT_TIMEOUT == "":
@@ -409,6 +443,142 @@ else:
     except Exception:
         AIOHTTP_CLIENT_TIMEOUT_OPENAI_MODEL_LIST = 5
 
+# Upstream connections are pooled per scheme://host:port
+AIOHTTP_CLIENT_POOL_LIMIT = os.environ.get("AIOHTTP_CLIENT_POOL_LIMIT", "100")
+
+try:
+    AIOHTTP_CLIENT_POOL_LIMIT = int(AIOHTTP_CLIENT_POOL_LIMIT)
+except Exception:
+    AIOHTTP_CLIENT_POOL_LIMIT = 100
+
+AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT = os.environ.get(
+    "AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT", "60"
+)
+
+try:
+    AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT = float(AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT)
+except Exception:
+    AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT = 60.0
+
+AIOHTTP_CLIENT_DNS_CACHE_TTL = os.environ.get("AIOHTTP_CLIENT_DNS_CACHE_TTL", "300")
+
+try:
+    AIOHTTP_CLIENT_DNS_CACHE_TTL = int(AIOHTTP_CLIENT_DNS_CACHE_TTL)
+except Exception:
+    AIOHTTP_CLIENT_DNS_CACHE_TTL = 300
+
+# Upstreams with an open session, the least recently used are closed beyond
+AIOHTTP_CLIENT_MAX_SESSIONS = os.environ.get("AIOHTTP_CLIENT_MAX_SESSIONS", "32")
+
+try:
+    AIOHTTP_CLIENT_MAX_SESSIONS = int(AIOHTTP_CLIENT_MAX_SESSIONS)
+except Exception:
+    AIOHTTP_CLIENT_MAX_SESSIONS = 32
+
+####################################
+# MODEL_CATALOG
+####################################
+
+MODEL_CATALOG_REFRESH_INTERVAL = os.environ.get("MODEL_CATALOG_REFRESH_INTERVAL", "10")
+
+try:
+    MODEL_CATALOG_REFRESH_INTERVAL = float(MODEL_CATALOG_REFRESH_INTERVAL)
+except Exception:
+    MODEL_CATALOG_REFRESH_INTERVAL = 10.0
+
+MODEL_CATALOG_REFRESH_TIMEOUT = os.environ.get("MODEL_CATALOG_REFRESH_TIMEOUT", "5")
+
+try:
+    MODEL_CATALOG_REFRESH_TIMEOUT = float(MODEL_CATALOG_REFRESH_TIMEOUT)
+except Exception:
+    MODEL_CATALOG_REFRESH_TIMEOUT = 5.0
+
+MODEL_CATALOG_MAX_BACKOFF = os.environ.get("MODEL_CATALOG_MAX_BACKOFF", "300")
+
+try:
+    MODEL_CATALOG_MAX_BACKOFF = float(MODEL_CATALOG_MAX_BACKOFF)
+except Exception:
+    MODEL_CATALOG_MAX_BACKOFF = 300.0
+
+####################################
+# OLLAMA_ROUTING
+####################################
+
+# warm (prefer backends with the model loaded), least_load or random
+OLLAMA_ROUTING_STRATEGY = os.environ.get("OLLAMA_ROUTING_STRATEGY", "warm").lower()
+
+OLLAMA_ROUTING_PS_INTERVAL = os.environ.get("OLLAMA_ROUTING_PS_INTERVAL", "5")
+
+try:
+    OLLAMA_ROUTING_PS_INTERVAL = float(OLLAMA_ROUTING_PS_INTERVAL)
+except Exception:
+    OLLAMA_ROUTING_PS_INTERVAL = 5.0
+
+OLLAMA_ROUTING_FAILURE_THRESHOLD = os.environ.get(
+    "OLLAMA_ROUTING_FAILURE_THRESHOLD", "3"
+)
+
+try:
+    OLLAMA_ROUTING_FAILURE_THRESHOLD = int(OLLAMA_ROUTING_FAILURE_THRESHOLD)
+except Exception:
+    OLLAMA_ROUTING_FAILURE_THRESHOLD = 3
+
+OLLAMA_ROUTING_COOLDOWN = os.environ.get("OLLAMA_ROUTING_COOLDOWN", "30")
+
+try:
+    OLLAMA_ROUTING_COOLDOWN = float(OLLAMA_ROUTING_COOLDOWN)
+except Exception:
+    OLLAMA_ROUTING_COOLDOWN = 30.0
+
+####################################
+# USER_CACHE
+####################################
+
+USER_CACHE_TTL = os.environ.get("USER_CACHE_TTL", "30")
+
+try:
+    USER_CACHE_TTL = float(USER_CACHE_TTL)
+except Exception:
+    USER_CACHE_TTL = 30.0
+
+USER_LAST_ACTIVE_FLUSH_INTERVAL = os.environ.get(
+    "USER_LAST_ACTIVE_FLUSH_INTERVAL", "30"
+)
+
+try:
+    USER_LAST_ACTIVE_FLUSH_INTERVAL = float(USER_LAST_ACTIVE_FLUSH_INTERVAL)
+except Exception:
+    USER_LAST_ACTIVE_FLUSH_INTERVAL = 30.0
+
+GROUP_CACHE_TTL = os.environ.get("GROUP_CACHE_TTL", "300")
+
+try:
+    GROUP_CACHE_TTL = float(GROUP_CACHE_TTL)
+except Exception:
+    GROUP_CACHE_TTL = 300.0
+
+FUNCTION_CACHE_TTL = os.environ.get("FUNCTION_CACHE_TTL", "300")
+
+try:
+    FUNCTION_CACHE_TTL = float(FUNCTION_CACHE_TTL)
+except Exception:
+    FUNCTION_CACHE_TTL = 300.0
+
+ENABLE_PLUGIN_PRELOAD = (
+    os.environ.get("ENABLE_PLUGIN_PRELOAD", "True").lower() == "true"
+)
+
+####################################
+# CONFIG
+####################################
+
+CONFIG_POLL_INTERVAL = os.environ.get("CONFIG_POLL_INTERVAL", "10")
+
+try:
+    CONFIG_POLL_INTERVAL = float(CONFIG_POLL_INTERVAL)
+except Exception:
+    CONFIG_POLL_INTERVAL = 10.0
+
 ####################################
 # OFFLINE_MODE
 ####################################
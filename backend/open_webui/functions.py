@@ -27,7 +27,7 @@ from open_webui.socket.main import (
 from open_webui.models.functions import Functions
 from open_webui.models.models import Models
 
-from open_webui.utils.plugin import load_function_module_by_id
+from open_webui.utils.function_cache import function_cache
 from open_webui.utils.tools import get_tools
 from open_webui.utils.access_control import has_access
 
@@ -52,17 +52,11 @@ log.setLevel(SRC_LOG_LEVELS["MAIN"])
 
 
 def get_function_module_by_id(request: Request, pipe_id: str):
-    # Check if function is already loaded
-    if pipe_id not in request.app.state.FUNCTIONS:
-        function_module, _, _ = load_function_module_by_id(pipe_id)
-        request.app.state.FUNCTIONS[pipe_id] = function_module
-    else:
-        function_module = request.app.state.FUNCTIONS[pipe_id]
-
-    if hasattr(function_module, "valves") and hasattr(function_module, "Valves"):
-        valves = Functions.get_function_valves_by_id(pipe_id)
-        function_module.valves = function_module.Valves(**(valves if valves else {}))
-    return function_module
+    # Loaded with its valves applied, until the function changes
+    loaded = function_cache.get_function(request, pipe_id)
+    if loaded is None:
+        raise Exception(f"Function not found: {pipe_id}")
+    return loaded.module
 
 
 async def get_function_models(request):
@@ -47,7 +47,6 @@ from starlette.responses import Response, StreamingResponse
 
 from open_webui.socket.main import (
     app as socket_app,
-    periodic_usage_pool_cleanup,
 )
 from open_webui.routers import (
     audio,
@@ -264,11 +263,13 @@ from open_webui.config import (
     AUTOCOMPLETE_GENERATION_INPUT_MAX_LENGTH,
     AppConfig,
     reset_config,
+    config_watcher,
 )
 from open_webui.env import (
     CHANGELOG,
     GLOBAL_LOG_LEVEL,
     SAFE_MODE,
+    ENABLE_PLUGIN_PRELOAD,
     SRC_LOG_LEVELS,
     VERSION,
     WEBUI_BUILD_HASH,
@@ -295,10 +296,18 @@ from open_webui.utils.chat import (
     chat_action as chat_action_handler,
 )
 from open_webui.utils.middleware import process_chat_payload, process_chat_response
-from open_webui.utils.access_control import has_access
+from open_webui.utils.access_control import has_access, filter_accessible
+from open_webui.utils.http import upstream_sessions
+from open_webui.retrieval.web.utils import web_page_fetcher
+from open_webui.utils.catalog import model_catalog
+from open_webui.utils.balancer import ollama_balancer
+from open_webui.utils.function_cache import function_cache
+from open_webui.utils.speech_cache import speech_cache
+from open_webui.utils.plugin import preload_plugins
 
 from open_webui.utils.auth import (
     decode_token,
+    flush_last_active_periodically,
     get_admin_user,
     get_verified_user,
 )
@@ -349,9 +358,38 @@ async def lifespan(app: FastAPI):
     if RESET_CONFIG_ON_START:
         reset_config()
 
-    asyncio.create_task(periodic_usage_pool_cleanup())
+    config_watcher.start()
+    upstream_sessions.start()
+    model_catalog.start(app)
+    ollama_balancer.start(app)
+
+    Users.cache.start()
+    Users.api_key_cache.start()
+    function_cache.start()
+    speech_cache.start()
+    flush_task = asyncio.create_task(flush_last_active_periodically())
+
+    preload_task = None
+    if ENABLE_PLUGIN_PRELOAD and not SAFE_MODE:
+        preload_task = asyncio.create_task(preload_plugins(app))
+
     yield
 
+    if preload_task:
+        preload_task.cancel()
+    flush_task.cancel()
+    await asyncio.gather(flush_task, return_exceptions=True)
+    Users.cache.stop()
+    Users.api_key_cache.stop()
+    function_cache.stop()
+    await speech_cache.stop()
+
+    await ollama_balancer.stop()
+    await model_catalog.stop()
+    await web_page_fetcher.close()
+    await upstream_sessions.close()
+    config_watcher.stop()
+
 
 app = FastAPI(
     docs_url="/docs" if ENV == "dev" else None,
@@ -672,6 +710,7 @@ app.state.config.AUTOCOMPLETE_GENERATION_INPUT_MAX_LENGTH = (
 ########################################
 
 app.state.MODELS = {}
+app.state.MODEL_CATALOG = model_catalog
 
 
 class RedirectMiddleware(BaseHTTPMiddleware):
@@ -791,6 +830,13 @@ app.include_router(utils.router, prefix="/api/v1/utils", tags=["utils"])
 @app.get("/api/models")
 async def get_models(request: Request, user=Depends(get_verified_user)):
     def get_filtered_models(models, user):
+        model_infos = Models.get_models_by_ids(
+            [model["id"] for model in models if not model.get("arena")]
+        )
+        accessible_ids = {
+            model_info.id for model_info in filter_accessible(user.id, model_infos)
+        }
+
         filtered_models = []
         for model in models:
             if model.get("arena"):
@@ -802,14 +848,8 @@ async def get_models(request: Request, user=Depends(get_verified_user)):
                     .get("access_control", {}),
                 ):
                     filtered_models.append(model)
-                continue
-
-            model_info = Models.get_model_by_id(model["id"])
-            if model_info:
-                if user.id == model_info.user_id or has_access(
-                    user.id, type="read", access_control=model_info.access_control
-                ):
-                    filtered_models.append(model)
+            elif model["id"] in accessible_ids:
+                filtered_models.append(model)
 
         return filtered_models
 
@@ -1072,6 +1112,11 @@ async def update_webhook_url(form_data: UrlForm, user=Depends(get_admin_user)):
     return {"url": app.state.config.WEBHOOK_URL}
 
 
+@app.get("/api/upstreams/stats")
+async def get_upstream_stats(user=Depends(get_admin_user)):
+    return upstream_sessions.get_metrics()
+
+
 @app.get("/api/version")
 async def get_app_version():
     return {
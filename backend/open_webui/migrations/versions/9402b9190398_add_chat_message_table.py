@@ -0,0 +1,173 @@
+"""Add chat_message table
+
+Revision ID: 9402b9190398
+Revises: 3781e22d8b01
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+
+import time
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.sql import table, select
+
+revision = "9402b9190398"
+down_revision = "3781e22d8b01"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+chat_table = table(
+    "chat",
+    sa.Column("id", sa.String()),
+    sa.Column("chat", sa.JSON()),
+)
+
+chat_message_table = table(
+    "chat_message",
+    sa.Column("id", sa.Text()),
+    sa.Column("chat_id", sa.Text()),
+    sa.Column("parent_id", sa.Text()),
+    sa.Column("role", sa.Text()),
+    sa.Column("content", sa.Text()),
+    sa.Column("model", sa.Text()),
+    sa.Column("data", sa.JSON()),
+    sa.Column("created_at", sa.BigInteger()),
+    sa.Column("updated_at", sa.BigInteger()),
+)
+
+
+def iterate_chats(connection):
+    # Keyset pagination so large installs are not loaded in one go
+    last_id = None
+    while True:
+        query = select(chat_table.c.id, chat_table.c.chat).order_by(chat_table.c.id)
+        if last_id is not None:
+            query = query.where(chat_table.c.id > last_id)
+
+        rows = connection.execute(query.limit(BATCH_SIZE)).fetchall()
+        if not rows:
+            break
+
+        yield from rows
+        last_id = rows[-1].id
+
+
+def upgrade():
+    op.create_table(
+        "chat_message",
+        sa.Column("id", sa.Text(), nullable=False),
+        sa.Column("chat_id", sa.Text(), nullable=False),
+        sa.Column("parent_id", sa.Text(), nullable=True),
+        sa.Column("role", sa.Text(), nullable=True),
+        sa.Column("content", sa.Text(), nullable=True),
+        sa.Column("model", sa.Text(), nullable=True),
+        sa.Column("data", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.BigInteger(), nullable=True),
+        sa.Column("updated_at", sa.BigInteger(), nullable=True),
+        sa.PrimaryKeyConstraint("chat_id", "id", name="pk_chat_message"),
+    )
+    op.create_index(
+        "chat_message_chat_id_created_at", "chat_message", ["chat_id", "created_at"]
+    )
+
+    # Move history.messages out of the chat documents
+    connection = op.get_bind()
+    now = int(time.time())
+
+    for row in iterate_chats(connection):
+        chat = row.chat
+        if not isinstance(chat, dict):
+            continue
+
+        history = chat.get("history")
+        if not isinstance(history, dict) or not isinstance(
+            history.get("messages"), dict
+        ):
+            continue
+
+        chat_messages = []
+        for message_id, message in history["messages"].items():
+            content = message.get("content")
+            if isinstance(content, str):
+                data = {
+                    key: value for key, value in message.items() if key != "content"
+                }
+            else:
+                content, data = None, message
+
+            timestamp = message.get("timestamp")
+            chat_messages.append(
+                {
+                    "id": message_id,
+                    "chat_id": row.id,
+                    "parent_id": message.get("parentId"),
+                    "role": message.get("role"),
+                    "content": content,
+                    "model": message.get("model"),
+                    "data": data,
+                    "created_at": (
+                        int(timestamp) if isinstance(timestamp, (int, float)) else now
+                    ),
+                    "updated_at": now,
+                }
+            )
+
+        if chat_messages:
+            connection.execute(sa.insert(chat_message_table), chat_messages)
+
+        chat = {key: value for key, value in chat.items() if key != "messages"}
+        chat["history"] = {
+            key: value for key, value in history.items() if key != "messages"
+        }
+        connection.execute(
+            sa.update(chat_table).where(chat_table.c.id == row.id).values(chat=chat)
+        )
+
+
+def downgrade():
+    connection = op.get_bind()
+
+    for row in iterate_chats(connection):
+        chat = row.chat
+        if not isinstance(chat, dict):
+            continue
+
+        history = chat.get("history")
+        if not isinstance(history, dict) or "messages" in history:
+            continue
+
+        messages = {}
+        for chat_message in connection.execute(
+            select(
+                chat_message_table.c.id,
+                chat_message_table.c.content,
+                chat_message_table.c.data,
+            )
+            .where(chat_message_table.c.chat_id == row.id)
+            .order_by(chat_message_table.c.created_at, chat_message_table.c.id)
+        ):
+            message = dict(chat_message.data or {})
+            if chat_message.content is not None:
+                message["content"] = chat_message.content
+            messages[chat_message.id] = message
+
+        message_list = []
+        message_id = history.get("currentId")
+        while message_id in messages and len(message_list) < len(messages):
+            message_list.append(messages[message_id])
+            message_id = messages[message_id].get("parentId")
+
+        chat = {
+            **chat,
+            "history": {**history, "messages": messages},
+            "messages": message_list[::-1],
+        }
+        connection.execute(
+            sa.update(chat_table).where(chat_table.c.id == row.id).values(chat=chat)
+        )
+
+    op.drop_index("chat_message_chat_id_created_at", table_name="chat_message")
+    op.drop_table("chat_message")
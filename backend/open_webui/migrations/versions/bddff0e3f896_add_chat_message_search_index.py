@@ -0,0 +1,122 @@
+"""Add chat message full-text search index
+
+Revision ID: bddff0e3f896
+Revises: 9402b9190398
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "bddff0e3f896"
+down_revision = "9402b9190398"
+branch_labels = None
+depends_on = None
+
+
+# SQLite: chat_message has no INTEGER PRIMARY KEY, so its rowids may change
+# on VACUUM. The FTS5 table indexes a small shadow table with a stable
+# integer key instead, and triggers keep both in sync with chat_message.
+SQLITE_UPGRADE = [
+    """
+    CREATE TABLE chat_message_search (
+        id INTEGER PRIMARY KEY,
+        chat_id TEXT NOT NULL,
+        message_id TEXT NOT NULL,
+        content TEXT NOT NULL,
+        UNIQUE (chat_id, message_id)
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE chat_message_fts USING fts5(
+        content,
+        content='chat_message_search',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER chat_message_search_ai AFTER INSERT ON chat_message_search BEGIN
+        INSERT INTO chat_message_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER chat_message_search_ad AFTER DELETE ON chat_message_search BEGIN
+        INSERT INTO chat_message_fts(chat_message_fts, rowid, content)
+        VALUES ('delete', old.id, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER chat_message_search_au AFTER UPDATE ON chat_message_search BEGIN
+        INSERT INTO chat_message_fts(chat_message_fts, rowid, content)
+        VALUES ('delete', old.id, old.content);
+        INSERT INTO chat_message_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER chat_message_fts_ai AFTER INSERT ON chat_message BEGIN
+        INSERT INTO chat_message_search(chat_id, message_id, content)
+        VALUES (new.chat_id, new.id, coalesce(new.content, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER chat_message_fts_ad AFTER DELETE ON chat_message BEGIN
+        DELETE FROM chat_message_search
+        WHERE chat_id = old.chat_id AND message_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER chat_message_fts_au AFTER UPDATE OF content ON chat_message BEGIN
+        UPDATE chat_message_search SET content = coalesce(new.content, '')
+        WHERE chat_id = old.chat_id AND message_id = old.id;
+    END
+    """,
+    """
+    INSERT INTO chat_message_search(chat_id, message_id, content)
+    SELECT chat_id, id, coalesce(content, '') FROM chat_message
+    """,
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS chat_message_fts_au",
+    "DROP TRIGGER IF EXISTS chat_message_fts_ad",
+    "DROP TRIGGER IF EXISTS chat_message_fts_ai",
+    "DROP TABLE IF EXISTS chat_message_fts",
+    "DROP TABLE IF EXISTS chat_message_search",
+]
+
+
+def upgrade():
+    conn = op.get_bind()
+
+    if conn.dialect.name == "sqlite":
+        try:
+            conn.execute(sa.text("CREATE VIRTUAL TABLE temp.fts5_check USING fts5(x)"))
+            conn.execute(sa.text("DROP TABLE temp.fts5_check"))
+        except Exception:
+            # Search falls back to scanning the messages
+            print("SQLite FTS5 is not available, skipping chat search index")
+            return
+
+        for statement in SQLITE_UPGRADE:
+            conn.execute(sa.text(statement))
+
+    elif conn.dialect.name == "postgresql":
+        op.create_index(
+            "chat_message_content_fts",
+            "chat_message",
+            [sa.text("to_tsvector('simple', coalesce(content, ''))")],
+            postgresql_using="gin",
+        )
+
+
+def downgrade():
+    conn = op.get_bind()
+
+    if conn.dialect.name == "sqlite":
+        for statement in SQLITE_DOWNGRADE:
+            conn.execute(sa.text(statement))
+
+    elif conn.dialect.name == "postgresql":
+        op.drop_index("chat_message_content_fts", table_name="chat_message")
@@ -0,0 +1,35 @@
+"""Add message listing indexes
+
+Revision ID: e4b2d7c91a3f
+Revises: bddff0e3f896
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "e4b2d7c91a3f"
+down_revision = "bddff0e3f896"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Channel and thread pages, newest first
+    op.create_index(
+        "message_channel_id_parent_id_created_at",
+        "message",
+        ["channel_id", "parent_id", "created_at"],
+    )
+    # Reply counts of a page of messages
+    op.create_index(
+        "message_parent_id_created_at", "message", ["parent_id", "created_at"]
+    )
+    op.create_index("message_reaction_message_id", "message_reaction", ["message_id"])
+
+
+def downgrade():
+    op.drop_index("message_reaction_message_id", table_name="message_reaction")
+    op.drop_index("message_parent_id_created_at", table_name="message")
+    op.drop_index("message_channel_id_parent_id_created_at", table_name="message")
@@ -1,4 +1,6 @@
+import html
 import json
+import re
 import time
 import uuid
 from typing import Optional
@@ -8,8 +10,18 @@ from open_webui.models.tags import TagModel, Tag, Tags
 
 
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import BigInteger, Boolean, Column, String, Text, JSON
-from sqlalchemy import or_, func, select, and_, text
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    Float,
+    Index,
+    PrimaryKeyConstraint,
+    String,
+    Text,
+    JSON,
+)
+from sqlalchemy import or_, func, select, and_, text, insert, literal, case
 from sqlalchemy.sql import exists
 
 ####################
@@ -36,6 +48,35 @@ class Chat(Base):
     folder_id = Column(Text, nullable=True)
 
 
+class ChatMessage(Base):
+    """
+    One row per message of a chat's history tree. `Chat.chat` keeps the rest
+    of the chat document; `history.messages` (and the derived flat `messages`
+    list) are rebuilt from these rows when a full chat is loaded.
+    """
+
+    __tablename__ = "chat_message"
+
+    id = Column(Text)
+    chat_id = Column(Text)
+    parent_id = Column(Text, nullable=True)
+
+    role = Column(Text, nullable=True)
+    content = Column(Text, nullable=True)
+    model = Column(Text, nullable=True)
+
+    # All other message fields (childrenIds, files, sources, statusHistory, ...)
+    data = Column(JSON, nullable=True)
+
+    created_at = Column(BigInteger)
+    updated_at = Column(BigInteger)
+
+    __table_args__ = (
+        PrimaryKeyConstraint("chat_id", "id", name="pk_chat_message"),
+        Index("chat_message_chat_id_created_at", "chat_id", "created_at"),
+    )
+
+
 class ChatModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -100,10 +141,200 @@ class ChatTitleIdResponse(BaseModel):
     created_at: int
 
 
+class ChatSearchResponse(ChatTitleIdResponse):
+    # HTML-escaped excerpt of the best matching message, matches in <mark>
+    snippet: Optional[str] = None
+
+
+def split_chat_messages(chat: dict) -> tuple[dict, Optional[dict]]:
+    """
+    Separate the message tree from a chat document. Returns the chat without
+    `history.messages` and `messages`, and the messages keyed by id, or None
+    for legacy chats that have no history tree.
+    """
+    history = chat.get("history")
+    if not isinstance(history, dict) or not isinstance(history.get("messages"), dict):
+        return chat, None
+
+    chat = {key: value for key, value in chat.items() if key != "messages"}
+    chat["history"] = {
+        key: value for key, value in history.items() if key != "messages"
+    }
+    return chat, history["messages"]
+
+
+def get_message_branch(messages: dict, message_id: Optional[str]) -> list[dict]:
+    # Walk from message_id up to the root, guarding against cycles
+    message_list = []
+    while message_id in messages and len(message_list) < len(messages):
+        message = messages[message_id]
+        message_list.append(message)
+        message_id = message.get("parentId")
+    return message_list[::-1]
+
+
+def join_chat_messages(chat: dict, messages: dict) -> dict:
+    history = chat.get("history")
+    if not isinstance(history, dict) or "messages" in history:
+        # Legacy or not normalized
+        return chat
+
+    return {
+        **chat,
+        "history": {**history, "messages": messages},
+        "messages": get_message_branch(messages, history.get("currentId")),
+    }
+
+
+# Highlight markers, swapped for <mark> once the snippet is HTML-escaped
+SNIPPET_START = "\ue000"
+SNIPPET_STOP = "\ue001"
+
+
+def get_search_tokens(search_text: str) -> list[str]:
+    return list(dict.fromkeys(re.findall(r"\w+", search_text.lower())))
+
+
+def format_search_snippet(snippet: Optional[str]) -> Optional[str]:
+    if not snippet:
+        return None
+    return (
+        html.escape(snippet)
+        .replace(SNIPPET_START, "<mark>")
+        .replace(SNIPPET_STOP, "</mark>")
+    )
+
+
+def get_chat_message_values(message: dict) -> dict:
+    content = message.get("content")
+    if isinstance(content, str):
+        data = {key: value for key, value in message.items() if key != "content"}
+    else:
+        content, data = None, message
+
+    timestamp = message.get("timestamp")
+    return {
+        "parent_id": message.get("parentId"),
+        "role": message.get("role"),
+        "content": content,
+        "model": message.get("model"),
+        "data": data,
+        "created_at": (
+            int(timestamp) if isinstance(timestamp, (int, float)) else int(time.time())
+        ),
+    }
+
+
+def get_message_from_chat_message(chat_message: ChatMessage) -> dict:
+    message = dict(chat_message.data or {})
+    if chat_message.content is not None:
+        message["content"] = chat_message.content
+    return message
+
+
 class ChatTable:
+    def _get_chat_models(
+        self, db, chats: list[Chat], messages: bool = True
+    ) -> list[ChatModel]:
+        chat_models = [ChatModel.model_validate(chat) for chat in chats]
+        if not messages or not chat_models:
+            return chat_models
+
+        message_maps = {chat_model.id: {} for chat_model in chat_models}
+        chat_ids = list(message_maps.keys())
+        for i in range(0, len(chat_ids), 500):
+            for chat_message in (
+                db.query(ChatMessage)
+                .filter(ChatMessage.chat_id.in_(chat_ids[i : i + 500]))
+                .order_by(ChatMessage.created_at, ChatMessage.id)
+            ):
+                message_maps[chat_message.chat_id][chat_message.id] = (
+                    get_message_from_chat_message(chat_message)
+                )
+
+        for chat_model in chat_models:
+            chat_model.chat = join_chat_messages(
+                chat_model.chat, message_maps[chat_model.id]
+            )
+        return chat_models
+
+    def _get_chat_model(
+        self, db, chat: Optional[Chat], messages: bool = True
+    ) -> Optional[ChatModel]:
+        if chat is None:
+            return None
+        return self._get_chat_models(db, [chat], messages)[0]
+
+    def _sync_chat_messages(self, db, chat_id: str, messages: dict):
+        # Only touch the rows whose message actually changed
+        existing = {
+            chat_message.id: chat_message
+            for chat_message in db.query(ChatMessage).filter_by(chat_id=chat_id)
+        }
+
+        now = int(time.time())
+        for message_id, message in messages.items():
+            chat_message = existing.pop(message_id, None)
+            if chat_message is None:
+                db.add(
+                    ChatMessage(
+                        id=message_id,
+                        chat_id=chat_id,
+                        **get_chat_message_values(message),
+                        updated_at=now,
+                    )
+                )
+            elif get_message_from_chat_message(chat_message) != message:
+                values = get_chat_message_values(message)
+                values.pop("created_at")
+                for key, value in values.items():
+                    setattr(chat_message, key, value)
+                chat_message.updated_at = now
+
+        if existing:
+            db.query(ChatMessage).filter(
+                ChatMessage.chat_id == chat_id,
+                ChatMessage.id.in_(list(existing.keys())),
+            ).delete(synchronize_session=False)
+
+    def _copy_chat_messages(self, db, from_chat_id: str, to_chat_id: str):
+        db.query(ChatMessage).filter_by(chat_id=to_chat_id).delete()
+        db.execute(
+            insert(ChatMessage).from_select(
+                [
+                    "id",
+                    "chat_id",
+                    "parent_id",
+                    "role",
+                    "content",
+                    "model",
+                    "data",
+                    "created_at",
+                    "updated_at",
+                ],
+                select(
+                    ChatMessage.id,
+                    literal(to_chat_id),
+                    ChatMessage.parent_id,
+                    ChatMessage.role,
+                    ChatMessage.content,
+                    ChatMessage.model,
+                    ChatMessage.data,
+                    ChatMessage.created_at,
+                    ChatMessage.updated_at,
+                ).where(ChatMessage.chat_id == from_chat_id),
+            )
+        )
+
+    def _delete_chat_messages(self, db, chat_ids):
+        db.query(ChatMessage).filter(ChatMessage.chat_id.in_(chat_ids)).delete(
+            synchronize_session=False
+        )
+
     def insert_new_chat(self, user_id: str, form_data: ChatForm) -> Optional[ChatModel]:
         with get_db() as db:
             id = str(uuid.uuid4())
+            chat, messages = split_chat_messages(form_data.chat)
             chat = ChatModel(
                 **{
                     "id": id,
@@ -113,7 +344,7 @@ class ChatTable:
                         if "title" in form_data.chat
                         else "New Chat"
                     ),
-                    "chat": form_data.chat,
+                    "chat": chat,
                     "created_at": int(time.time()),
                     "updated_at": int(time.time()),
                 }
@@ -121,15 +352,18 @@ class ChatTable:
 
             result = Chat(**chat.model_dump())
             db.add(result)
+            if messages is not None:
+                self._sync_chat_messages(db, id, messages)
             db.commit()
             db.refresh(result)
-            return ChatModel.model_validate(result) if result else None
+            return self._get_chat_model(db, result)
 
     def import_chat(
         self, user_id: str, form_data: ChatImportForm
     ) -> Optional[ChatModel]:
         with get_db() as db:
             id = str(uuid.uuid4())
+            chat, messages = split_chat_messages(form_data.chat)
             chat = ChatModel(
                 **{
                     "id": id,
@@ -139,7 +373,7 @@ class ChatTable:
                         if "title" in form_data.chat
                         else "New Chat"
                     ),
-                    "chat": form_data.chat,
+                    "chat": chat,
                     "meta": form_data.meta,
                     "pinned": form_data.pinned,
                     "folder_id": form_data.folder_id,
@@ -150,26 +384,30 @@ class ChatTable:
 
             result = Chat(**chat.model_dump())
             db.add(result)
+            if messages is not None:
+                self._sync_chat_messages(db, id, messages)
             db.commit()
             db.refresh(result)
-            return ChatModel.model_validate(result) if result else None
+            return self._get_chat_model(db, result)
 
     def update_chat_by_id(self, id: str, chat: dict) -> Optional[ChatModel]:
         try:
             with get_db() as db:
                 chat_item = db.get(Chat, id)
-                chat_item.chat = chat
+                chat_item.chat, messages = split_chat_messages(chat)
                 chat_item.title = chat["title"] if "title" in chat else "New Chat"
                 chat_item.updated_at = int(time.time())
+                if messages is not None:
+                    self._sync_chat_messages(db, id, messages)
                 db.commit()
                 db.refresh(chat_item)
 
-                return ChatModel.model_validate(chat_item)
+                return self._get_chat_model(db, chat_item)
         except Exception:
             return None
 
     def update_chat_title_by_id(self, id: str, title: str) -> Optional[ChatModel]:
-        chat = self.get_chat_by_id(id)
+        chat = self.get_chat_by_id(id, messages=False)
         if chat is None:
             return None
 
@@ -181,7 +419,7 @@ class ChatTable:
     def update_chat_tags_by_id(
         self, id: str, tags: list[str], user
     ) -> Optional[ChatModel]:
-        chat = self.get_chat_by_id(id)
+        chat = self.get_chat_by_id(id, messages=False)
         if chat is None:
             return None
 
@@ -199,11 +437,12 @@ class ChatTable:
         return self.get_chat_by_id(id)
 
     def get_chat_title_by_id(self, id: str) -> Optional[str]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
+        with get_db() as db:
+            chat = db.query(Chat.title).filter_by(id=id).first()
+            if chat is None:
+                return None
 
-        return chat.chat.get("title", "New Chat")
+            return chat.title or "New Chat"
 
     def get_messages_by_chat_id(self, id: str) -> Optional[dict]:
         chat = self.get_chat_by_id(id)
@@ -215,15 +454,102 @@ class ChatTable:
     def get_message_by_id_and_message_id(
         self, id: str, message_id: str
     ) -> Optional[dict]:
-        chat = self.get_chat_by_id(id)
+        with get_db() as db:
+            chat_message = (
+                db.query(ChatMessage).filter_by(chat_id=id, id=message_id).first()
+            )
+            if chat_message:
+                return get_message_from_chat_message(chat_message)
+
+        # Legacy chats keep their messages in the chat document
+        chat = self.get_chat_by_id(id, messages=False)
         if chat is None:
             return None
 
         return chat.chat.get("history", {}).get("messages", {}).get(message_id, {})
 
+    def get_message_list_by_chat_id(
+        self, id: str, skip: int = 0, limit: int = 50
+    ) -> list[dict]:
+        with get_db() as db:
+            query = (
+                db.query(ChatMessage)
+                .filter_by(chat_id=id)
+                .order_by(ChatMessage.created_at, ChatMessage.id)
+            )
+
+            if skip:
+                query = query.offset(skip)
+            if limit:
+                query = query.limit(limit)
+
+            return [get_message_from_chat_message(m) for m in query.all()]
+
+    def get_message_branch_by_chat_id(
+        self, id: str, message_id: Optional[str] = None, limit: Optional[int] = None
+    ) -> list[dict]:
+        """
+        Messages from the root down to `message_id` (defaults to the current
+        message). With `limit`, only the closest `limit` messages are returned;
+        the `parentId` of the first one is the cursor for the next page.
+        """
+        with get_db() as db:
+            if message_id is None:
+                chat = db.get(Chat, id)
+                if chat is None:
+                    return []
+
+                message_id = (chat.chat.get("history") or {}).get("currentId")
+                if not message_id:
+                    return []
+
+            if not limit:
+                # Also bounds the recursion should the tree contain a cycle
+                limit = (
+                    db.query(func.count(ChatMessage.id))
+                    .filter(ChatMessage.chat_id == id)
+                    .scalar()
+                )
+
+            branch = (
+                select(
+                    ChatMessage.id,
+                    ChatMessage.parent_id,
+                    literal(1).label("depth"),
+                )
+                .where(ChatMessage.chat_id == id, ChatMessage.id == message_id)
+                .cte("branch", recursive=True)
+            )
+            branch = branch.union_all(
+                select(
+                    ChatMessage.id,
+                    ChatMessage.parent_id,
+                    branch.c.depth + 1,
+                ).where(
+                    ChatMessage.chat_id == id,
+                    ChatMessage.id == branch.c.parent_id,
+                    branch.c.depth < limit,
+                )
+            )
+
+            chat_messages = (
+                db.query(ChatMessage)
+                .join(
+                    branch,
+                    and_(ChatMessage.chat_id == id, ChatMessage.id == branch.c.id),
+                )
+                .order_by(branch.c.depth.desc())
+                .all()
+            )
+            return [get_message_from_chat_message(m) for m in chat_messages]
+
     def upsert_message_to_chat_by_id_and_message_id(
         self, id: str, message_id: str, message: dict
     ) -> Optional[ChatModel]:
+        # Returns the chat without its messages
+        if self.update_message_by_id_and_message_id(id, message_id, message):
+            return self.get_chat_by_id(id, messages=False)
+
         chat = self.get_chat_by_id(id)
         if chat is None:
             return None
@@ -242,11 +568,71 @@ class ChatTable:
         history["currentId"] = message_id
 
         chat["history"] = history
-        return self.update_chat_by_id(id, chat)
+        if self.update_chat_by_id(id, chat) is None:
+            return None
+        return self.get_chat_by_id(id, messages=False)
+
+    def update_message_by_id_and_message_id(
+        self, id: str, message_id: str, message: dict
+    ) -> bool:
+        """
+        Merge `message` into an existing message row and make it the current
+        one, without loading the rest of the history. Returns False when the
+        message has no row yet; callers then fall back to
+        `upsert_message_to_chat_by_id_and_message_id`.
+        """
+        try:
+            with get_db() as db:
+                chat_message = (
+                    db.query(ChatMessage).filter_by(chat_id=id, id=message_id).first()
+                )
+                if chat_message is None:
+                    return False
+
+                now = int(time.time())
+                values = get_chat_message_values(
+                    {**get_message_from_chat_message(chat_message), **message}
+                )
+                values.pop("created_at")
+                for key, value in values.items():
+                    setattr(chat_message, key, value)
+                chat_message.updated_at = now
+
+                chat = db.get(Chat, id)
+                history = chat.chat.get("history", {})
+                if history.get("currentId") != message_id:
+                    chat.chat = {
+                        **chat.chat,
+                        "history": {**history, "currentId": message_id},
+                    }
+                chat.updated_at = now
+
+                db.commit()
+                return True
+        except Exception:
+            return False
 
     def add_message_status_to_chat_by_id_and_message_id(
         self, id: str, message_id: str, status: dict
     ) -> Optional[ChatModel]:
+        # Returns the chat without its messages
+        with get_db() as db:
+            chat_message = (
+                db.query(ChatMessage).filter_by(chat_id=id, id=message_id).first()
+            )
+            if chat_message:
+                data = chat_message.data or {}
+                chat_message.data = {
+                    **data,
+                    "statusHistory": [*data.get("statusHistory", []), status],
+                }
+                chat_message.updated_at = int(time.time())
+
+                chat = db.get(Chat, id)
+                chat.updated_at = int(time.time())
+                db.commit()
+                return self._get_chat_model(db, chat, messages=False)
+
         chat = self.get_chat_by_id(id)
         if chat is None:
             return None
@@ -260,7 +646,9 @@ class ChatTable:
             history["messages"][message_id]["statusHistory"] = status_history
 
         chat["history"] = history
-        return self.update_chat_by_id(id, chat)
+        if self.update_chat_by_id(id, chat) is None:
+            return None
+        return self.get_chat_by_id(id, messages=False)
 
     def insert_shared_chat_by_chat_id(self, chat_id: str) -> Optional[ChatModel]:
         with get_db() as db:
@@ -282,6 +670,7 @@ class ChatTable:
             )
             shared_result = Chat(**shared_chat.model_dump())
             db.add(shared_result)
+            self._copy_chat_messages(db, chat_id, shared_chat.id)
             db.commit()
             db.refresh(shared_result)
 
@@ -292,7 +681,11 @@ class ChatTable:
                 .update({"share_id": shared_chat.id})
             )
             db.commit()
-            return shared_chat if (shared_result and result) else None
+            return (
+                self._get_chat_model(db, shared_result)
+                if (shared_result and result)
+                else None
+            )
 
     def update_shared_chat_by_chat_id(self, chat_id: str) -> Optional[ChatModel]:
         try:
@@ -307,18 +700,22 @@ class ChatTable:
 
                 shared_chat.title = chat.title
                 shared_chat.chat = chat.chat
+                self._copy_chat_messages(db, chat_id, shared_chat.id)
 
                 shared_chat.updated_at = int(time.time())
                 db.commit()
                 db.refresh(shared_chat)
 
-                return ChatModel.model_validate(shared_chat)
+                return self._get_chat_model(db, shared_chat)
         except Exception:
             return None
 
     def delete_shared_chat_by_chat_id(self, chat_id: str) -> bool:
         try:
             with get_db() as db:
+                self._delete_chat_messages(
+                    db, select(Chat.id).where(Chat.user_id == f"shared-{chat_id}")
+                )
                 db.query(Chat).filter_by(user_id=f"shared-{chat_id}").delete()
                 db.commit()
 
@@ -335,7 +732,7 @@ class ChatTable:
                 chat.share_id = share_id
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._get_chat_model(db, chat)
         except Exception:
             return None
 
@@ -347,7 +744,7 @@ class ChatTable:
                 chat.updated_at = int(time.time())
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._get_chat_model(db, chat)
         except Exception:
             return None
 
@@ -359,7 +756,7 @@ class ChatTable:
                 chat.updated_at = int(time.time())
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._get_chat_model(db, chat)
         except Exception:
             return None
 
@@ -458,11 +855,11 @@ class ChatTable:
             )
             return [ChatModel.model_validate(chat) for chat in all_chats]
 
-    def get_chat_by_id(self, id: str) -> Optional[ChatModel]:
+    def get_chat_by_id(self, id: str, messages: bool = True) -> Optional[ChatModel]:
         try:
             with get_db() as db:
                 chat = db.get(Chat, id)
-                return ChatModel.model_validate(chat)
+                return self._get_chat_model(db, chat, messages)
         except Exception:
             return None
 
@@ -480,11 +877,13 @@ class ChatTable:
         except Exception:
             return None
 
-    def get_chat_by_id_and_user_id(self, id: str, user_id: str) -> Optional[ChatModel]:
+    def get_chat_by_id_and_user_id(
+        self, id: str, user_id: str, messages: bool = True
+    ) -> Optional[ChatModel]:
         try:
             with get_db() as db:
                 chat = db.query(Chat).filter_by(id=id, user_id=user_id).first()
-                return ChatModel.model_validate(chat)
+                return self._get_chat_model(db, chat, messages)
         except Exception:
             return None
 
@@ -495,7 +894,7 @@ class ChatTable:
                 # .limit(limit).offset(skip)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._get_chat_models(db, all_chats.all())
 
     def get_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -504,7 +903,7 @@ class ChatTable:
                 .filter_by(user_id=user_id)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._get_chat_models(db, all_chats.all())
 
     def get_pinned_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -513,7 +912,7 @@ class ChatTable:
                 .filter_by(user_id=user_id, pinned=True, archived=False)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._get_chat_models(db, all_chats.all())
 
     def get_archived_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -522,7 +921,135 @@ class ChatTable:
                 .filter_by(user_id=user_id, archived=True)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._get_chat_models(db, all_chats.all())
+
+    def _has_chat_message_fts(self, db) -> bool:
+        # The SQLite index is skipped by the migration when FTS5 is missing
+        if getattr(self, "chat_message_fts", None) is None:
+            self.chat_message_fts = (
+                db.execute(
+                    text(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chat_message_fts'"
+                    )
+                ).first()
+                is not None
+            )
+        return self.chat_message_fts
+
+    def _get_chat_message_matches(self, db, user_id: str, tokens: list[str]):
+        """
+        Full-text match of the user's messages, one row per chat with the
+        best rank (lower is better) and the key of the best message, or
+        None when there is no index to query.
+        """
+        dialect_name = db.bind.dialect.name
+        if dialect_name == "sqlite":
+            if not self._has_chat_message_fts(db):
+                return None
+
+            return (
+                text(
+                    """
+                    SELECT chat_message_search.chat_id AS chat_id,
+                           MIN(fts.rank) AS rank,
+                           fts.rowid AS message_key
+                    FROM (
+                        SELECT rowid, rank FROM chat_message_fts
+                        WHERE chat_message_fts MATCH :match
+                    ) AS fts
+                    JOIN chat_message_search ON chat_message_search.id = fts.rowid
+                    JOIN chat ON chat.id = chat_message_search.chat_id
+                    WHERE chat.user_id = :user_id
+                    GROUP BY chat_message_search.chat_id
+                    """
+                )
+                .bindparams(
+                    match=" ".join(f'"{token}"*' for token in tokens),
+                    user_id=user_id,
+                )
+                .columns(chat_id=Text, rank=Float, message_key=Text)
+                .subquery("matches")
+            )
+        elif dialect_name == "postgresql":
+            return (
+                text(
+                    """
+                    SELECT DISTINCT ON (chat_message.chat_id)
+                           chat_message.chat_id AS chat_id,
+                           -ts_rank(
+                               to_tsvector('simple', coalesce(chat_message.content, '')),
+                               to_tsquery('simple', :match)
+                           ) AS rank,
+                           chat_message.id AS message_key
+                    FROM chat_message
+                    JOIN chat ON chat.id = chat_message.chat_id
+                    WHERE chat.user_id = :user_id
+                    AND to_tsvector('simple', coalesce(chat_message.content, ''))
+                        @@ to_tsquery('simple', :match)
+                    ORDER BY chat_message.chat_id, rank
+                    """
+                )
+                .bindparams(
+                    match=" & ".join(f"{token}:*" for token in tokens),
+                    user_id=user_id,
+                )
+                .columns(chat_id=Text, rank=Float, message_key=Text)
+                .subquery("matches")
+            )
+        return None
+
+    def _get_chat_message_snippets(
+        self, db, tokens: list[str], matches: list[tuple[str, str]]
+    ) -> dict[str, str]:
+        # Only computed for the page of results, keyed by chat id
+        if not matches:
+            return {}
+
+        dialect_name = db.bind.dialect.name
+        if dialect_name == "sqlite":
+            chat_ids = {str(message_key): chat_id for chat_id, message_key in matches}
+            rows = db.execute(
+                text(
+                    f"""
+                    SELECT rowid, snippet(chat_message_fts, 0, :start, :stop, '…', 24)
+                    FROM chat_message_fts
+                    WHERE chat_message_fts MATCH :match
+                    AND rowid IN ({', '.join(str(int(key)) for key in chat_ids)})
+                    """
+                ),
+                {
+                    "match": " ".join(f'"{token}"*' for token in tokens),
+                    "start": SNIPPET_START,
+                    "stop": SNIPPET_STOP,
+                },
+            ).fetchall()
+            return {chat_ids[str(rowid)]: snippet for rowid, snippet in rows}
+        elif dialect_name == "postgresql":
+            rows = db.execute(
+                select(
+                    ChatMessage.chat_id,
+                    func.ts_headline(
+                        "simple",
+                        func.coalesce(ChatMessage.content, ""),
+                        func.to_tsquery(
+                            "simple", " & ".join(f"{token}:*" for token in tokens)
+                        ),
+                        f"StartSel={SNIPPET_START}, StopSel={SNIPPET_STOP}, MaxWords=24, MinWords=8",
+                    ),
+                ).where(
+                    or_(
+                        *[
+                            and_(
+                                ChatMessage.chat_id == chat_id,
+                                ChatMessage.id == message_key,
+                            )
+                            for chat_id, message_key in matches
+                        ]
+                    )
+                )
+            ).fetchall()
+            return {chat_id: snippet for chat_id, snippet in rows}
+        return {}
 
     def get_chats_by_user_id_and_search_text(
         self,
@@ -531,14 +1058,20 @@ class ChatTable:
         include_archived: bool = False,
         skip: int = 0,
         limit: int = 60,
-    ) -> list[ChatModel]:
+    ) -> list[ChatSearchResponse]:
         """
-        Filters chats based on a search query using Python, allowing pagination using skip and limit.
+        Searches chat titles and messages (full-text, ranked) with optional
+        'tag:tag_name' filters, allowing pagination using skip and limit.
         """
         search_text = search_text.lower().strip()
 
         if not search_text:
-            return self.get_chat_list_by_user_id(user_id, include_archived, skip, limit)
+            return [
+                ChatSearchResponse(**chat.model_dump())
+                for chat in self.get_chat_list_by_user_id(
+                    user_id, include_archived, skip, limit
+                )
+            ]
 
         search_text_words = search_text.split(" ")
 
@@ -561,29 +1094,39 @@ class ChatTable:
             if not include_archived:
                 query = query.filter(Chat.archived == False)
 
-            query = query.order_by(Chat.updated_at.desc())
+            tokens = get_search_tokens(search_text)
+            matches = (
+                self._get_chat_message_matches(db, user_id, tokens) if tokens else None
+            )
+
+            title_match = Chat.title.ilike(f"%{search_text}%")
+            if matches is not None:
+                query = (
+                    query.outerjoin(matches, matches.c.chat_id == Chat.id)
+                    .add_columns(matches.c.message_key)
+                    .filter(or_(title_match, matches.c.chat_id.isnot(None)))
+                    .order_by(
+                        case((title_match, 0), else_=1),
+                        matches.c.rank.is_(None),
+                        matches.c.rank,
+                        Chat.updated_at.desc(),
+                    )
+                )
+            elif search_text:
+                # No full-text index to use, scan the messages
+                query = query.filter(
+                    title_match
+                    | exists().where(
+                        ChatMessage.chat_id == Chat.id,
+                        func.lower(ChatMessage.content).like(f"%{search_text}%"),
+                    )
+                ).order_by(Chat.updated_at.desc())
+            else:
+                query = query.order_by(Chat.updated_at.desc())
 
             # Check if the database dialect is either 'sqlite' or 'postgresql'
             dialect_name = db.bind.dialect.name
             if dialect_name == "sqlite":
-                # SQLite case: using JSON1 extension for JSON searching
-                query = query.filter(
-                    (
-                        Chat.title.ilike(
-                            f"%{search_text}%"
-                        )  # Case-insensitive search in title
-                        | text(
-                            """
-                            EXISTS (
-                                SELECT 1 
-                                FROM json_each(Chat.chat, '$.messages') AS message 
-                                WHERE LOWER(message.value->>'content') LIKE '%' || :search_text || '%'
-                            )
-                            """
-                        )
-                    ).params(search_text=search_text)
-                )
-
                 # Check if there are any tags to filter, it should have all the tags
                 if "none" in tag_ids:
                     query = query.filter(
@@ -615,24 +1158,6 @@ class ChatTable:
                     )
 
             elif dialect_name == "postgresql":
-                # PostgreSQL relies on proper JSON query for search
-                query = query.filter(
-                    (
-                        Chat.title.ilike(
-                            f"%{search_text}%"
-                        )  # Case-insensitive search in title
-                        | text(
-                            """
-                            EXISTS (
-                                SELECT 1
-                                FROM json_array_elements(Chat.chat->'messages') AS message
-                                WHERE LOWER(message->>'content') LIKE '%' || :search_text || '%'
-                            )
-                            """
-                        )
-                    ).params(search_text=search_text)
-                )
-
                 # Check if there are any tags to filter, it should have all the tags
                 if "none" in tag_ids:
                     query = query.filter(
@@ -670,10 +1195,31 @@ class ChatTable:
             # Perform pagination at the SQL level
             all_chats = query.offset(skip).limit(limit).all()
 
-            print(len(all_chats))
-
-            # Validate and return chats
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            if matches is None:
+                return [
+                    ChatSearchResponse.model_validate(chat, from_attributes=True)
+                    for chat in all_chats
+                ]
+
+            snippets = self._get_chat_message_snippets(
+                db,
+                tokens,
+                [
+                    (chat.id, message_key)
+                    for chat, message_key in all_chats
+                    if message_key is not None
+                ],
+            )
+            return [
+                ChatSearchResponse(
+                    id=chat.id,
+                    title=chat.title,
+                    updated_at=chat.updated_at,
+                    created_at=chat.created_at,
+                    snippet=format_search_snippet(snippets.get(chat.id)),
+                )
+                for chat, _ in all_chats
+            ]
 
     def get_chats_by_folder_id_and_user_id(
         self, folder_id: str, user_id: str
@@ -701,7 +1247,7 @@ class ChatTable:
             query = query.order_by(Chat.updated_at.desc())
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._get_chat_models(db, all_chats)
 
     def update_chat_folder_id_by_id_and_user_id(
         self, id: str, user_id: str, folder_id: str
@@ -714,7 +1260,7 @@ class ChatTable:
                 chat.pinned = False
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._get_chat_model(db, chat)
         except Exception:
             return None
 
@@ -774,7 +1320,7 @@ class ChatTable:
 
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._get_chat_model(db, chat)
         except Exception:
             return None
 
@@ -850,6 +1396,7 @@ class ChatTable:
     def delete_chat_by_id(self, id: str) -> bool:
         try:
             with get_db() as db:
+                self._delete_chat_messages(db, [id])
                 db.query(Chat).filter_by(id=id).delete()
                 db.commit()
 
@@ -860,6 +1407,9 @@ class ChatTable:
     def delete_chat_by_id_and_user_id(self, id: str, user_id: str) -> bool:
         try:
             with get_db() as db:
+                self._delete_chat_messages(
+                    db, select(Chat.id).where(Chat.id == id, Chat.user_id == user_id)
+                )
                 db.query(Chat).filter_by(id=id, user_id=user_id).delete()
                 db.commit()
 
@@ -872,6 +1422,9 @@ class ChatTable:
             with get_db() as db:
                 self.delete_shared_chats_by_user_id(user_id)
 
+                self._delete_chat_messages(
+                    db, select(Chat.id).where(Chat.user_id == user_id)
+                )
                 db.query(Chat).filter_by(user_id=user_id).delete()
                 db.commit()
 
@@ -884,6 +1437,12 @@ class ChatTable:
     ) -> bool:
         try:
             with get_db() as db:
+                self._delete_chat_messages(
+                    db,
+                    select(Chat.id).where(
+                        Chat.user_id == user_id, Chat.folder_id == folder_id
+                    ),
+                )
                 db.query(Chat).filter_by(user_id=user_id, folder_id=folder_id).delete()
                 db.commit()
 
@@ -897,6 +1456,9 @@ class ChatTable:
                 chats_by_user = db.query(Chat).filter_by(user_id=user_id).all()
                 shared_chat_ids = [f"shared-{chat.id}" for chat in chats_by_user]
 
+                self._delete_chat_messages(
+                    db, select(Chat.id).where(Chat.user_id.in_(shared_chat_ids))
+                )
                 db.query(Chat).filter(Chat.user_id.in_(shared_chat_ids)).delete()
                 db.commit()
 
@@ -1,11 +1,20 @@
 import json
 import logging
+import threading
 import time
 from typing import Optional
 import uuid
 
+import redis
+
 from open_webui.internal.db import Base, get_db
-from open_webui.env import SRC_LOG_LEVELS
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    GROUP_CACHE_TTL,
+    WEBSOCKET_MANAGER,
+    WEBSOCKET_REDIS_URL,
+)
+from open_webui.utils.cache import TTLCache
 
 from open_webui.models.files import FileMetadataResponse
 
@@ -88,6 +97,43 @@ class GroupUpdateForm(GroupForm):
 
 
 class GroupTable:
+    def __init__(self):
+        # Groups of each user, stamped with the version of the group table
+        # they were loaded at and only used while it is still current
+        self.memberships = TTLCache("group_memberships", ttl=GROUP_CACHE_TTL)
+
+        self.version = 0
+        self.version_lock = threading.Lock()
+
+        # Shared by all workers, bumped on every change to the group table
+        self.redis = (
+            redis.Redis.from_url(WEBSOCKET_REDIS_URL)
+            if WEBSOCKET_MANAGER == "redis"
+            else None
+        )
+        self.version_key = "open-webui:groups:version"
+
+    def get_version(self) -> Optional[tuple[int, int]]:
+        """The current version of the group table, None if it is unknown."""
+        redis_version = 0
+        if self.redis:
+            try:
+                redis_version = int(self.redis.get(self.version_key) or 0)
+            except Exception as e:
+                log.warning(f"Failed to get the group table version: {e}")
+                return None
+        return self.version, redis_version
+
+    def bump_version(self):
+        with self.version_lock:
+            self.version += 1
+
+        if self.redis:
+            try:
+                self.redis.incr(self.version_key)
+            except Exception as e:
+                log.warning(f"Failed to bump the group table version: {e}")
+
     def insert_new_group(
         self, user_id: str, form_data: GroupForm
     ) -> Optional[GroupModel]:
@@ -106,6 +152,7 @@ class GroupTable:
                 result = Group(**group.model_dump())
                 db.add(result)
                 db.commit()
+                self.bump_version()
                 db.refresh(result)
                 if result:
                     return GroupModel.model_validate(result)
@@ -137,6 +184,20 @@ class GroupTable:
                 .all()
             ]
 
+    def get_cached_groups_by_member_id(self, user_id: str) -> list[GroupModel]:
+        """Like get_groups_by_member_id(), the groups are shared, don't modify them."""
+        version = self.get_version()
+        if version is not None:
+            entry = self.memberships.get(user_id)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+
+        groups = self.get_groups_by_member_id(user_id)
+        if version is not None:
+            # Loaded after reading the version, a concurrent change makes it stale
+            self.memberships.set(user_id, (version, groups))
+        return groups
+
     def get_group_by_id(self, id: str) -> Optional[GroupModel]:
         try:
             with get_db() as db:
@@ -164,6 +225,7 @@ class GroupTable:
                     }
                 )
                 db.commit()
+                self.bump_version()
                 return self.get_group_by_id(id=id)
         except Exception as e:
             log.exception(e)
@@ -174,6 +236,7 @@ class GroupTable:
             with get_db() as db:
                 db.query(Group).filter_by(id=id).delete()
                 db.commit()
+                self.bump_version()
                 return True
         except Exception:
             return False
@@ -183,6 +246,7 @@ class GroupTable:
             try:
                 db.query(Group).delete()
                 db.commit()
+                self.bump_version()
 
                 return True
             except Exception:
@@ -203,6 +267,8 @@ class GroupTable:
                     )
                     db.commit()
 
+                if groups:
+                    self.bump_version()
                 return True
             except Exception:
                 return False
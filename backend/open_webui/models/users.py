@@ -1,7 +1,17 @@
+import hashlib
+import logging
+import threading
 import time
 from typing import Optional
 
 from open_webui.internal.db import Base, JSONField, get_db
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    USER_CACHE_TTL,
+    WEBSOCKET_MANAGER,
+    WEBSOCKET_REDIS_URL,
+)
+from open_webui.utils.cache import TTLCache
 
 
 from open_webui.models.chats import Chats
@@ -9,7 +19,10 @@ from open_webui.models.groups import Groups
 
 
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import BigInteger, Column, String, Text
+from sqlalchemy import BigInteger, Column, String, Text, bindparam, update
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
 
 ####################
 # User DB Schema
@@ -95,6 +108,22 @@ class UserUpdateForm(BaseModel):
 
 
 class UsersTable:
+    def __init__(self):
+        redis_url = WEBSOCKET_REDIS_URL if WEBSOCKET_MANAGER == "redis" else None
+
+        # Users looked up on every authenticated request, dropped on any change
+        self.cache = TTLCache(
+            "users", ttl=USER_CACHE_TTL, model=UserModel, redis_url=redis_url
+        )
+        # Hashed API key -> user id, checked against the user's current key
+        self.api_key_cache = TTLCache(
+            "api_keys", ttl=USER_CACHE_TTL, redis_url=redis_url
+        )
+
+        # Pending last_active_at updates, see flush_last_active()
+        self.last_active: dict[str, int] = {}
+        self.last_active_lock = threading.Lock()
+
     def insert_new_user(
         self,
         id: str,
@@ -143,6 +172,40 @@ class UsersTable:
         except Exception:
             return None
 
+    def get_cached_user_by_id(self, id: str) -> Optional[UserModel]:
+        user = self.cache.get(id)
+        if user is None:
+            user = self.get_user_by_id(id)
+            if user is None:
+                return None
+            self.cache.set(id, user)
+
+        with self.last_active_lock:
+            last_active_at = self.last_active.get(id)
+
+        # A copy, the cached user is shared between requests
+        return user.model_copy(
+            update={"last_active_at": last_active_at} if last_active_at else None
+        )
+
+    def get_cached_user_by_api_key(self, api_key: str) -> Optional[UserModel]:
+        key = hashlib.sha256(api_key.encode()).hexdigest()
+
+        id = self.api_key_cache.get(key)
+        if id is not None:
+            user = self.get_cached_user_by_id(id)
+            # The key may have been replaced or removed since
+            if user is not None and user.api_key == api_key:
+                return user
+
+        user = self.get_user_by_api_key(api_key)
+        if user is None:
+            return None
+
+        self.api_key_cache.set(key, user.id)
+        self.cache.set(user.id, user)
+        return user.model_copy()
+
     def get_user_by_email(self, email: str) -> Optional[UserModel]:
         try:
             with get_db() as db:
@@ -213,6 +276,7 @@ class UsersTable:
             with get_db() as db:
                 db.query(User).filter_by(id=id).update({"role": role})
                 db.commit()
+                self.cache.delete(id)
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
         except Exception:
@@ -227,12 +291,43 @@ class UsersTable:
                     {"profile_image_url": profile_image_url}
                 )
                 db.commit()
+                self.cache.delete(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
         except Exception:
             return None
 
+    def touch_user_last_active_by_id(self, id: str):
+        """Update last_active_at on the next flush_last_active()."""
+        with self.last_active_lock:
+            self.last_active[id] = int(time.time())
+
+    def flush_last_active(self):
+        """Write the pending last_active_at updates in a single transaction."""
+        with self.last_active_lock:
+            last_active, self.last_active = self.last_active, {}
+
+        if not last_active:
+            return
+
+        try:
+            with get_db() as db:
+                # Core executemany, so users deleted since their last touch
+                # are skipped instead of failing the whole batch
+                db.execute(
+                    update(User.__table__)
+                    .where(User.id == bindparam("_id"))
+                    .values(last_active_at=bindparam("_last_active_at")),
+                    [
+                        {"_id": id, "_last_active_at": last_active_at}
+                        for id, last_active_at in last_active.items()
+                    ],
+                )
+                db.commit()
+        except Exception as e:
+            log.exception(f"Failed to update last_active_at: {e}")
+
     def update_user_last_active_by_id(self, id: str) -> Optional[UserModel]:
         try:
             with get_db() as db:
@@ -253,6 +348,7 @@ class UsersTable:
             with get_db() as db:
                 db.query(User).filter_by(id=id).update({"oauth_sub": oauth_sub})
                 db.commit()
+                self.cache.delete(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -264,6 +360,7 @@ class UsersTable:
             with get_db() as db:
                 db.query(User).filter_by(id=id).update(updated)
                 db.commit()
+                self.cache.delete(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -283,6 +380,9 @@ class UsersTable:
                     # Delete User
                     db.query(User).filter_by(id=id).delete()
                     db.commit()
+                self.cache.delete(id)
+                with self.last_active_lock:
+                    self.last_active.pop(id, None)
 
                 return True
             else:
@@ -295,6 +395,7 @@ class UsersTable:
             with get_db() as db:
                 result = db.query(User).filter_by(id=id).update({"api_key": api_key})
                 db.commit()
+                self.cache.delete(id)
                 return True if result == 1 else False
         except Exception:
             return False
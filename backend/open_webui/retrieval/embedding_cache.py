@@ -0,0 +1,285 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+from open_webui.config import (
+    ENABLE_RAG_EMBEDDING_CACHE,
+    ENABLE_RAG_EMBEDDING_CACHE_DISK,
+    RAG_EMBEDDING_CACHE_DIR,
+    RAG_EMBEDDING_CACHE_DISK_MAX_ENTRIES,
+    RAG_EMBEDDING_CACHE_MAX_SIZE,
+    RAG_EMBEDDING_CACHE_SIZE,
+)
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+def get_embedding_cache_key(engine: str, model: str, text: str) -> str:
+    return hashlib.sha256(f"{engine}\0{model}\0{text}".encode()).hexdigest()
+
+
+def get_vector_size(vector: array) -> int:
+    return vector.itemsize * len(vector)
+
+
+class EmbeddingDiskStore:
+    """
+    SQLite backing store for the embedding cache. Vectors are stored as
+    float32, which is also what the vector databases keep.
+    """
+
+    def __init__(self, cache_dir: str, max_entries: int):
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        self.path = Path(cache_dir) / "embeddings.sqlite3"
+        self.max_entries = max_entries
+
+        conn = self._connect()
+        try:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embedding (
+                    key TEXT PRIMARY KEY,
+                    engine TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    accessed_at INTEGER NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS embedding_accessed_at ON embedding (accessed_at)"
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def get_many(self, keys: list[str]) -> dict[str, array]:
+        if not keys:
+            return {}
+
+        conn = self._connect()
+        try:
+            rows = []
+            # Stay under SQLite's bound parameter limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i : i + 500]
+                rows.extend(
+                    conn.execute(
+                        f"SELECT key, vector FROM embedding WHERE key IN ({','.join('?' * len(batch))})",
+                        batch,
+                    ).fetchall()
+                )
+
+            if rows:
+                now = int(time.time())
+                conn.executemany(
+                    "UPDATE embedding SET accessed_at = ? WHERE key = ?",
+                    [(now, key) for key, _ in rows],
+                )
+                conn.commit()
+        finally:
+            conn.close()
+
+        return {key: array("f", vector) for key, vector in rows}
+
+    def set_many(self, engine: str, model: str, entries: dict[str, array]):
+        if not entries:
+            return
+
+        now = int(time.time())
+        conn = self._connect()
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embedding (key, engine, model, vector, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (key, engine, model, array("f", vector).tobytes(), now)
+                    for key, vector in entries.items()
+                ],
+            )
+            (count,) = conn.execute("SELECT COUNT(*) FROM embedding").fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM embedding WHERE key IN (SELECT key FROM embedding ORDER BY accessed_at LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def invalidate(self, engine: str, model: str):
+        # Drop everything that was not produced by the given engine/model
+        conn = self._connect()
+        try:
+            conn.execute(
+                "DELETE FROM embedding WHERE engine != ? OR model != ?",
+                (engine, model),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed cache of embeddings keyed by (engine, model, sha256(text))
+    with an in-memory LRU in front of an optional on-disk store.
+
+    Vectors are kept as float32 arrays, and the LRU is bounded both by
+    `max_entries` and by `max_size` bytes of vectors.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_size: int,
+        disk_store: Optional[EmbeddingDiskStore] = None,
+    ):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.disk_store = disk_store
+        self.entries: OrderedDict[str, array] = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _get_many(self, keys: list[str]) -> dict[str, array]:
+        found = {}
+        with self.lock:
+            for key in keys:
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                    found[key] = self.entries[key]
+
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        if missing and self.disk_store is not None:
+            try:
+                from_disk = self.disk_store.get_many(missing)
+            except Exception as e:
+                log.warning(f"Error reading embedding cache store: {e}")
+                from_disk = {}
+
+            with self.lock:
+                self.disk_hits += len(from_disk)
+            self._set_many(from_disk)
+            found.update(from_disk)
+
+        with self.lock:
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def _set_many(self, entries: dict[str, array]):
+        with self.lock:
+            for key, vector in entries.items():
+                if key in self.entries:
+                    self.size -= get_vector_size(self.entries[key])
+                self.entries[key] = vector
+                self.entries.move_to_end(key)
+                self.size += get_vector_size(vector)
+            while self.entries and (
+                len(self.entries) > self.max_entries or self.size > self.max_size
+            ):
+                _, vector = self.entries.popitem(last=False)
+                self.size -= get_vector_size(vector)
+                self.evictions += 1
+
+    def embed(
+        self,
+        engine: str,
+        model: str,
+        text: Union[str, list[str]],
+        func: Callable[[list[str]], Optional[list[list[float]]]],
+    ):
+        texts = [text] if isinstance(text, str) else text
+        keys = [get_embedding_cache_key(engine, model, t) for t in texts]
+        found = self._get_many(keys)
+
+        missing = {}
+        for key, t in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, t)
+
+        if missing:
+            embeddings = func(list(missing.values()))
+            if embeddings is None:
+                return None
+
+            if len(embeddings) != len(missing):
+                raise ValueError(
+                    f"Embedding engine returned {len(embeddings)} embeddings "
+                    f"for {len(missing)} texts"
+                )
+
+            computed = {
+                key: array("f", embedding)
+                for key, embedding in zip(missing.keys(), embeddings)
+            }
+            self._set_many(computed)
+            if self.disk_store is not None:
+                try:
+                    self.disk_store.set_many(engine, model, computed)
+                except Exception as e:
+                    log.warning(f"Error writing embedding cache store: {e}")
+            found.update(computed)
+
+        embeddings = [found[key].tolist() for key in keys]
+        return embeddings[0] if isinstance(text, str) else embeddings
+
+    def invalidate(self, engine: str, model: str):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+        if self.disk_store is not None:
+            self.disk_store.invalidate(engine, model)
+        log.info(
+            f"embedding cache invalidated for {engine or 'sentence-transformers'} {model}"
+        )
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": True,
+                "disk": self.disk_store is not None,
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "size": self.size,
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+EMBEDDING_CACHE = None
+if ENABLE_RAG_EMBEDDING_CACHE:
+    EMBEDDING_CACHE = EmbeddingCache(
+        max_entries=RAG_EMBEDDING_CACHE_SIZE,
+        max_size=RAG_EMBEDDING_CACHE_MAX_SIZE,
+        disk_store=(
+            EmbeddingDiskStore(
+                RAG_EMBEDDING_CACHE_DIR, RAG_EMBEDDING_CACHE_DISK_MAX_ENTRIES
+            )
+            if ENABLE_RAG_EMBEDDING_CACHE_DISK
+            else None
+        ),
+    )
@@ -1,4 +1,8 @@
 import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
 import torch
 import numpy as np
 from colbert.infra import ColBERTConfig
@@ -27,7 +31,50 @@ class ColBERT:
             name,
             colbert_config=ColBERTConfig(model_name=name),
         ).to(self.device)
-        pass
+
+        # Token embeddings of recently scored documents, by chunk id
+        self.cache_size = kwargs.get("cache_size", 2000)
+        self.cache: OrderedDict[str, torch.Tensor] = OrderedDict()
+        self.cache_lock = threading.Lock()
+
+    def embed_documents(self, docs: list[str], ids: list) -> list[torch.Tensor]:
+        """Token embeddings of each document, encoding only uncached ones."""
+        keys = [id if id is not None else doc for doc, id in zip(docs, ids)]
+        embeddings = [None] * len(docs)
+
+        with self.cache_lock:
+            for idx, key in enumerate(keys):
+                if key in self.cache:
+                    self.cache.move_to_end(key)
+                    embeddings[idx] = self.cache[key]
+
+        missing = {}
+        for idx, key in enumerate(keys):
+            if embeddings[idx] is None:
+                missing.setdefault(key, []).append(idx)
+
+        if missing:
+            D, doclens = self.ckpt.docFromText(
+                [docs[indices[0]] for indices in missing.values()],
+                bsize=32,
+                keep_dims="flatten",
+            )[:2]
+
+            with self.cache_lock:
+                for (key, indices), embedding in zip(
+                    missing.items(), torch.split(D, doclens)
+                ):
+                    # Half precision halves the memory, scores are computed in full
+                    embedding = embedding.to(torch.float16)
+                    for idx in indices:
+                        embeddings[idx] = embedding
+
+                    if self.cache_size > 0:
+                        self.cache[key] = embedding
+                        while len(self.cache) > self.cache_size:
+                            self.cache.popitem(last=False)
+
+        return embeddings
 
     def calculate_similarity_scores(self, query_embeddings, document_embeddings):
 
@@ -62,20 +109,41 @@ class ColBERT:
 
         return normalized_scores.detach().cpu().numpy().astype(np.float32)
 
-    def predict(self, sentences):
-
-        query = sentences[0][0]
-        docs = [i[1] for i in sentences]
+    def predict(self, sentences, ids=None):
+        return self.predict_batch([(sentences, ids)])[0]
+
+    def predict_batch(self, requests: list[tuple[list, Optional[list]]]):
+        """
+        Score the (query, document) pairs of several requests, each for a
+        single query, encoding their queries and documents together.
+        """
+        queries = [sentences[0][0] for sentences, _ in requests]
+        docs = [pair[1] for sentences, _ in requests for pair in sentences]
+        ids = [
+            id
+            for sentences, request_ids in requests
+            for id in (request_ids or [None] * len(sentences))
+        ]
 
         # Embedding the documents
-        embedded_docs = self.ckpt.docFromText(docs, bsize=32)[0]
+        embedded_docs = self.embed_documents(docs, ids)
         # Embedding the queries
-        embedded_queries = self.ckpt.queryFromText([query], bsize=32)
-        embedded_query = embedded_queries[0]
-
-        # Calculate retrieval scores for the query against all documents
-        scores = self.calculate_similarity_scores(
-            embedded_query.unsqueeze(0), embedded_docs
-        )
+        embedded_queries = self.ckpt.queryFromText(queries, bsize=32)
+
+        results = []
+        offset = 0
+        for (sentences, _), embedded_query in zip(requests, embedded_queries):
+            # Padded with zeros like docFromText does
+            request_docs = torch.nn.utils.rnn.pad_sequence(
+                embedded_docs[offset : offset + len(sentences)], batch_first=True
+            ).to(torch.float32)
+            offset += len(sentences)
+
+            # Calculate retrieval scores for the query against all documents
+            results.append(
+                self.calculate_similarity_scores(
+                    embedded_query.unsqueeze(0), request_docs
+                )
+            )
 
-        return scores
+        return results
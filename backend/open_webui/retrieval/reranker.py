@@ -0,0 +1,135 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Optional
+
+import numpy as np
+
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+class RerankRequest:
+    def __init__(self, sentences: list, ids: Optional[list]):
+        self.sentences = sentences
+        self.ids = ids
+        self.future = Future()
+
+
+class Reranker:
+    """
+    Scores (query, document) pairs with a reranking model on a dedicated
+    worker thread.
+
+    Requests made within `max_wait` seconds of each other, e.g. by
+    concurrent chats or by the collections of one retrieval, are scored in
+    one batch of up to `batch_size` pairs instead of one after another.
+    Models with a `predict_batch` method (ColBERT) get the requests as
+    they are, the pairs of all requests are scored at once for the others
+    (CrossEncoder).
+
+    Once closed, e.g. because the model was replaced, requests from
+    retrievals still holding the reranker are scored on their own thread.
+    """
+
+    def __init__(self, model: Any, batch_size: int = 32, max_wait: float = 0.01):
+        self.model = model
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+
+        self.requests: queue.Queue[Optional[RerankRequest]] = queue.Queue()
+        self.closed = False
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.run, name="reranker", daemon=True)
+        self.thread.start()
+
+    def predict(self, sentences: list, ids: Optional[list] = None) -> np.ndarray:
+        """Score the pairs, `ids` identify the documents for caching."""
+        if not sentences:
+            return np.array([], dtype=np.float32)
+
+        request = RerankRequest(sentences, ids)
+        with self.lock:
+            queued = not self.closed
+            if queued:
+                self.requests.put(request)
+        if not queued:
+            self.score([request])
+        return request.future.result()
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.requests.put(None)
+
+    def run(self):
+        closed = False
+        while not closed:
+            request = self.requests.get()
+            if request is None:
+                break
+
+            batch = [request]
+            size = len(request.sentences)
+            deadline = time.monotonic() + self.max_wait
+            while size < self.batch_size:
+                try:
+                    request = self.requests.get(
+                        timeout=max(deadline - time.monotonic(), 0)
+                    )
+                except queue.Empty:
+                    break
+
+                if request is None:
+                    closed = True
+                    break
+
+                batch.append(request)
+                size += len(request.sentences)
+
+            self.score(batch)
+
+        # Nothing is queued after close(), but never leave a caller waiting
+        while True:
+            try:
+                request = self.requests.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None:
+                request.future.set_exception(RuntimeError("Reranker is closed"))
+
+    def score(self, batch: list[RerankRequest]):
+        start = time.perf_counter()
+        try:
+            if hasattr(self.model, "predict_batch"):
+                results = self.model.predict_batch(
+                    [(request.sentences, request.ids) for request in batch]
+                )
+            else:
+                scores = np.asarray(
+                    self.model.predict(
+                        [pair for request in batch for pair in request.sentences],
+                        batch_size=self.batch_size,
+                    )
+                )
+                results = np.split(
+                    scores,
+                    np.cumsum([len(request.sentences) for request in batch])[:-1],
+                )
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        log.debug(
+            f"Reranked {sum(len(request.sentences) for request in batch)} pairs "
+            f"of {len(batch)} requests in {time.perf_counter() - start:.3f}s"
+        )
+        for request, request_scores in zip(batch, results):
+            request.future.set_result(request_scores)
@@ -1,9 +1,13 @@
+import heapq
+import itertools
 import logging
 import os
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Union
 
 import asyncio
+import numpy as np
 import requests
 
 from huggingface_hub import snapshot_download
@@ -12,8 +16,9 @@ from langchain_community.retrievers import BM25Retriever
 from langchain_core.documents import Document
 
 
-from open_webui.config import VECTOR_DB
+from open_webui.config import VECTOR_DB, RAG_QUERY_CONCURRENCY
 from open_webui.retrieval.vector.connector import VECTOR_DB_CLIENT
+from open_webui.retrieval.embedding_cache import EMBEDDING_CACHE
 from open_webui.utils.misc import get_last_user_message
 from open_webui.models.users import UserModel
 
@@ -26,6 +31,14 @@ from open_webui.env import (
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["RAG"])
 
+# Shared, bounded pool for the per-collection vector DB searches of a RAG turn
+RAG_QUERY_EXECUTOR = ThreadPoolExecutor(
+    max_workers=RAG_QUERY_CONCURRENCY, thread_name_prefix="rag-query"
+)
+
+# Stored vectors of hybrid search candidates, removed again by RerankCompressor
+VECTOR_METADATA_KEY = "__vector__"
+
 
 from typing import Any
 
@@ -48,23 +61,55 @@ class VectorSearchRetriever(BaseRetriever):
             collection_name=self.collection_name,
             vectors=[self.embedding_function(query)],
             limit=self.top_k,
+            include_vectors=True,
         )
 
         ids = result.ids[0]
         metadatas = result.metadatas[0]
         documents = result.documents[0]
+        vectors = result.vectors[0] if result.vectors else [None] * len(ids)
 
         results = []
         for idx in range(len(ids)):
             results.append(
                 Document(
-                    metadata=metadatas[idx],
+                    id=ids[idx],
+                    metadata={
+                        **(metadatas[idx] or {}),
+                        VECTOR_METADATA_KEY: vectors[idx],
+                    },
                     page_content=documents[idx],
                 )
             )
         return results
 
 
+class BM25SearchRetriever(BaseRetriever):
+    collection_name: Any
+    top_k: int
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+    ) -> list[Document]:
+        result = VECTOR_DB_CLIENT.bm25_search(
+            collection_name=self.collection_name,
+            query=query,
+            limit=self.top_k,
+        )
+        if result is None:
+            return []
+
+        return [
+            Document(id=id, metadata=metadata, page_content=document)
+            for id, document, metadata in zip(
+                result.ids[0], result.documents[0], result.metadatas[0]
+            )
+        ]
+
+
 def query_doc(
     collection_name: str, query_embedding: list[float], k: int, user: UserModel = None
 ):
@@ -93,13 +138,23 @@ def query_doc_with_hybrid_search(
     r: float,
 ) -> dict:
     try:
-        result = VECTOR_DB_CLIENT.get(collection_name=collection_name)
+        if hasattr(VECTOR_DB_CLIENT, "bm25_search"):
+            bm25_retriever = BM25SearchRetriever(
+                collection_name=collection_name,
+                top_k=k,
+            )
+        else:
+            # Only the few BM25 hits the vector search missed are embedded
+            # again, loading every stored vector would cost far more
+            result = VECTOR_DB_CLIENT.get(collection_name=collection_name)
 
-        bm25_retriever = BM25Retriever.from_texts(
-            texts=result.documents[0],
-            metadatas=result.metadatas[0],
-        )
-        bm25_retriever.k = k
+            bm25_retriever = BM25Retriever.from_texts(
+                texts=result.documents[0],
+                metadatas=result.metadatas[0],
+            )
+            for doc, id in zip(bm25_retriever.docs, result.ids[0]):
+                doc.id = id
+            bm25_retriever.k = k
 
         vector_search_retriever = VectorSearchRetriever(
             collection_name=collection_name,
@@ -107,8 +162,10 @@ def query_doc_with_hybrid_search(
             top_k=k,
         )
 
+        # Duplicates are kept as found first, the vector search ones come
+        # with their vectors. The compressor sorts the candidates again.
         ensemble_retriever = EnsembleRetriever(
-            retrievers=[bm25_retriever, vector_search_retriever], weights=[0.5, 0.5]
+            retrievers=[vector_search_retriever, bm25_retriever], weights=[0.5, 0.5]
         )
         compressor = RerankCompressor(
             embedding_function=embedding_function,
@@ -140,69 +197,75 @@ def query_doc_with_hybrid_search(
 def merge_and_sort_query_results(
     query_results: list[dict], k: int, reverse: bool = False
 ) -> list[dict]:
-    # Initialize lists to store combined data
-    combined_distances = []
-    combined_documents = []
-    combined_metadatas = []
-
-    for data in query_results:
-        combined_distances.extend(data["distances"][0])
-        combined_documents.extend(data["documents"][0])
-        combined_metadatas.extend(data["metadatas"][0])
-
-    # Create a list of tuples (distance, document, metadata)
-    combined = list(zip(combined_distances, combined_documents, combined_metadatas))
-
-    # Sort the list based on distances
-    combined.sort(key=lambda x: x[0], reverse=reverse)
-
-    # We don't have anything :-(
-    if not combined:
-        sorted_distances = []
-        sorted_documents = []
-        sorted_metadatas = []
-    else:
-        # Unzip the sorted list
-        sorted_distances, sorted_documents, sorted_metadatas = zip(*combined)
-
-        # Slicing the lists to include only k elements
-        sorted_distances = list(sorted_distances)[:k]
-        sorted_documents = list(sorted_documents)[:k]
-        sorted_metadatas = list(sorted_metadatas)[:k]
+    # Each result is a small, individually sortable run; merge the runs with a
+    # k-way heap and stop after the first k items instead of sorting everything.
+    runs = [
+        sorted(
+            zip(
+                data["distances"][0],
+                data["documents"][0],
+                data["metadatas"][0],
+            ),
+            key=lambda x: x[0],
+            reverse=reverse,
+        )
+        for data in query_results
+    ]
+    merged = list(
+        itertools.islice(heapq.merge(*runs, key=lambda x: x[0], reverse=reverse), k)
+    )
 
     # Create the output dictionary
     result = {
-        "distances": [sorted_distances],
-        "documents": [sorted_documents],
-        "metadatas": [sorted_metadatas],
+        "distances": [[distance for distance, _, _ in merged]],
+        "documents": [[document for _, document, _ in merged]],
+        "metadatas": [[metadata for _, _, metadata in merged]],
     }
 
     return result
 
 
+def get_query_embeddings(queries: list[str], embedding_function) -> dict:
+    # Embed all queries in a single (batched) call
+    queries = list(dict.fromkeys(queries))
+    embeddings = embedding_function(queries)
+    if embeddings is None or len(embeddings) != len(queries):
+        raise Exception("Failed to generate query embeddings")
+    return dict(zip(queries, embeddings))
+
+
 def query_collection(
     collection_names: list[str],
     queries: list[str],
     embedding_function,
     k: int,
 ) -> dict:
-    results = []
-    for query in queries:
-        query_embedding = embedding_function(query)
-        for collection_name in collection_names:
-            if collection_name:
-                try:
-                    result = query_doc(
-                        collection_name=collection_name,
-                        k=k,
-                        query_embedding=query_embedding,
-                    )
-                    if result is not None:
-                        results.append(result.model_dump())
-                except Exception as e:
-                    log.exception(f"Error when querying the collection: {e}")
-            else:
-                pass
+    query_embeddings = get_query_embeddings(queries, embedding_function)
+
+    def process_query(collection_name, query_embedding):
+        try:
+            result = query_doc(
+                collection_name=collection_name,
+                k=k,
+                query_embedding=query_embedding,
+            )
+            if result is not None:
+                return result.model_dump()
+        except Exception as e:
+            log.exception(f"Error when querying the collection: {e}")
+        return None
+
+    futures = [
+        RAG_QUERY_EXECUTOR.submit(process_query, collection_name, query_embedding)
+        for query_embedding in query_embeddings.values()
+        for collection_name in collection_names
+        if collection_name
+    ]
+    results = [
+        result
+        for result in (future.result() for future in futures)
+        if result is not None
+    ]
 
     if VECTOR_DB == "chroma":
         # Chroma uses unconventional cosine similarity, so we don't need to reverse the results
@@ -220,20 +283,34 @@ def query_collection_with_hybrid_search(
     reranking_function,
     r: float,
 ) -> dict:
+    query_embeddings = get_query_embeddings(queries, embedding_function)
+
+    def cached_embedding_function(query):
+        if isinstance(query, str) and query in query_embeddings:
+            return query_embeddings[query]
+        return embedding_function(query)
+
+    def process_query(collection_name, query):
+        return query_doc_with_hybrid_search(
+            collection_name=collection_name,
+            query=query,
+            embedding_function=cached_embedding_function,
+            k=k,
+            reranking_function=reranking_function,
+            r=r,
+        )
+
+    futures = [
+        RAG_QUERY_EXECUTOR.submit(process_query, collection_name, query)
+        for collection_name in collection_names
+        for query in query_embeddings
+    ]
+
     results = []
     error = False
-    for collection_name in collection_names:
+    for future in futures:
         try:
-            for query in queries:
-                result = query_doc_with_hybrid_search(
-                    collection_name=collection_name,
-                    query=query,
-                    embedding_function=embedding_function,
-                    k=k,
-                    reranking_function=reranking_function,
-                    r=r,
-                )
-                results.append(result)
+            results.append(future.result())
         except Exception as e:
             log.exception(
                 "Error when querying the collection with " f"hybrid_search: {e}"
@@ -262,7 +339,7 @@ def get_embedding_function(
     embedding_batch_size,
 ):
     if embedding_engine == "":
-        return lambda query, user=None: embedding_function.encode(query).tolist()
+        func = lambda query, user=None: embedding_function.encode(query).tolist()
     elif embedding_engine in ["ollama", "openai"]:
         func = lambda query, user=None: generate_embeddings(
             engine=embedding_engine,
@@ -284,10 +361,20 @@ def get_embedding_function(
             else:
                 return func(query, user)
 
-        return lambda query, user=None: generate_multiple(query, user, func)
+        func = lambda query, user=None, func=func: generate_multiple(query, user, func)
     else:
         raise ValueError(f"Unknown embedding engine: {embedding_engine}")
 
+    if EMBEDDING_CACHE is None:
+        return func
+
+    return lambda query, user=None: EMBEDDING_CACHE.embed(
+        embedding_engine,
+        embedding_model,
+        query,
+        lambda texts: func(texts, user=user),
+    )
+
 
 def get_sources_from_files(
     files,
@@ -556,18 +643,17 @@ class RerankCompressor(BaseDocumentCompressor):
     ) -> Sequence[Document]:
         reranking = self.reranking_function is not None
 
+        vectors = []
+        for doc in documents:
+            vectors.append(doc.metadata.pop(VECTOR_METADATA_KEY, None))
+
         if reranking:
             scores = self.reranking_function.predict(
-                [(query, doc.page_content) for doc in documents]
+                [(query, doc.page_content) for doc in documents],
+                ids=[doc.id for doc in documents],
             )
         else:
-            from sentence_transformers import util
-
-            query_embedding = self.embedding_function(query)
-            document_embedding = self.embedding_function(
-                [doc.page_content for doc in documents]
-            )
-            scores = util.cos_sim(query_embedding, document_embedding)[0]
+            scores = self.get_similarities(query, documents, vectors)
 
         docs_with_scores = list(zip(documents, scores.tolist()))
         if self.r_score:
@@ -586,3 +672,29 @@ class RerankCompressor(BaseDocumentCompressor):
             )
             final_results.append(doc)
         return final_results
+
+    def get_similarities(
+        self, query: str, documents: Sequence[Document], vectors: list
+    ) -> np.ndarray:
+        """Cosine similarity of the query to each document."""
+        # Only documents found without their stored vector are embedded
+        missing = [idx for idx, vector in enumerate(vectors) if vector is None]
+        if missing:
+            embeddings = self.embedding_function(
+                [documents[idx].page_content for idx in missing]
+            )
+            for idx, embedding in zip(missing, embeddings):
+                vectors[idx] = embedding
+
+        query_vector = np.asarray(self.embedding_function(query), dtype=np.float32)
+        vectors = [np.asarray(vector, dtype=np.float32) for vector in vectors]
+
+        # Some vector DBs store vectors padded with zeros to a fixed length
+        dimension = max(len(query_vector), *(len(vector) for vector in vectors))
+        matrix = np.zeros((len(vectors), dimension), dtype=np.float32)
+        for idx, vector in enumerate(vectors):
+            matrix[idx, : len(vector)] = vector
+        query_vector = np.pad(query_vector, (0, dimension - len(query_vector)))
+
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query_vector)
+        return (matrix @ query_vector) / np.maximum(norms, 1e-12)
@@ -0,0 +1,317 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Optional
+
+from open_webui.retrieval.vector.main import VectorItem, SearchResult, GetResult
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def is_fts5_available() -> bool:
+    try:
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE VIRTUAL TABLE fts5_check USING fts5(text)")
+        conn.close()
+        return True
+    except sqlite3.Error:
+        return False
+
+
+class BM25Index:
+    """
+    Persistent lexical index, one SQLite FTS5 database per collection.
+
+    Chunks live in a regular table keyed by the vector DB item id so that
+    deletes by id or by metadata filter stay indexed lookups; an external
+    content FTS5 table is kept in sync with triggers and ranked with bm25().
+    """
+
+    def __init__(self, index_dir: str):
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+
+        self.locks: dict[str, threading.Lock] = {}
+        self.locks_lock = threading.Lock()
+
+    def get_lock(self, collection_name: str) -> threading.Lock:
+        # Held while a collection's index is built or written to
+        with self.locks_lock:
+            return self.locks.setdefault(collection_name, threading.Lock())
+
+    def _get_index_path(self, collection_name: str) -> Path:
+        # Collection names are mostly uuids/hashes, but don't trust them as file names
+        safe_name = re.sub(r"[^A-Za-z0-9_-]", "_", collection_name)[:64]
+        digest = hashlib.sha256(collection_name.encode()).hexdigest()[:16]
+        return self.index_dir / f"{safe_name}-{digest}.sqlite3"
+
+    @contextmanager
+    def _connect(self, collection_name: str, create: bool = True):
+        with self._connect_path(
+            self._get_index_path(collection_name), create=create
+        ) as conn:
+            yield conn
+
+    @contextmanager
+    def _connect_path(self, path: Path, wal: bool = True, create: bool = True):
+        conn = sqlite3.connect(
+            f"{path.absolute().as_uri()}?mode={'rwc' if create else 'rw'}",
+            uri=True,
+            timeout=30,
+        )
+        try:
+            if wal:
+                conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS chunk (
+                    rowid INTEGER PRIMARY KEY,
+                    id TEXT NOT NULL UNIQUE,
+                    text TEXT NOT NULL,
+                    metadata TEXT
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS chunk_fts USING fts5(
+                    text,
+                    content='chunk',
+                    content_rowid='rowid',
+                    tokenize='unicode61 remove_diacritics 2'
+                );
+                CREATE TRIGGER IF NOT EXISTS chunk_ai AFTER INSERT ON chunk BEGIN
+                    INSERT INTO chunk_fts(rowid, text) VALUES (new.rowid, new.text);
+                END;
+                CREATE TRIGGER IF NOT EXISTS chunk_ad AFTER DELETE ON chunk BEGIN
+                    INSERT INTO chunk_fts(chunk_fts, rowid, text)
+                    VALUES ('delete', old.rowid, old.text);
+                END;
+                """
+            )
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def has_index(self, collection_name: str) -> bool:
+        return self._get_index_path(collection_name).exists()
+
+    def _write(self, conn, items: list[VectorItem]):
+        conn.executemany(
+            "DELETE FROM chunk WHERE id = ?",
+            [(str(item["id"]),) for item in items],
+        )
+        conn.executemany(
+            "INSERT INTO chunk (id, text, metadata) VALUES (?, ?, ?)",
+            [
+                (
+                    str(item["id"]),
+                    item["text"] or "",
+                    json.dumps(item["metadata"], default=str),
+                )
+                for item in items
+            ],
+        )
+
+    def upsert(self, collection_name: str, items: list[VectorItem]):
+        if not items:
+            return
+
+        with self._connect(collection_name) as conn:
+            self._write(conn, items)
+
+    def build(self, collection_name: str, result: GetResult):
+        """
+        (Re)build the index of a collection from a full vector DB `get`.
+
+        The index is written to a temporary file that replaces the old one
+        once complete, so searches never see a partial index. Empty
+        collections get an empty index. Call with the collection's lock.
+        """
+        path = self._get_index_path(collection_name)
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with self._connect_path(tmp_path, wal=False) as conn:
+                self._write(
+                    conn,
+                    [
+                        {
+                            "id": id,
+                            "text": result.documents[0][idx],
+                            "metadata": result.metadatas[0][idx],
+                        }
+                        for idx, id in enumerate(result.ids[0])
+                    ],
+                )
+
+            self.delete_collection(collection_name)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        log.info(f"built BM25 index for collection {collection_name}")
+
+    def delete(
+        self,
+        collection_name: str,
+        ids: Optional[list[str]] = None,
+        filter: Optional[dict] = None,
+    ):
+        if not self.has_index(collection_name):
+            return
+
+        with self._connect(collection_name) as conn:
+            if ids:
+                conn.executemany(
+                    "DELETE FROM chunk WHERE id = ?", [(str(id),) for id in ids]
+                )
+            elif filter:
+                conditions = " AND ".join(
+                    "json_extract(metadata, ?) = ?" for _ in filter
+                )
+                params = []
+                for key, value in filter.items():
+                    params.extend([f'$."{key}"', value])
+                conn.execute(f"DELETE FROM chunk WHERE {conditions}", params)
+
+    def delete_collection(self, collection_name: str):
+        path = self._get_index_path(collection_name)
+        for suffix in ["", "-wal", "-shm"]:
+            try:
+                os.remove(f"{path}{suffix}")
+            except FileNotFoundError:
+                pass
+
+    def reset(self):
+        shutil.rmtree(self.index_dir, ignore_errors=True)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+
+    def search(
+        self, collection_name: str, query: str, limit: int
+    ) -> Optional[SearchResult]:
+        if not self.has_index(collection_name):
+            return None
+
+        # Match any of the query terms; quoting keeps FTS5 syntax out of user input
+        tokens = TOKEN_PATTERN.findall(query.lower())
+        match = " OR ".join(f'"{token}"' for token in dict.fromkeys(tokens))
+
+        ids, documents, metadatas, distances = [], [], [], []
+        if match:
+            try:
+                # Don't create the index again if it was just deleted
+                with self._connect(collection_name, create=False) as conn:
+                    rows = conn.execute(
+                        """
+                        SELECT chunk.id, chunk.text, chunk.metadata, bm25(chunk_fts)
+                        FROM chunk_fts JOIN chunk ON chunk.rowid = chunk_fts.rowid
+                        WHERE chunk_fts MATCH ?
+                        ORDER BY bm25(chunk_fts)
+                        LIMIT ?
+                        """,
+                        (match, limit),
+                    ).fetchall()
+            except sqlite3.DatabaseError:
+                if self.has_index(collection_name):
+                    raise
+                return None
+
+            for id, text, metadata, score in rows:
+                ids.append(id)
+                documents.append(text)
+                metadatas.append(json.loads(metadata) if metadata else {})
+                # bm25() is negative, lower is better
+                distances.append(-score)
+
+        return SearchResult(
+            ids=[ids],
+            documents=[documents],
+            metadatas=[metadatas],
+            distances=[distances],
+        )
+
+
+class BM25IndexedVectorDBClient:
+    """
+    Wraps a vector DB client and mirrors every write into the BM25 index,
+    so all insert/upsert/delete call sites keep the lexical index current.
+    """
+
+    def __init__(self, client: Any, index: BM25Index):
+        self.client = client
+        self.bm25_index = index
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def _should_index(self, collection_name: str) -> bool:
+        # Collections that predate the index are backfilled lazily on first
+        # hybrid search; indexing a partial batch here would hide the rest.
+        return self.bm25_index.has_index(
+            collection_name
+        ) or not self.client.has_collection(collection_name=collection_name)
+
+    def insert(self, collection_name: str, items: list[VectorItem]):
+        with self.bm25_index.get_lock(collection_name):
+            should_index = self._should_index(collection_name)
+            result = self.client.insert(collection_name=collection_name, items=items)
+            if should_index:
+                self.bm25_index.upsert(collection_name, items)
+        return result
+
+    def upsert(self, collection_name: str, items: list[VectorItem]):
+        with self.bm25_index.get_lock(collection_name):
+            should_index = self._should_index(collection_name)
+            result = self.client.upsert(collection_name=collection_name, items=items)
+            if should_index:
+                self.bm25_index.upsert(collection_name, items)
+        return result
+
+    def delete(
+        self,
+        collection_name: str,
+        ids: Optional[list[str]] = None,
+        filter: Optional[dict] = None,
+    ):
+        # Not while the index is built from a snapshot that has the chunks
+        with self.bm25_index.get_lock(collection_name):
+            result = self.client.delete(
+                collection_name=collection_name, ids=ids, filter=filter
+            )
+            self.bm25_index.delete(collection_name, ids=ids, filter=filter)
+        return result
+
+    def delete_collection(self, collection_name: str):
+        with self.bm25_index.get_lock(collection_name):
+            self.bm25_index.delete_collection(collection_name)
+            return self.client.delete_collection(collection_name=collection_name)
+
+    def reset(self):
+        self.bm25_index.reset()
+        return self.client.reset()
+
+    def bm25_search(
+        self, collection_name: str, query: str, limit: int
+    ) -> Optional[SearchResult]:
+        if not self.bm25_index.has_index(collection_name):
+            # Concurrent searches wait for the first one to build the index
+            with self.bm25_index.get_lock(collection_name):
+                if not self.bm25_index.has_index(collection_name):
+                    result = self.client.get(collection_name=collection_name)
+                    if result is None:
+                        return None
+                    self.bm25_index.build(collection_name, result)
+
+        return self.bm25_index.search(collection_name, query, limit)
@@ -1,4 +1,4 @@
-from open_webui.config import VECTOR_DB
+from open_webui.config import VECTOR_DB, ENABLE_RAG_BM25_INDEX, BM25_INDEX_DIR
 
 if VECTOR_DB == "milvus":
     from open_webui.retrieval.vector.dbs.milvus import MilvusClient
@@ -20,3 +20,15 @@ else:
     from open_webui.retrieval.vector.dbs.chroma import ChromaClient
 
     VECTOR_DB_CLIENT = ChromaClient()
+
+if ENABLE_RAG_BM25_INDEX:
+    from open_webui.retrieval.vector.bm25 import (
+        BM25Index,
+        BM25IndexedVectorDBClient,
+        is_fts5_available,
+    )
+
+    if is_fts5_available():
+        VECTOR_DB_CLIENT = BM25IndexedVectorDBClient(
+            VECTOR_DB_CLIENT, BM25Index(BM25_INDEX_DIR)
+        )
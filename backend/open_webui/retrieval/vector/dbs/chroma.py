@@ -59,7 +59,11 @@ class ChromaClient:
         return self.client.delete_collection(name=collection_name)
 
     def search(
-        self, collection_name: str, vectors: list[list[float | int]], limit: int
+        self,
+        collection_name: str,
+        vectors: list[list[float | int]],
+        limit: int,
+        include_vectors: bool = False,
     ) -> Optional[SearchResult]:
         # Search for the nearest neighbor items based on the vectors and return 'limit' number of results.
         try:
@@ -68,6 +72,12 @@ class ChromaClient:
                 result = collection.query(
                     query_embeddings=vectors,
                     n_results=limit,
+                    include=[
+                        "documents",
+                        "metadatas",
+                        "distances",
+                        *(["embeddings"] if include_vectors else []),
+                    ],
                 )
 
                 return SearchResult(
@@ -76,6 +86,7 @@ class ChromaClient:
                         "distances": result["distances"],
                         "documents": result["documents"],
                         "metadatas": result["metadatas"],
+                        "vectors": (result["embeddings"] if include_vectors else None),
                     }
                 )
             return None
@@ -106,16 +117,25 @@ class ChromaClient:
             print(e)
             return None
 
-    def get(self, collection_name: str) -> Optional[GetResult]:
+    def get(
+        self, collection_name: str, include_vectors: bool = False
+    ) -> Optional[GetResult]:
         # Get all the items in the collection.
         collection = self.client.get_collection(name=collection_name)
         if collection:
-            result = collection.get()
+            result = collection.get(
+                include=[
+                    "documents",
+                    "metadatas",
+                    *(["embeddings"] if include_vectors else []),
+                ]
+            )
             return GetResult(
                 **{
                     "ids": [result["ids"]],
                     "documents": [result["documents"]],
                     "metadatas": [result["metadatas"]],
+                    "vectors": [result["embeddings"]] if include_vectors else None,
                 }
             )
         return None
@@ -20,54 +20,65 @@ class MilvusClient:
         else:
             self.client = Client(uri=MILVUS_URI, database=MILVUS_DB, token=MILVUS_TOKEN)
 
-    def _result_to_get_result(self, result) -> GetResult:
+    def _result_to_get_result(self, result, include_vectors: bool = False) -> GetResult:
         ids = []
         documents = []
         metadatas = []
+        vectors = []
 
         for match in result:
             _ids = []
             _documents = []
             _metadatas = []
+            _vectors = []
             for item in match:
                 _ids.append(item.get("id"))
                 _documents.append(item.get("data", {}).get("text"))
                 _metadatas.append(item.get("metadata"))
+                _vectors.append(item.get("vector"))
 
             ids.append(_ids)
             documents.append(_documents)
             metadatas.append(_metadatas)
+            vectors.append(_vectors)
 
         return GetResult(
             **{
                 "ids": ids,
                 "documents": documents,
                 "metadatas": metadatas,
+                "vectors": vectors if include_vectors else None,
             }
         )
 
-    def _result_to_search_result(self, result) -> SearchResult:
+    def _result_to_search_result(
+        self, result, include_vectors: bool = False
+    ) -> SearchResult:
         ids = []
         distances = []
         documents = []
         metadatas = []
+        vectors = []
 
         for match in result:
             _ids = []
             _distances = []
             _documents = []
             _metadatas = []
+            _vectors = []
 
             for item in match:
                 _ids.append(item.get("id"))
                 _distances.append(item.get("distance"))
                 _documents.append(item.get("entity", {}).get("data", {}).get("text"))
                 _metadatas.append(item.get("entity", {}).get("metadata"))
+                _vectors.append(item.get("entity", {}).get("vector"))
 
             ids.append(_ids)
             distances.append(_distances)
             documents.append(_documents)
             metadatas.append(_metadatas)
+            vectors.append(_vectors)
 
         return SearchResult(
             **{
@@ -75,6 +86,7 @@ class MilvusClient:
                 "distances": distances,
                 "documents": documents,
                 "metadatas": metadatas,
+                "vectors": vectors if include_vectors else None,
             }
         )
 
@@ -129,7 +141,11 @@ class MilvusClient:
         )
 
     def search(
-        self, collection_name: str, vectors: list[list[float | int]], limit: int
+        self,
+        collection_name: str,
+        vectors: list[list[float | int]],
+        limit: int,
+        include_vectors: bool = False,
     ) -> Optional[SearchResult]:
         # Search for the nearest neighbor items based on the vectors and return 'limit' number of results.
         collection_name = collection_name.replace("-", "_")
@@ -137,10 +153,14 @@ class MilvusClient:
             collection_name=f"{self.collection_prefix}_{collection_name}",
             data=vectors,
             limit=limit,
-            output_fields=["data", "metadata"],
+            output_fields=[
+                "data",
+                "metadata",
+                *(["vector"] if include_vectors else []),
+            ],
         )
 
-        return self._result_to_search_result(result)
+        return self._result_to_search_result(result, include_vectors)
 
     def query(self, collection_name: str, filter: dict, limit: Optional[int] = None):
         # Construct the filter string for querying
@@ -201,14 +221,17 @@ class MilvusClient:
             print(e)
             return None
 
-    def get(self, collection_name: str) -> Optional[GetResult]:
+    def get(
+        self, collection_name: str, include_vectors: bool = False
+    ) -> Optional[GetResult]:
         # Get all the items in the collection.
         collection_name = collection_name.replace("-", "_")
         result = self.client.query(
             collection_name=f"{self.collection_prefix}_{collection_name}",
             filter='id != ""',
+            **({"output_fields": ["*"]} if include_vectors else {}),
         )
-        return self._result_to_get_result([result])
+        return self._result_to_get_result([result], include_vectors)
 
     def insert(self, collection_name: str, items: list[VectorItem]):
         # Insert the items into the collection, if the collection does not exist, it will be created.
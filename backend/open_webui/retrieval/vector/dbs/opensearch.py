@@ -21,32 +21,45 @@ class OpenSearchClient:
             http_auth=(OPENSEARCH_USERNAME, OPENSEARCH_PASSWORD),
         )
 
-    def _result_to_get_result(self, result) -> GetResult:
+    def _result_to_get_result(self, result, include_vectors=False) -> GetResult:
         ids = []
         documents = []
         metadatas = []
+        vectors = []
 
         for hit in result["hits"]["hits"]:
             ids.append(hit["_id"])
             documents.append(hit["_source"].get("text"))
             metadatas.append(hit["_source"].get("metadata"))
+            vectors.append(hit["_source"].get("vector"))
 
-        return GetResult(ids=ids, documents=documents, metadatas=metadatas)
+        return GetResult(
+            ids=ids,
+            documents=documents,
+            metadatas=metadatas,
+            vectors=vectors if include_vectors else None,
+        )
 
-    def _result_to_search_result(self, result) -> SearchResult:
+    def _result_to_search_result(self, result, include_vectors=False) -> SearchResult:
         ids = []
         distances = []
         documents = []
         metadatas = []
+        vectors = []
 
         for hit in result["hits"]["hits"]:
             ids.append(hit["_id"])
             distances.append(hit["_score"])
             documents.append(hit["_source"].get("text"))
             metadatas.append(hit["_source"].get("metadata"))
+            vectors.append(hit["_source"].get("vector"))
 
         return SearchResult(
-            ids=ids, distances=distances, documents=documents, metadatas=metadatas
+            ids=ids,
+            distances=distances,
+            documents=documents,
+            metadatas=metadatas,
+            vectors=vectors if include_vectors else None,
         )
 
     def _create_index(self, index_name: str, dimension: int):
@@ -89,11 +102,15 @@ class OpenSearchClient:
         self.client.indices.delete(index=f"{self.index_prefix}_{index_name}")
 
     def search(
-        self, index_name: str, vectors: list[list[float]], limit: int
+        self,
+        index_name: str,
+        vectors: list[list[float]],
+        limit: int,
+        include_vectors: bool = False,
     ) -> Optional[SearchResult]:
         query = {
             "size": limit,
-            "_source": ["text", "metadata"],
+            "_source": ["text", "metadata", *(["vector"] if include_vectors else [])],
             "query": {
                 "script_score": {
                     "query": {"match_all": {}},
@@ -111,19 +128,24 @@ class OpenSearchClient:
             index=f"{self.index_prefix}_{index_name}", body=query
         )
 
-        return self._result_to_search_result(result)
+        return self._result_to_search_result(result, include_vectors)
 
     def get_or_create_index(self, index_name: str, dimension: int):
         if not self.has_index(index_name):
             self._create_index(index_name, dimension)
 
-    def get(self, index_name: str) -> Optional[GetResult]:
-        query = {"query": {"match_all": {}}, "_source": ["text", "metadata"]}
+    def get(
+        self, index_name: str, include_vectors: bool = False
+    ) -> Optional[GetResult]:
+        query = {
+            "query": {"match_all": {}},
+            "_source": ["text", "metadata", *(["vector"] if include_vectors else [])],
+        }
 
         result = self.client.search(
             index=f"{self.index_prefix}_{index_name}", body=query
         )
-        return self._result_to_get_result(result)
+        return self._result_to_get_result(result, include_vectors)
 
     def insert(self, index_name: str, items: list[VectorItem]):
         if not self.has_index(index_name):
@@ -195,6 +195,7 @@ class PgvectorClient:
         collection_name: str,
         vectors: List[List[float]],
         limit: Optional[int] = None,
+        include_vectors: bool = False,
     ) -> Optional[SearchResult]:
         try:
             if not vectors:
@@ -224,6 +225,7 @@ class PgvectorClient:
                     DocumentChunk.id,
                     DocumentChunk.text,
                     DocumentChunk.vmetadata,
+                    *([DocumentChunk.vector] if include_vectors else []),
                     (
                         DocumentChunk.vector.cosine_distance(query_vectors.c.q_vector)
                     ).label("distance"),
@@ -244,6 +246,7 @@ class PgvectorClient:
                     subq.c.id,
                     subq.c.text,
                     subq.c.vmetadata,
+                    *([subq.c.vector] if include_vectors else []),
                     subq.c.distance,
                 )
                 .select_from(query_vectors)
@@ -258,6 +261,7 @@ class PgvectorClient:
             distances = [[] for _ in range(num_queries)]
             documents = [[] for _ in range(num_queries)]
             metadatas = [[] for _ in range(num_queries)]
+            result_vectors = [[] for _ in range(num_queries)]
 
             if not results:
                 return SearchResult(
@@ -265,6 +269,7 @@ class PgvectorClient:
                     distances=distances,
                     documents=documents,
                     metadatas=metadatas,
+                    vectors=result_vectors if include_vectors else None,
                 )
 
             for row in results:
@@ -273,9 +278,15 @@ class PgvectorClient:
                 distances[qid].append(row.distance)
                 documents[qid].append(row.text)
                 metadatas[qid].append(row.vmetadata)
+                if include_vectors:
+                    result_vectors[qid].append(row.vector)
 
             return SearchResult(
-                ids=ids, distances=distances, documents=documents, metadatas=metadatas
+                ids=ids,
+                distances=distances,
+                documents=documents,
+                metadatas=metadatas,
+                vectors=result_vectors if include_vectors else None,
             )
         except Exception as e:
             print(f"Error during search: {e}")
@@ -314,7 +325,10 @@ class PgvectorClient:
             return None
 
     def get(
-        self, collection_name: str, limit: Optional[int] = None
+        self,
+        collection_name: str,
+        limit: Optional[int] = None,
+        include_vectors: bool = False,
     ) -> Optional[GetResult]:
         try:
             query = self.session.query(DocumentChunk).filter(
@@ -331,8 +345,13 @@ class PgvectorClient:
             ids = [[result.id for result in results]]
             documents = [[result.text for result in results]]
             metadatas = [[result.vmetadata for result in results]]
+            vectors = (
+                [[result.vector for result in results]] if include_vectors else None
+            )
 
-            return GetResult(ids=ids, documents=documents, metadatas=metadatas)
+            return GetResult(
+                ids=ids, documents=documents, metadatas=metadatas, vectors=vectors
+            )
         except Exception as e:
             print(f"Error during get: {e}")
             return None
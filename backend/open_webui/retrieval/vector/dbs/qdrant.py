@@ -21,22 +21,25 @@ class QdrantClient:
             else None
         )
 
-    def _result_to_get_result(self, points) -> GetResult:
+    def _result_to_get_result(self, points, include_vectors=False) -> GetResult:
         ids = []
         documents = []
         metadatas = []
+        vectors = []
 
         for point in points:
             payload = point.payload
             ids.append(point.id)
             documents.append(payload["text"])
             metadatas.append(payload["metadata"])
+            vectors.append(point.vector)
 
         return GetResult(
             **{
                 "ids": [ids],
                 "documents": [documents],
                 "metadatas": [metadatas],
+                "vectors": [vectors] if include_vectors else None,
             }
         )
 
@@ -78,7 +81,11 @@ class QdrantClient:
         )
 
     def search(
-        self, collection_name: str, vectors: list[list[float | int]], limit: int
+        self,
+        collection_name: str,
+        vectors: list[list[float | int]],
+        limit: int,
+        include_vectors: bool = False,
     ) -> Optional[SearchResult]:
         # Search for the nearest neighbor items based on the vectors and return 'limit' number of results.
         if limit is None:
@@ -88,12 +95,14 @@ class QdrantClient:
             collection_name=f"{self.collection_prefix}_{collection_name}",
             query=vectors[0],
             limit=limit,
+            with_vectors=include_vectors,
         )
-        get_result = self._result_to_get_result(query_response.points)
+        get_result = self._result_to_get_result(query_response.points, include_vectors)
         return SearchResult(
             ids=get_result.ids,
             documents=get_result.documents,
             metadatas=get_result.metadatas,
+            vectors=get_result.vectors,
             distances=[[point.score for point in query_response.points]],
         )
 
@@ -123,13 +132,16 @@ class QdrantClient:
             print(e)
             return None
 
-    def get(self, collection_name: str) -> Optional[GetResult]:
+    def get(
+        self, collection_name: str, include_vectors: bool = False
+    ) -> Optional[GetResult]:
         # Get all the items in the collection.
         points = self.client.query_points(
             collection_name=f"{self.collection_prefix}_{collection_name}",
             limit=NO_LIMIT,  # otherwise qdrant would set limit to 10!
+            with_vectors=include_vectors,
         )
-        return self._result_to_get_result(points.points)
+        return self._result_to_get_result(points.points, include_vectors)
 
     def insert(self, collection_name: str, items: list[VectorItem]):
         # Insert the items into the collection, if the collection does not exist, it will be created.
@@ -13,6 +13,8 @@ class GetResult(BaseModel):
     ids: Optional[List[List[str]]]
     documents: Optional[List[List[str]]]
     metadatas: Optional[List[List[Any]]]
+    # Only with include_vectors, as lists or arrays
+    vectors: Optional[List[List[Any]]] = None
 
 
 class SearchResult(GetResult):
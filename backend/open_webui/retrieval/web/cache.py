@@ -0,0 +1,86 @@
+import logging
+from typing import Optional
+
+from langchain_core.documents import Document
+
+from open_webui.config import (
+    ENABLE_RAG_WEB_SEARCH_CACHE,
+    RAG_WEB_PAGE_CACHE_SIZE,
+    RAG_WEB_PAGE_CACHE_TTL,
+    RAG_WEB_SEARCH_CACHE_SIZE,
+    RAG_WEB_SEARCH_CACHE_TTL,
+)
+from open_webui.env import SRC_LOG_LEVELS
+from open_webui.utils.cache import TTLCache
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+class CachedPage:
+    def __init__(
+        self,
+        doc: Document,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ):
+        self.doc = doc
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class WebSearchCache:
+    """
+    Caches for web searches: the links the engine returned for a query,
+    the pages loaded from them and the collections they were embedded into.
+
+    Caches are kept in memory by each worker. A collection is reused as long
+    as the vector database still has it, otherwise it is rebuilt from the
+    cached pages, and the embedding cache spares most of the embedding.
+    """
+
+    def __init__(
+        self,
+        search_ttl: float,
+        search_max_entries: int,
+        page_ttl: float,
+        page_max_entries: int,
+    ):
+        # (engine, query, result count, domain filter) -> [SearchResult]
+        self.results = TTLCache(
+            "web_search_results", ttl=search_ttl, maxsize=search_max_entries
+        )
+        # url -> CachedPage
+        self.pages = TTLCache("web_pages", ttl=page_ttl, maxsize=page_max_entries)
+        # (collection name, queries, engine, result count, embedding model)
+        # -> [url]
+        self.collections = TTLCache(
+            "web_search_collections", ttl=search_ttl, maxsize=search_max_entries
+        )
+
+        # Expired pages the site confirmed to be unchanged
+        self.revalidated = 0
+
+    def clear(self):
+        self.results.clear()
+        self.pages.clear()
+        self.collections.clear()
+        log.info("web search cache cleared")
+
+    def get_stats(self) -> dict:
+        return {
+            "enabled": True,
+            "results": self.results.get_stats(),
+            "pages": {**self.pages.get_stats(), "revalidated": self.revalidated},
+            "collections": self.collections.get_stats(),
+        }
+
+
+WEB_SEARCH_CACHE = None
+if ENABLE_RAG_WEB_SEARCH_CACHE:
+    WEB_SEARCH_CACHE = WebSearchCache(
+        search_ttl=RAG_WEB_SEARCH_CACHE_TTL,
+        search_max_entries=RAG_WEB_SEARCH_CACHE_SIZE,
+        page_ttl=RAG_WEB_PAGE_CACHE_TTL,
+        page_max_entries=RAG_WEB_PAGE_CACHE_SIZE,
+    )
@@ -1,7 +1,8 @@
 import validators
 
+from itertools import zip_longest
 from typing import Optional
-from urllib.parse import urlparse
+from urllib.parse import urldefrag, urlparse
 
 from pydantic import BaseModel
 
@@ -24,3 +25,22 @@ class SearchResult(BaseModel):
     link: str
     title: Optional[str]
     snippet: Optional[str]
+
+
+def merge_search_results(results: list[list[SearchResult]]) -> list[str]:
+    """
+    Interleave the links found for several queries, best ranked first,
+    dropping links already found for another query.
+    """
+    urls = []
+    seen = set()
+    for ranked in zip_longest(*results):
+        for result in ranked:
+            if result is None:
+                continue
+
+            url = urldefrag(result.link).url
+            if url not in seen:
+                seen.add(url)
+                urls.append(url)
+    return urls
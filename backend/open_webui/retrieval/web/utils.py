@@ -1,17 +1,22 @@
+import asyncio
 import socket
 import urllib.parse
 import validators
-from typing import Union, Sequence, Iterator
+from typing import Optional, Union, Sequence, Iterator
 
+import aiohttp
+from bs4 import BeautifulSoup
 from langchain_community.document_loaders import (
     WebBaseLoader,
 )
+from langchain_community.document_loaders.web_base import default_header_template
 from langchain_core.documents import Document
 
 
 from open_webui.constants import ERROR_MESSAGES
-from open_webui.config import ENABLE_RAG_LOCAL_WEB_FETCH
+from open_webui.config import ENABLE_RAG_LOCAL_WEB_FETCH, RAG_WEB_LOADER_PER_HOST_LIMIT
 from open_webui.env import SRC_LOG_LEVELS
+from open_webui.retrieval.web.cache import WEB_SEARCH_CACHE, CachedPage, WebSearchCache
 
 import logging
 
@@ -65,6 +70,21 @@ def resolve_hostname(hostname):
     return ipv4_addresses, ipv6_addresses
 
 
+def get_page_document(path: str, soup: BeautifulSoup, **get_text_kwargs) -> Document:
+    text = soup.get_text(**get_text_kwargs)
+
+    # Build metadata
+    metadata = {"source": path}
+    if title := soup.find("title"):
+        metadata["title"] = title.get_text()
+    if description := soup.find("meta", attrs={"name": "description"}):
+        metadata["description"] = description.get("content", "No description found.")
+    if html := soup.find("html"):
+        metadata["language"] = html.get("lang", "No language found.")
+
+    return Document(page_content=text, metadata=metadata)
+
+
 class SafeWebBaseLoader(WebBaseLoader):
     """WebBaseLoader with enhanced error handling for URLs."""
 
@@ -73,25 +93,121 @@ class SafeWebBaseLoader(WebBaseLoader):
         for path in self.web_paths:
             try:
                 soup = self._scrape(path, bs_kwargs=self.bs_kwargs)
-                text = soup.get_text(**self.bs_get_text_kwargs)
-
-                # Build metadata
-                metadata = {"source": path}
-                if title := soup.find("title"):
-                    metadata["title"] = title.get_text()
-                if description := soup.find("meta", attrs={"name": "description"}):
-                    metadata["description"] = description.get(
-                        "content", "No description found."
-                    )
-                if html := soup.find("html"):
-                    metadata["language"] = html.get("lang", "No language found.")
-
-                yield Document(page_content=text, metadata=metadata)
+                yield get_page_document(path, soup, **self.bs_get_text_kwargs)
             except Exception as e:
                 # Log the error and continue with the next URL
                 log.error(f"Error loading {path}: {e}")
 
 
+class WebPageFetcher:
+    """
+    Loads web pages for web searches, with a session shared by all of them.
+
+    Connections are kept alive between searches, and at most
+    `limit_per_host` pages are loaded from one site at a time. Pages that
+    aren't HTML or text, or are larger than `max_size` bytes, are skipped.
+    Loaded pages are kept in the cache, and once they expire, only loaded
+    again if the site doesn't confirm they are unchanged.
+    """
+
+    def __init__(
+        self,
+        limit_per_host: int,
+        max_size: int = 5 * 1024 * 1024,
+        cache: Optional[WebSearchCache] = None,
+    ):
+        self.limit_per_host = limit_per_host
+        self.max_size = max_size
+        self.cache = cache
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    def get_session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=0, limit_per_host=self.limit_per_host, ttl_dns_cache=300
+                ),
+                headers=default_header_template,
+                trust_env=True,
+            )
+        return self.session
+
+    async def fetch(
+        self, url: str, timeout: float, verify_ssl: bool = True
+    ) -> Optional[Document]:
+        headers = {}
+        cached = None
+        if self.cache is not None:
+            if page := self.cache.pages.get(url):
+                return page.doc
+
+            if cached := self.cache.pages.peek(url):
+                if cached.etag:
+                    headers["If-None-Match"] = cached.etag
+                if cached.last_modified:
+                    headers["If-Modified-Since"] = cached.last_modified
+
+        try:
+            async with self.get_session().get(
+                url,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+                ssl=None if verify_ssl else False,
+            ) as r:
+                if r.status == 304 and cached is not None:
+                    self.cache.pages.set(url, cached)
+                    self.cache.revalidated += 1
+                    return cached.doc
+
+                r.raise_for_status()
+
+                content_type = r.headers.get("Content-Type", "text/html")
+                if not content_type.startswith(("text/", "application/xhtml")):
+                    log.debug(f"Skipping {url}: {content_type}")
+                    return None
+
+                if (r.content_length or 0) > self.max_size:
+                    log.debug(f"Skipping {url}: larger than {self.max_size} bytes")
+                    return None
+
+                body = bytearray()
+                async for chunk in r.content.iter_chunked(64 * 1024):
+                    body.extend(chunk)
+                    if len(body) > self.max_size:
+                        log.debug(f"Skipping {url}: larger than {self.max_size} bytes")
+                        return None
+
+            doc = await asyncio.to_thread(
+                lambda: get_page_document(
+                    url, BeautifulSoup(bytes(body), "html.parser")
+                )
+            )
+            if self.cache is not None:
+                if "no-store" in r.headers.get("Cache-Control", ""):
+                    self.cache.pages.delete(url)
+                else:
+                    self.cache.pages.set(
+                        url,
+                        CachedPage(
+                            doc,
+                            etag=r.headers.get("ETag"),
+                            last_modified=r.headers.get("Last-Modified"),
+                        ),
+                    )
+            return doc
+        except Exception as e:
+            log.error(f"Error loading {url}: {e}")
+            return None
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+web_page_fetcher = WebPageFetcher(RAG_WEB_LOADER_PER_HOST_LIMIT, cache=WEB_SEARCH_CACHE)
+
+
 def get_web_loader(
     urls: Union[str, Sequence[str]],
     verify_ssl: bool = True,
@@ -5,6 +5,7 @@ import os
 import uuid
 from functools import lru_cache
 from pathlib import Path
+from typing import Iterator, Optional
 from pydub import AudioSegment
 from pydub.silence import split_on_silence
 
@@ -23,11 +24,15 @@ from fastapi import (
     APIRouter,
 )
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
+from starlette.background import BackgroundTask
 
 
 from open_webui.utils.auth import get_admin_user, get_verified_user
+from open_webui.utils.transcription import whisper_engine
+from open_webui.utils.speech_cache import speech_cache
+from open_webui.utils.http import upstream_sessions, cleanup_response
 from open_webui.config import (
     WHISPER_MODEL_AUTO_UPDATE,
     WHISPER_MODEL_DIR,
@@ -52,8 +57,10 @@ MAX_FILE_SIZE = MAX_FILE_SIZE_MB * 1024 * 1024  # Convert MB to bytes
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["AUDIO"])
 
-SPEECH_CACHE_DIR = Path(CACHE_DIR).joinpath("./audio/speech/")
-SPEECH_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+SPEECH_CACHE_DIR = speech_cache.dir
+
+TRANSCRIPT_CACHE_DIR = Path(CACHE_DIR).joinpath("./audio/transcripts/")
+TRANSCRIPT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
 
 ##########################################
@@ -100,6 +107,7 @@ def set_faster_whisper_model(model: str, auto_update: bool = False):
             "compute_type": "int8",
             "download_root": WHISPER_MODEL_DIR,
             "local_files_only": not auto_update,
+            **whisper_engine.get_model_kwargs(),
         }
 
         try:
@@ -233,9 +241,37 @@ def load_speech_pipeline(request):
         )
 
 
+def stream_speech(name: str, payload: dict, r) -> StreamingResponse:
+    """Stream the upstream audio to the client, caching it along the way."""
+    return StreamingResponse(
+        speech_cache.tee(name, r.content.iter_chunked(8192), payload),
+        media_type=r.headers.get("Content-Type", "audio/mpeg"),
+        background=BackgroundTask(cleanup_response, response=r),
+    )
+
+
 @router.post("/speech")
 async def speech(request: Request, user=Depends(get_verified_user)):
-    body = await request.body()
+    return await generate_speech(request, user, await request.body())
+
+
+async def synthesize_speech(request: Request, user, payload: dict) -> tuple[bytes, str]:
+    """Synthesize speech for the payload, returning the audio and its media type."""
+    response = await generate_speech(request, user, json.dumps(payload).encode("utf-8"))
+
+    if isinstance(response, FileResponse):
+        async with aiofiles.open(response.path, "rb") as f:
+            return await f.read(), response.media_type
+
+    try:
+        audio = b"".join([chunk async for chunk in response.body_iterator])
+    finally:
+        if response.background:
+            await response.background()
+    return audio, response.media_type
+
+
+async def generate_speech(request: Request, user, body: bytes):
     name = hashlib.sha256(
         body
         + str(request.app.state.config.TTS_ENGINE).encode("utf-8")
@@ -246,8 +282,8 @@ async def speech(request: Request, user=Depends(get_verified_user)):
     file_body_path = SPEECH_CACHE_DIR.joinpath(f"{name}.json")
 
     # Check if the file already exists in the cache
-    if file_path.is_file():
-        return FileResponse(file_path)
+    if cached_path := speech_cache.get(name):
+        return FileResponse(cached_path)
 
     payload = None
     try:
@@ -259,36 +295,30 @@ async def speech(request: Request, user=Depends(get_verified_user)):
     if request.app.state.config.TTS_ENGINE == "openai":
         payload["model"] = request.app.state.config.TTS_MODEL
 
+        r = None
         try:
-            # print(payload)
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    url=f"{request.app.state.config.TTS_OPENAI_API_BASE_URL}/audio/speech",
-                    json=payload,
-                    headers={
-                        "Content-Type": "application/json",
-                        "Authorization": f"Bearer {request.app.state.config.TTS_OPENAI_API_KEY}",
-                        **(
-                            {
-                                "X-OpenWebUI-User-Name": user.name,
-                                "X-OpenWebUI-User-Id": user.id,
-                                "X-OpenWebUI-User-Email": user.email,
-                                "X-OpenWebUI-User-Role": user.role,
-                            }
-                            if ENABLE_FORWARD_USER_INFO_HEADERS
-                            else {}
-                        ),
-                    },
-                ) as r:
-                    r.raise_for_status()
-
-                    async with aiofiles.open(file_path, "wb") as f:
-                        await f.write(await r.read())
-
-                    async with aiofiles.open(file_body_path, "w") as f:
-                        await f.write(json.dumps(payload))
-
-            return FileResponse(file_path)
+            url = f"{request.app.state.config.TTS_OPENAI_API_BASE_URL}/audio/speech"
+            r = await upstream_sessions.get_session(url).post(
+                url=url,
+                json=payload,
+                headers={
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {request.app.state.config.TTS_OPENAI_API_KEY}",
+                    **(
+                        {
+                            "X-OpenWebUI-User-Name": user.name,
+                            "X-OpenWebUI-User-Id": user.id,
+                            "X-OpenWebUI-User-Email": user.email,
+                            "X-OpenWebUI-User-Role": user.role,
+                        }
+                        if ENABLE_FORWARD_USER_INFO_HEADERS
+                        else {}
+                    ),
+                },
+            )
+            r.raise_for_status()
+
+            return stream_speech(name, payload, r)
 
         except Exception as e:
             log.exception(e)
@@ -302,6 +332,8 @@ async def speech(request: Request, user=Depends(get_verified_user)):
                         detail = f"External: {res['error'].get('message', '')}"
             except Exception:
                 detail = f"External: {e}"
+            finally:
+                await cleanup_response(r)
 
             raise HTTPException(
                 status_code=getattr(r, "status", 500),
@@ -317,30 +349,25 @@ async def speech(request: Request, user=Depends(get_verified_user)):
                 detail="Invalid voice id",
             )
 
+        r = None
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}",
-                    json={
-                        "text": payload["input"],
-                        "model_id": request.app.state.config.TTS_MODEL,
-                        "voice_settings": {"stability": 0.5, "similarity_boost": 0.5},
-                    },
-                    headers={
-                        "Accept": "audio/mpeg",
-                        "Content-Type": "application/json",
-                        "xi-api-key": request.app.state.config.TTS_API_KEY,
-                    },
-                ) as r:
-                    r.raise_for_status()
-
-                    async with aiofiles.open(file_path, "wb") as f:
-                        await f.write(await r.read())
-
-                    async with aiofiles.open(file_body_path, "w") as f:
-                        await f.write(json.dumps(payload))
-
-            return FileResponse(file_path)
+            url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
+            r = await upstream_sessions.get_session(url).post(
+                url,
+                json={
+                    "text": payload["input"],
+                    "model_id": request.app.state.config.TTS_MODEL,
+                    "voice_settings": {"stability": 0.5, "similarity_boost": 0.5},
+                },
+                headers={
+                    "Accept": "audio/mpeg",
+                    "Content-Type": "application/json",
+                    "xi-api-key": request.app.state.config.TTS_API_KEY,
+                },
+            )
+            r.raise_for_status()
+
+            return stream_speech(name, payload, r)
 
         except Exception as e:
             log.exception(e)
@@ -353,6 +380,8 @@ async def speech(request: Request, user=Depends(get_verified_user)):
                         detail = f"External: {res['error'].get('message', '')}"
             except Exception:
                 detail = f"External: {e}"
+            finally:
+                await cleanup_response(r)
 
             raise HTTPException(
                 status_code=getattr(r, "status", 500),
@@ -371,29 +400,24 @@ async def speech(request: Request, user=Depends(get_verified_user)):
         locale = "-".join(request.app.state.config.TTS_VOICE.split("-")[:1])
         output_format = request.app.state.config.TTS_AZURE_SPEECH_OUTPUT_FORMAT
 
+        r = None
         try:
             data = f"""<speak version="1.0" xmlns="http://www.w3.org/2001/10/synthesis" xml:lang="{locale}">
                 <voice name="{language}">{payload["input"]}</voice>
             </speak>"""
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"https://{region}.tts.speech.microsoft.com/cognitiveservices/v1",
-                    headers={
-                        "Ocp-Apim-Subscription-Key": request.app.state.config.TTS_API_KEY,
-                        "Content-Type": "application/ssml+xml",
-                        "X-Microsoft-OutputFormat": output_format,
-                    },
-                    data=data,
-                ) as r:
-                    r.raise_for_status()
-
-                    async with aiofiles.open(file_path, "wb") as f:
-                        await f.write(await r.read())
-
-                    async with aiofiles.open(file_body_path, "w") as f:
-                        await f.write(json.dumps(payload))
-
-                    return FileResponse(file_path)
+            url = f"https://{region}.tts.speech.microsoft.com/cognitiveservices/v1"
+            r = await upstream_sessions.get_session(url).post(
+                url,
+                headers={
+                    "Ocp-Apim-Subscription-Key": request.app.state.config.TTS_API_KEY,
+                    "Content-Type": "application/ssml+xml",
+                    "X-Microsoft-OutputFormat": output_format,
+                },
+                data=data,
+            )
+            r.raise_for_status()
+
+            return stream_speech(name, payload, r)
 
         except Exception as e:
             log.exception(e)
@@ -406,6 +430,8 @@ async def speech(request: Request, user=Depends(get_verified_user)):
                         detail = f"External: {res['error'].get('message', '')}"
             except Exception:
                 detail = f"External: {e}"
+            finally:
+                await cleanup_response(r)
 
             raise HTTPException(
                 status_code=getattr(r, "status", 500),
@@ -452,32 +478,90 @@ async def speech(request: Request, user=Depends(get_verified_user)):
         return FileResponse(file_path)
 
 
-def transcribe(request: Request, file_path):
-    print("transcribe", file_path)
+def get_transcript_cache_path(request: Request, file_path) -> Path:
+    """Transcripts are reused for the same audio, engine and model."""
+    engine = request.app.state.config.STT_ENGINE
+    model = (
+        request.app.state.config.WHISPER_MODEL
+        if engine == ""
+        else request.app.state.config.STT_MODEL
+    )
+
+    file_hash = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while block := f.read(1024 * 1024):
+            file_hash.update(block)
+
+    key = hashlib.sha256(
+        f"{engine}:{model}:{file_hash.hexdigest()}".encode()
+    ).hexdigest()
+    return TRANSCRIPT_CACHE_DIR.joinpath(f"{key}.json")
+
+
+def get_cached_transcript(cache_path: Path):
+    if cache_path.is_file():
+        try:
+            with open(cache_path, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            log.warning(f"Failed to read cached transcript {cache_path}: {e}")
+    return None
+
+
+def save_transcript(file_path, data, cache_path: Optional[Path] = None):
     filename = os.path.basename(file_path)
     file_dir = os.path.dirname(file_path)
     id = filename.split(".")[0]
 
-    if request.app.state.config.STT_ENGINE == "":
-        if request.app.state.faster_whisper_model is None:
-            request.app.state.faster_whisper_model = set_faster_whisper_model(
-                request.app.state.config.WHISPER_MODEL
-            )
+    # save the transcript to a json file
+    transcript_file = f"{file_dir}/{id}.json"
+    with open(transcript_file, "w") as f:
+        json.dump(data, f)
+
+    if cache_path is not None:
+        with open(cache_path, "w") as f:
+            json.dump(data, f)
 
-        model = request.app.state.faster_whisper_model
-        segments, info = model.transcribe(file_path, beam_size=5)
-        log.info(
-            "Detected language '%s' with probability %f"
-            % (info.language, info.language_probability)
+
+def transcribe_segments(request: Request, file_path) -> Iterator[dict]:
+    """
+    Transcribe with the local Whisper model, yielding the segments as they
+    are decoded.
+    """
+    cache_path = get_transcript_cache_path(request, file_path)
+    data = get_cached_transcript(cache_path)
+    if data is not None and "segments" in data:
+        log.debug(f"Using cached transcript for {file_path}")
+        yield from data["segments"]
+        save_transcript(file_path, data)
+        return
+
+    if request.app.state.faster_whisper_model is None:
+        request.app.state.faster_whisper_model = set_faster_whisper_model(
+            request.app.state.config.WHISPER_MODEL
         )
 
-        transcript = "".join([segment.text for segment in list(segments)])
-        data = {"text": transcript.strip()}
+    segments = []
+    for segment in whisper_engine.transcribe(
+        request.app.state.faster_whisper_model, file_path
+    ):
+        segments.append(segment)
+        yield segment
 
-        # save the transcript to a json file
-        transcript_file = f"{file_dir}/{id}.json"
-        with open(transcript_file, "w") as f:
-            json.dump(data, f)
+    data = {
+        "text": "".join([segment["text"] for segment in segments]).strip(),
+        "segments": segments,
+    }
+    save_transcript(file_path, data, cache_path)
+
+
+def transcribe(request: Request, file_path):
+    print("transcribe", file_path)
+    filename = os.path.basename(file_path)
+
+    if request.app.state.config.STT_ENGINE == "":
+        segments = list(transcribe_segments(request, file_path))
+        data = {"text": "".join([segment["text"] for segment in segments]).strip()}
 
         log.debug(data)
         return data
@@ -487,6 +571,12 @@ def transcribe(request: Request, file_path):
             # Convert MP4 audio file to WAV format
             convert_mp4_to_wav(file_path.replace(".wav", ".mp4"), file_path)
 
+        cache_path = get_transcript_cache_path(request, file_path)
+        data = get_cached_transcript(cache_path)
+        if data is not None:
+            save_transcript(file_path, data)
+            return data
+
         r = None
         try:
             r = requests.post(
@@ -501,11 +591,7 @@ def transcribe(request: Request, file_path):
             r.raise_for_status()
             data = r.json()
 
-            # save the transcript to a json file
-            transcript_file = f"{file_dir}/{id}.json"
-            with open(transcript_file, "w") as f:
-                json.dump(data, f)
-
+            save_transcript(file_path, data, cache_path)
             return data
         except Exception as e:
             log.exception(e)
@@ -540,12 +626,7 @@ def compress_audio(file_path):
         return file_path
 
 
-@router.post("/transcriptions")
-def transcription(
-    request: Request,
-    file: UploadFile = File(...),
-    user=Depends(get_verified_user),
-):
+def save_audio_file(file: UploadFile) -> str:
     log.info(f"file.content_type: {file.content_type}")
 
     if file.content_type not in ["audio/mpeg", "audio/wav", "audio/ogg", "audio/x-m4a"]:
@@ -568,28 +649,28 @@ def transcription(
         with open(file_path, "wb") as f:
             f.write(contents)
 
-        try:
-            try:
-                file_path = compress_audio(file_path)
-            except Exception as e:
-                log.exception(e)
+        return compress_audio(file_path)
+    except Exception as e:
+        log.exception(e)
 
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=ERROR_MESSAGES.DEFAULT(e),
-                )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=ERROR_MESSAGES.DEFAULT(e),
+        )
 
-            data = transcribe(request, file_path)
-            file_path = file_path.split("/")[-1]
-            return {**data, "filename": file_path}
-        except Exception as e:
-            log.exception(e)
 
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=ERROR_MESSAGES.DEFAULT(e),
-            )
+@router.post("/transcriptions")
+def transcription(
+    request: Request,
+    file: UploadFile = File(...),
+    user=Depends(get_verified_user),
+):
+    file_path = save_audio_file(file)
 
+    try:
+        data = transcribe(request, file_path)
+        file_path = file_path.split("/")[-1]
+        return {**data, "filename": file_path}
     except Exception as e:
         log.exception(e)
 
@@ -599,6 +680,42 @@ def transcription(
         )
 
 
+@router.post("/transcriptions/stream")
+def transcription_stream(
+    request: Request,
+    file: UploadFile = File(...),
+    user=Depends(get_verified_user),
+):
+    """
+    Server-sent events with each segment ({start, end, text}) as soon as it
+    is decoded, then the whole transcript with `done` set. Engines other
+    than the local Whisper model only send the whole transcript.
+    """
+    file_path = save_audio_file(file)
+
+    def event_stream():
+        try:
+            if request.app.state.config.STT_ENGINE == "":
+                segments = []
+                for segment in transcribe_segments(request, file_path):
+                    segments.append(segment)
+                    yield f"data: {json.dumps(segment)}\n\n"
+
+                data = {
+                    "text": "".join([segment["text"] for segment in segments]).strip()
+                }
+            else:
+                data = transcribe(request, file_path)
+
+            filename = file_path.split("/")[-1]
+            yield f"data: {json.dumps({**data, 'filename': filename, 'done': True})}\n\n"
+        except Exception as e:
+            log.exception(e)
+            yield f"data: {json.dumps({'error': {'detail': str(e)}})}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 def get_available_models(request: Request) -> list[dict]:
     available_models = []
     if request.app.state.config.TTS_ENGINE == "openai":
@@ -9,6 +9,7 @@ from open_webui.models.functions import (
     Functions,
 )
 from open_webui.utils.plugin import load_function_module_by_id, replace_imports
+from open_webui.utils.function_cache import function_cache
 from open_webui.config import CACHE_DIR
 from open_webui.constants import ERROR_MESSAGES
 from fastapi import APIRouter, Depends, HTTPException, Request, status
@@ -72,6 +73,8 @@ async def create_new_function(
             function_cache_dir.mkdir(parents=True, exist_ok=True)
 
             if function:
+                function_cache.invalidate(form_data.id)
+                await request.app.state.MODEL_CATALOG.invalidate()
                 return function
             else:
                 raise HTTPException(
@@ -115,7 +118,9 @@ async def get_function_by_id(id: str, user=Depends(get_admin_user)):
 
 
 @router.post("/id/{id}/toggle", response_model=Optional[FunctionModel])
-async def toggle_function_by_id(id: str, user=Depends(get_admin_user)):
+async def toggle_function_by_id(
+    request: Request, id: str, user=Depends(get_admin_user)
+):
     function = Functions.get_function_by_id(id)
     if function:
         function = Functions.update_function_by_id(
@@ -123,6 +128,8 @@ async def toggle_function_by_id(id: str, user=Depends(get_admin_user)):
         )
 
         if function:
+            function_cache.invalidate(id)
+            await request.app.state.MODEL_CATALOG.invalidate()
             return function
         else:
             raise HTTPException(
@@ -142,7 +149,7 @@ async def toggle_function_by_id(id: str, user=Depends(get_admin_user)):
 
 
 @router.post("/id/{id}/toggle/global", response_model=Optional[FunctionModel])
-async def toggle_global_by_id(id: str, user=Depends(get_admin_user)):
+async def toggle_global_by_id(request: Request, id: str, user=Depends(get_admin_user)):
     function = Functions.get_function_by_id(id)
     if function:
         function = Functions.update_function_by_id(
@@ -150,6 +157,8 @@ async def toggle_global_by_id(id: str, user=Depends(get_admin_user)):
         )
 
         if function:
+            function_cache.invalidate(id)
+            await request.app.state.MODEL_CATALOG.invalidate()
             return function
         else:
             raise HTTPException(
@@ -188,6 +197,8 @@ async def update_function_by_id(
         function = Functions.update_function_by_id(id, updated)
 
         if function:
+            function_cache.invalidate(id)
+            await request.app.state.MODEL_CATALOG.invalidate()
             return function
         else:
             raise HTTPException(
@@ -217,6 +228,8 @@ async def delete_function_by_id(
         FUNCTIONS = request.app.state.FUNCTIONS
         if id in FUNCTIONS:
             del FUNCTIONS[id]
+        function_cache.invalidate(id)
+        await request.app.state.MODEL_CATALOG.invalidate()
 
     return result
 
@@ -297,6 +310,8 @@ async def update_function_valves_by_id(
                 form_data = {k: v for k, v in form_data.items() if v is not None}
                 valves = Valves(**form_data)
                 Functions.update_function_valves_by_id(id, valves.model_dump())
+                function_cache.invalidate(id)
+                await request.app.state.MODEL_CATALOG.invalidate()
                 return valves.model_dump()
             except Exception as e:
                 print(e)
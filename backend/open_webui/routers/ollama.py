@@ -1,19 +1,13 @@
-# TODO: Implement a more intelligent load balancing mechanism for distributing requests among multiple backend instances.
-# Current implementation uses a simple round-robin approach (random.choice). Consider incorporating algorithms like weighted round-robin,
-# least connections, or least response time for better resource utilization and performance optimization.
-
 import asyncio
 import json
 import logging
 import os
-import random
 import re
 import time
 from typing import Optional, Union
 from urllib.parse import urlparse
 
 import aiohttp
-from aiocache import cached
 
 import requests
 
@@ -42,7 +36,9 @@ from open_webui.utils.payload import (
     apply_model_system_prompt_to_body,
 )
 from open_webui.utils.auth import get_admin_user, get_verified_user
-from open_webui.utils.access_control import has_access
+from open_webui.utils.access_control import has_access, filter_accessible
+from open_webui.utils.http import upstream_sessions, cleanup_response
+from open_webui.utils.balancer import BackendRequest, ollama_balancer
 
 
 from open_webui.config import (
@@ -71,25 +67,39 @@ log.setLevel(SRC_LOG_LEVELS["OLLAMA"])
 async def send_get_request(url, key=None):
     timeout = aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT_OPENAI_MODEL_LIST)
     try:
-        async with aiohttp.ClientSession(timeout=timeout, trust_env=True) as session:
-            async with session.get(
-                url, headers={**({"Authorization": f"Bearer {key}"} if key else {})}
-            ) as response:
-                return await response.json()
+        session = upstream_sessions.get_session(url)
+        async with session.get(
+            url,
+            headers={**({"Authorization": f"Bearer {key}"} if key else {})},
+            timeout=timeout,
+        ) as response:
+            return await response.json()
     except Exception as e:
         # Handle connection error here
         log.error(f"Connection error: {e}")
         return None
 
 
-async def cleanup_response(
-    response: Optional[aiohttp.ClientResponse],
-    session: Optional[aiohttp.ClientSession],
+async def stream_response(r: aiohttp.ClientResponse, backend_request: BackendRequest):
+    failed = False
+    try:
+        async for line in r.content:
+            backend_request.first_token()
+            yield line
+    except aiohttp.ClientError:
+        failed = True
+        raise
+    finally:
+        backend_request.finish(failed)
+
+
+async def cleanup_backend_request(
+    r: aiohttp.ClientResponse, backend_request: Optional[BackendRequest]
 ):
-    if response:
-        response.close()
-    if session:
-        await session.close()
+    # In case the response was never streamed
+    if backend_request:
+        backend_request.finish()
+    await cleanup_response(r)
 
 
 async def send_post_request(
@@ -98,13 +108,12 @@ async def send_post_request(
     stream: bool = True,
     key: Optional[str] = None,
     content_type: Optional[str] = None,
+    backend_request: Optional[BackendRequest] = None,
 ):
 
     r = None
     try:
-        session = aiohttp.ClientSession(
-            trust_env=True, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
-        )
+        session = upstream_sessions.get_session(url)
 
         r = await session.post(
             url,
@@ -113,6 +122,7 @@ async def send_post_request(
                 "Content-Type": "application/json",
                 **({"Authorization": f"Bearer {key}"} if key else {}),
             },
+            timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT),
         )
         r.raise_for_status()
 
@@ -123,21 +133,27 @@ async def send_post_request(
                 response_headers["Content-Type"] = content_type
 
             return StreamingResponse(
-                r.content,
+                (stream_response(r, backend_request) if backend_request else r.content),
                 status_code=r.status,
                 headers=response_headers,
                 background=BackgroundTask(
-                    cleanup_response, response=r, session=session
+                    cleanup_backend_request, r=r, backend_request=backend_request
                 ),
             )
         else:
             res = await r.json()
-            await cleanup_response(r, session)
+            await cleanup_response(r)
+            if backend_request:
+                backend_request.finish()
             return res
 
     except Exception as e:
         detail = None
 
+        if backend_request:
+            # Errors from the request itself don't mean the backend is unwell
+            backend_request.finish(failed=r is None or r.status >= 500)
+
         if r is not None:
             try:
                 res = await r.json()
@@ -145,6 +161,7 @@ async def send_post_request(
                     detail = f"Ollama: {res.get('error', 'Unknown error')}"
             except Exception:
                 detail = f"Ollama: {e}"
+            await cleanup_response(r)
 
         raise HTTPException(
             status_code=r.status if r else 500,
@@ -152,6 +169,25 @@ async def send_post_request(
         )
 
 
+def select_url_idx(request: Request, model: str, url_idxs: list[int]) -> int:
+    """Pick the backend for a model served by several, see OllamaBalancer."""
+    candidates = []
+    for url_idx in url_idxs:
+        url = request.app.state.config.OLLAMA_BASE_URLS[url_idx]
+        api_config = request.app.state.config.OLLAMA_API_CONFIGS.get(
+            str(url_idx),
+            request.app.state.config.OLLAMA_API_CONFIGS.get(url, {}),  # Legacy support
+        )
+
+        # The backend knows the model without the prefix
+        prefix_id = api_config.get("prefix_id", None)
+        candidates.append(
+            (url_idx, url, model.replace(f"{prefix_id}.", "") if prefix_id else model)
+        )
+
+    return ollama_balancer.select(candidates)
+
+
 def get_api_key(idx, url, configs):
     parsed_url = urlparse(url)
     base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
@@ -187,33 +223,34 @@ async def verify_connection(
     url = form_data.url
     key = form_data.key
 
-    async with aiohttp.ClientSession(
-        timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT_OPENAI_MODEL_LIST)
-    ) as session:
-        try:
-            async with session.get(
-                f"{url}/api/version",
-                headers={**({"Authorization": f"Bearer {key}"} if key else {})},
-            ) as r:
-                if r.status != 200:
-                    detail = f"HTTP Error: {r.status}"
-                    res = await r.json()
+    try:
+        session = upstream_sessions.get_session(url)
+        async with session.get(
+            f"{url}/api/version",
+            headers={**({"Authorization": f"Bearer {key}"} if key else {})},
+            timeout=aiohttp.ClientTimeout(
+                total=AIOHTTP_CLIENT_TIMEOUT_OPENAI_MODEL_LIST
+            ),
+        ) as r:
+            if r.status != 200:
+                detail = f"HTTP Error: {r.status}"
+                res = await r.json()
 
-                    if "error" in res:
-                        detail = f"External Error: {res['error']}"
-                    raise Exception(detail)
+                if "error" in res:
+                    detail = f"External Error: {res['error']}"
+                raise Exception(detail)
 
-                data = await r.json()
-                return data
-        except aiohttp.ClientError as e:
-            log.exception(f"Client error: {str(e)}")
-            raise HTTPException(
-                status_code=500, detail="Open WebUI: Server Connection Error"
-            )
-        except Exception as e:
-            log.exception(f"Unexpected error: {e}")
-            error_detail = f"Unexpected error: {str(e)}"
-            raise HTTPException(status_code=500, detail=error_detail)
+            data = await r.json()
+            return data
+    except aiohttp.ClientError as e:
+        log.exception(f"Client error: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail="Open WebUI: Server Connection Error"
+        )
+    except Exception as e:
+        log.exception(f"Unexpected error: {e}")
+        error_detail = f"Unexpected error: {str(e)}"
+        raise HTTPException(status_code=500, detail=error_detail)
 
 
 @router.get("/config")
@@ -248,6 +285,7 @@ async def update_config(
         if key in keys
     }
 
+    await request.app.state.MODEL_CATALOG.refresh(request)
     return {
         "ENABLE_OLLAMA_API": request.app.state.config.ENABLE_OLLAMA_API,
         "OLLAMA_BASE_URLS": request.app.state.config.OLLAMA_BASE_URLS,
@@ -255,85 +293,64 @@ async def update_config(
     }
 
 
-@cached(ttl=3)
-async def get_all_models(request: Request):
-    log.info("get_all_models()")
-    if request.app.state.config.ENABLE_OLLAMA_API:
-        request_tasks = []
-        for idx, url in enumerate(request.app.state.config.OLLAMA_BASE_URLS):
-            if (str(idx) not in request.app.state.config.OLLAMA_API_CONFIGS) and (
-                url not in request.app.state.config.OLLAMA_API_CONFIGS  # Legacy support
-            ):
-                request_tasks.append(send_get_request(f"{url}/api/tags"))
-            else:
-                api_config = request.app.state.config.OLLAMA_API_CONFIGS.get(
-                    str(idx),
-                    request.app.state.config.OLLAMA_API_CONFIGS.get(
-                        url, {}
-                    ),  # Legacy support
-                )
+@router.get("/backends/stats")
+async def get_backend_stats(request: Request, user=Depends(get_admin_user)):
+    return ollama_balancer.get_stats(request.app.state.config.OLLAMA_BASE_URLS)
 
-                enable = api_config.get("enable", True)
-                key = api_config.get("key", None)
 
-                if enable:
-                    request_tasks.append(send_get_request(f"{url}/api/tags", key))
-                else:
-                    request_tasks.append(asyncio.ensure_future(asyncio.sleep(0, None)))
+async def get_models_by_url_idx(request: Request, url_idx: int) -> Optional[dict]:
+    """
+    Fetch the model list of a single Ollama backend with its API config
+    applied. Returns None if the backend is disabled and raises if it can't
+    be reached.
+    """
+    url = request.app.state.config.OLLAMA_BASE_URLS[url_idx]
+    api_config = request.app.state.config.OLLAMA_API_CONFIGS.get(
+        str(url_idx),
+        request.app.state.config.OLLAMA_API_CONFIGS.get(url, {}),  # Legacy support
+    )
 
-        responses = await asyncio.gather(*request_tasks)
+    if not api_config.get("enable", True):
+        return None
 
-        for idx, response in enumerate(responses):
-            if response:
-                url = request.app.state.config.OLLAMA_BASE_URLS[idx]
-                api_config = request.app.state.config.OLLAMA_API_CONFIGS.get(
-                    str(idx),
-                    request.app.state.config.OLLAMA_API_CONFIGS.get(
-                        url, {}
-                    ),  # Legacy support
-                )
+    response = await send_get_request(f"{url}/api/tags", api_config.get("key", None))
+    if response is None:
+        raise Exception(f"Ollama: {url} is not reachable")
 
-                prefix_id = api_config.get("prefix_id", None)
-                model_ids = api_config.get("model_ids", [])
+    prefix_id = api_config.get("prefix_id", None)
+    model_ids = api_config.get("model_ids", [])
 
-                if len(model_ids) != 0 and "models" in response:
-                    response["models"] = list(
-                        filter(
-                            lambda model: model["model"] in model_ids,
-                            response["models"],
-                        )
-                    )
-
-                if prefix_id:
-                    for model in response.get("models", []):
-                        model["model"] = f"{prefix_id}.{model['model']}"
-
-        def merge_models_lists(model_lists):
-            merged_models = {}
-
-            for idx, model_list in enumerate(model_lists):
-                if model_list is not None:
-                    for model in model_list:
-                        id = model["model"]
-                        if id not in merged_models:
-                            model["urls"] = [idx]
-                            merged_models[id] = model
-                        else:
-                            merged_models[id]["urls"].append(idx)
-
-            return list(merged_models.values())
-
-        models = {
-            "models": merge_models_lists(
-                map(
-                    lambda response: response.get("models", []) if response else None,
-                    responses,
-                )
+    if len(model_ids) != 0 and "models" in response:
+        response["models"] = list(
+            filter(
+                lambda model: model["model"] in model_ids,
+                response["models"],
             )
-        }
+        )
+
+    if prefix_id:
+        for model in response.get("models", []):
+            model["model"] = f"{prefix_id}.{model['model']}"
+
+    return response
 
-    else:
-        models = {"models": []}
+
+def merge_models_responses(request: Request, responses: list) -> dict:
+    """Merge the responses of all backends, indexed by url_idx, by model."""
+    if not request.app.state.config.ENABLE_OLLAMA_API:
+        responses = []
+
+    merged_models = {}
+    for idx, response in enumerate(responses):
+        for model in response.get("models", []) if response else []:
+            id = model["model"]
+            if id not in merged_models:
+                # The responses are kept between merges, don't modify them
+                merged_models[id] = {**model, "urls": [idx]}
+            else:
+                merged_models[id]["urls"].append(idx)
+
+    models = {"models": list(merged_models.values())}
 
     request.app.state.OLLAMA_MODELS = {
         model["model"]: model for model in models["models"]
@@ -341,17 +358,22 @@ async def get_all_models(request: Request):
     return models
 
 
+async def get_all_models(request: Request):
+    # Refreshed in the background by the model catalog
+    return await request.app.state.MODEL_CATALOG.get_upstream_models(request, "ollama")
+
+
 async def get_filtered_models(models, user):
     # Filter models based on user access control
-    filtered_models = []
-    for model in models.get("models", []):
-        model_info = Models.get_model_by_id(model["model"])
-        if model_info:
-            if user.id == model_info.user_id or has_access(
-                user.id, type="read", access_control=model_info.access_control
-            ):
-                filtered_models.append(model)
-    return filtered_models
+    model_infos = Models.get_models_by_ids(
+        [model["model"] for model in models.get("models", [])]
+    )
+    accessible_ids = {
+        model_info.id for model_info in filter_accessible(user.id, model_infos)
+    }
+    return [
+        model for model in models.get("models", []) if model["model"] in accessible_ids
+    ]
 
 
 @router.get("/api/tags")
@@ -704,7 +726,7 @@ async def show_model_info(
             detail=ERROR_MESSAGES.MODEL_NOT_FOUND(form_data.name),
         )
 
-    url_idx = random.choice(models[form_data.name]["urls"])
+    url_idx = select_url_idx(request, form_data.name, models[form_data.name]["urls"])
 
     url = request.app.state.config.OLLAMA_BASE_URLS[url_idx]
     key = get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS)
@@ -768,7 +790,7 @@ async def embed(
             model = f"{model}:latest"
 
         if model in models:
-            url_idx = random.choice(models[model]["urls"])
+            url_idx = select_url_idx(request, model, models[model]["urls"])
         else:
             raise HTTPException(
                 status_code=400,
@@ -837,7 +859,7 @@ async def embeddings(
             model = f"{model}:latest"
 
         if model in models:
-            url_idx = random.choice(models[model]["urls"])
+            url_idx = select_url_idx(request, model, models[model]["urls"])
         else:
             raise HTTPException(
                 status_code=400,
@@ -912,7 +934,7 @@ async def generate_completion(
             model = f"{model}:latest"
 
         if model in models:
-            url_idx = random.choice(models[model]["urls"])
+            url_idx = select_url_idx(request, model, models[model]["urls"])
         else:
             raise HTTPException(
                 status_code=400,
@@ -933,6 +955,7 @@ async def generate_completion(
         url=f"{url}/api/generate",
         payload=form_data.model_dump_json(exclude_none=True).encode(),
         key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
+        backend_request=ollama_balancer.start_request(url, form_data.model),
     )
 
 
@@ -962,7 +985,7 @@ async def get_ollama_url(request: Request, model: str, url_idx: Optional[int] =
                 status_code=400,
                 detail=ERROR_MESSAGES.MODEL_NOT_FOUND(model),
             )
-        url_idx = random.choice(models[model].get("urls", []))
+        url_idx = select_url_idx(request, model, models[model].get("urls", []))
     url = request.app.state.config.OLLAMA_BASE_URLS[url_idx]
     return url, url_idx
 
@@ -1047,6 +1070,7 @@ async def generate_chat_completion(
         stream=form_data.stream,
         key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
         content_type="application/x-ndjson",
+        backend_request=ollama_balancer.start_request(url, payload["model"]),
     )
 
 
@@ -1149,6 +1173,7 @@ async def generate_openai_completion(
         payload=json.dumps(payload),
         stream=payload.get("stream", False),
         key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
+        backend_request=ollama_balancer.start_request(url, payload["model"]),
     )
 
 
@@ -1227,6 +1252,7 @@ async def generate_openai_chat_completion(
         payload=json.dumps(payload),
         stream=payload.get("stream", False),
         key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
+        backend_request=ollama_balancer.start_request(url, payload["model"]),
     )
 
 
@@ -1286,15 +1312,11 @@ async def get_openai_models(
 
     if user.role == "user" and not BYPASS_MODEL_ACCESS_CONTROL:
         # Filter models based on user access control
-        filtered_models = []
-        for model in models:
-            model_info = Models.get_model_by_id(model["id"])
-            if model_info:
-                if user.id == model_info.user_id or has_access(
-                    user.id, type="read", access_control=model_info.access_control
-                ):
-                    filtered_models.append(model)
-        models = filtered_models
+        model_infos = Models.get_models_by_ids([model["id"] for model in models])
+        accessible_ids = {
+            model_info.id for model_info in filter_accessible(user.id, model_infos)
+        }
+        models = [model for model in models if model["id"] in accessible_ids]
 
     return {
         "data": models,
@@ -1340,39 +1362,42 @@ async def download_file_stream(
 
     timeout = aiohttp.ClientTimeout(total=600)  # Set the timeout
 
-    async with aiohttp.ClientSession(timeout=timeout, trust_env=True) as session:
-        async with session.get(file_url, headers=headers) as response:
-            total_size = int(response.headers.get("content-length", 0)) + current_size
+    session = upstream_sessions.get_session(file_url)
+    async with session.get(file_url, headers=headers, timeout=timeout) as response:
+        total_size = int(response.headers.get("content-length", 0)) + current_size
 
-            with open(file_path, "ab+") as file:
-                async for data in response.content.iter_chunked(chunk_size):
-                    current_size += len(data)
-                    file.write(data)
+        with open(file_path, "ab+") as file:
+            async for data in response.content.iter_chunked(chunk_size):
+                current_size += len(data)
+                file.write(data)
 
-                    done = current_size == total_size
-                    progress = round((current_size / total_size) * 100, 2)
+                done = current_size == total_size
+                progress = round((current_size / total_size) * 100, 2)
 
-                    yield f'data: {{"progress": {progress}, "completed": {current_size}, "total": {total_size}}}\n\n'
+                yield f'data: {{"progress": {progress}, "completed": {current_size}, "total": {total_size}}}\n\n'
 
-                if done:
-                    file.seek(0)
-                    hashed = calculate_sha256(file)
-                    file.seek(0)
+            if done:
+                file.seek(0)
+                hashed = calculate_sha256(file)
+                file.seek(0)
 
-                    url = f"{ollama_url}/api/blobs/sha256:{hashed}"
-                    response = requests.post(url, data=file)
+                url = f"{ollama_url}/api/blobs/sha256:{hashed}"
+                async with upstream_sessions.get_session(url).post(
+                    url, data=file, timeout=timeout
+                ) as blob_response:
+                    blob_created = blob_response.ok
 
-                    if response.ok:
-                        res = {
-                            "done": done,
-                            "blob": f"sha256:{hashed}",
-                            "name": file_name,
-                        }
-                        os.remove(file_path)
+                if blob_created:
+                    res = {
+                        "done": done,
+                        "blob": f"sha256:{hashed}",
+                        "name": file_name,
+                    }
+                    os.remove(file_path)
 
-                        yield f"data: {json.dumps(res)}\n\n"
-                    else:
-                        raise "Ollama: Could not create blob, Please try again."
+                    yield f"data: {json.dumps(res)}\n\n"
+                else:
+                    raise "Ollama: Could not create blob, Please try again."
 
 
 # url = "https://huggingface.co/TheBloke/stablelm-zephyr-3b-GGUF/resolve/main/stablelm-zephyr-3b.Q2_K.gguf"
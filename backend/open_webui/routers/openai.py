@@ -3,11 +3,9 @@ import hashlib
 import json
 import logging
 from pathlib import Path
-from typing import Literal, Optional, overload
+from typing import Literal, Optional, Union, overload
 
 import aiohttp
-from aiocache import cached
-import requests
 
 
 from fastapi import Depends, FastAPI, HTTPException, Request, APIRouter
@@ -37,7 +35,9 @@ from open_webui.utils.payload import (
 )
 
 from open_webui.utils.auth import get_admin_user, get_verified_user
-from open_webui.utils.access_control import has_access
+from open_webui.utils.access_control import has_access, filter_accessible
+from open_webui.utils.http import upstream_sessions, cleanup_response
+from open_webui.utils.speech_cache import speech_cache
 
 
 log = logging.getLogger(__name__)
@@ -54,27 +54,19 @@ log.setLevel(SRC_LOG_LEVELS["OPENAI"])
 async def send_get_request(url, key=None):
     timeout = aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT_OPENAI_MODEL_LIST)
     try:
-        async with aiohttp.ClientSession(timeout=timeout, trust_env=True) as session:
-            async with session.get(
-                url, headers={**({"Authorization": f"Bearer {key}"} if key else {})}
-            ) as response:
-                return await response.json()
+        session = upstream_sessions.get_session(url)
+        async with session.get(
+            url,
+            headers={**({"Authorization": f"Bearer {key}"} if key else {})},
+            timeout=timeout,
+        ) as response:
+            return await response.json()
     except Exception as e:
         # Handle connection error here
         log.error(f"Connection error: {e}")
         return None
 
 
-async def cleanup_response(
-    response: Optional[aiohttp.ClientResponse],
-    session: Optional[aiohttp.ClientSession],
-):
-    if response:
-        response.close()
-    if session:
-        await session.close()
-
-
 def openai_o1_handler(payload):
     """
     Handle O1 specific parameters
@@ -153,6 +145,7 @@ async def update_config(
         if key in keys
     }
 
+    await request.app.state.MODEL_CATALOG.refresh(request)
     return {
         "ENABLE_OPENAI_API": request.app.state.config.ENABLE_OPENAI_API,
         "OPENAI_API_BASE_URLS": request.app.state.config.OPENAI_API_BASE_URLS,
@@ -172,20 +165,15 @@ async def speech(request: Request, user=Depends(get_verified_user)):
         body = await request.body()
         name = hashlib.sha256(body).hexdigest()
 
-        SPEECH_CACHE_DIR = Path(CACHE_DIR).joinpath("./audio/speech/")
-        SPEECH_CACHE_DIR.mkdir(parents=True, exist_ok=True)
-        file_path = SPEECH_CACHE_DIR.joinpath(f"{name}.mp3")
-        file_body_path = SPEECH_CACHE_DIR.joinpath(f"{name}.json")
-
         # Check if the file already exists in the cache
-        if file_path.is_file():
-            return FileResponse(file_path)
+        if cached_path := speech_cache.get(name):
+            return FileResponse(cached_path)
 
         url = request.app.state.config.OPENAI_API_BASE_URLS[idx]
 
         r = None
         try:
-            r = requests.post(
+            r = await upstream_sessions.get_session(url).post(
                 url=f"{url}/audio/speech",
                 data=body,
                 headers={
@@ -210,36 +198,36 @@ async def speech(request: Request, user=Depends(get_verified_user)):
                         else {}
                     ),
                 },
-                stream=True,
             )
-
             r.raise_for_status()
 
-            # Save the streaming content to a file
-            with open(file_path, "wb") as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    f.write(chunk)
-
-            with open(file_body_path, "w") as f:
-                json.dump(json.loads(body.decode("utf-8")), f)
-
-            # Return the saved file
-            return FileResponse(file_path)
+            # Stream the audio to the client, caching it along the way
+            return StreamingResponse(
+                speech_cache.tee(
+                    name,
+                    r.content.iter_chunked(8192),
+                    json.loads(body.decode("utf-8")),
+                ),
+                media_type=r.headers.get("Content-Type", "audio/mpeg"),
+                background=BackgroundTask(cleanup_response, response=r),
+            )
 
         except Exception as e:
             log.exception(e)
 
             detail = None
-            if r is not None:
-                try:
-                    res = r.json()
+            try:
+                if r is not None and r.status != 200:
+                    res = await r.json()
                     if "error" in res:
                         detail = f"External: {res['error']}"
-                except Exception:
-                    detail = f"External: {e}"
+            except Exception:
+                detail = f"External: {e}"
+            finally:
+                await cleanup_response(r)
 
             raise HTTPException(
-                status_code=r.status_code if r else 500,
+                status_code=getattr(r, "status", 500),
                 detail=detail if detail else "Open WebUI: Server Connection Error",
             )
 
@@ -247,6 +235,57 @@ async def speech(request: Request, user=Depends(get_verified_user)):
         raise HTTPException(status_code=401, detail=ERROR_MESSAGES.OPENAI_NOT_FOUND)
 
 
+async def get_models_by_url_idx(
+    request: Request, url_idx: int
+) -> Optional[Union[dict, list]]:
+    """
+    Fetch the model list of a single OpenAI compatible API with its API
+    config applied. Returns None if the API is disabled and raises if it
+    can't be reached.
+    """
+    url = request.app.state.config.OPENAI_API_BASE_URLS[url_idx]
+    keys = request.app.state.config.OPENAI_API_KEYS
+    key = keys[url_idx] if url_idx < len(keys) else ""
+
+    api_config = request.app.state.config.OPENAI_API_CONFIGS.get(
+        str(url_idx),
+        request.app.state.config.OPENAI_API_CONFIGS.get(url, {}),  # Legacy support
+    )
+
+    if not api_config.get("enable", True):
+        return None
+
+    model_ids = api_config.get("model_ids", [])
+    if len(model_ids) == 0:
+        response = await send_get_request(f"{url}/models", key)
+        if response is None:
+            raise Exception(f"OpenAI: {url} is not reachable")
+    else:
+        response = {
+            "object": "list",
+            "data": [
+                {
+                    "id": model_id,
+                    "name": model_id,
+                    "owned_by": "openai",
+                    "openai": {"id": model_id},
+                    "urlIdx": url_idx,
+                }
+                for model_id in model_ids
+            ],
+        }
+
+    prefix_id = api_config.get("prefix_id", None)
+
+    if prefix_id:
+        for model in (
+            response if isinstance(response, list) else response.get("data", [])
+        ):
+            model["id"] = f"{prefix_id}.{model['id']}"
+
+    return response
+
+
 async def get_all_models_responses(request: Request) -> list:
     if not request.app.state.config.ENABLE_OPENAI_API:
         return []
@@ -264,75 +303,13 @@ async def get_all_models_responses(request: Request) -> list:
         else:
             request.app.state.config.OPENAI_API_KEYS += [""] * (num_urls - num_keys)
 
-    request_tasks = []
-    for idx, url in enumerate(request.app.state.config.OPENAI_API_BASE_URLS):
-        if (str(idx) not in request.app.state.config.OPENAI_API_CONFIGS) and (
-            url not in request.app.state.config.OPENAI_API_CONFIGS  # Legacy support
-        ):
-            request_tasks.append(
-                send_get_request(
-                    f"{url}/models", request.app.state.config.OPENAI_API_KEYS[idx]
-                )
-            )
-        else:
-            api_config = request.app.state.config.OPENAI_API_CONFIGS.get(
-                str(idx),
-                request.app.state.config.OPENAI_API_CONFIGS.get(
-                    url, {}
-                ),  # Legacy support
-            )
-
-            enable = api_config.get("enable", True)
-            model_ids = api_config.get("model_ids", [])
-
-            if enable:
-                if len(model_ids) == 0:
-                    request_tasks.append(
-                        send_get_request(
-                            f"{url}/models",
-                            request.app.state.config.OPENAI_API_KEYS[idx],
-                        )
-                    )
-                else:
-                    model_list = {
-                        "object": "list",
-                        "data": [
-                            {
-                                "id": model_id,
-                                "name": model_id,
-                                "owned_by": "openai",
-                                "openai": {"id": model_id},
-                                "urlIdx": idx,
-                            }
-                            for model_id in model_ids
-                        ],
-                    }
-
-                    request_tasks.append(
-                        asyncio.ensure_future(asyncio.sleep(0, model_list))
-                    )
-            else:
-                request_tasks.append(asyncio.ensure_future(asyncio.sleep(0, None)))
-
-    responses = await asyncio.gather(*request_tasks)
-
-    for idx, response in enumerate(responses):
-        if response:
-            url = request.app.state.config.OPENAI_API_BASE_URLS[idx]
-            api_config = request.app.state.config.OPENAI_API_CONFIGS.get(
-                str(idx),
-                request.app.state.config.OPENAI_API_CONFIGS.get(
-                    url, {}
-                ),  # Legacy support
-            )
-
-            prefix_id = api_config.get("prefix_id", None)
-
-            if prefix_id:
-                for model in (
-                    response if isinstance(response, list) else response.get("data", [])
-                ):
-                    model["id"] = f"{prefix_id}.{model['id']}"
+    responses = await asyncio.gather(
+        *[get_models_by_url_idx(request, idx) for idx in range(num_urls)],
+        return_exceptions=True,
+    )
+    responses = [
+        None if isinstance(response, Exception) else response for response in responses
+    ]
 
     log.debug(f"get_all_models:responses() {responses}")
     return responses
@@ -340,25 +317,19 @@ async def get_all_models_responses(request: Request) -> list:
 
 async def get_filtered_models(models, user):
     # Filter models based on user access control
-    filtered_models = []
-    for model in models.get("data", []):
-        model_info = Models.get_model_by_id(model["id"])
-        if model_info:
-            if user.id == model_info.user_id or has_access(
-                user.id, type="read", access_control=model_info.access_control
-            ):
-                filtered_models.append(model)
-    return filtered_models
-
+    model_infos = Models.get_models_by_ids(
+        [model["id"] for model in models.get("data", [])]
+    )
+    accessible_ids = {
+        model_info.id for model_info in filter_accessible(user.id, model_infos)
+    }
+    return [model for model in models.get("data", []) if model["id"] in accessible_ids]
 
-@cached(ttl=3)
-async def get_all_models(request: Request) -> dict[str, list]:
-    log.info("get_all_models()")
 
+def merge_models_responses(request: Request, responses: list) -> dict[str, list]:
+    """Merge the responses of all APIs, indexed by url_idx, into one list."""
     if not request.app.state.config.ENABLE_OPENAI_API:
-        return {"data": []}
-
-    responses = await get_all_models_responses(request)
+        responses = []
 
     def extract_data(response):
         if response and "data" in response:
@@ -408,6 +379,11 @@ async def get_all_models(request: Request) -> dict[str, list]:
     return models
 
 
+async def get_all_models(request: Request) -> dict[str, list]:
+    # Refreshed in the background by the model catalog
+    return await request.app.state.MODEL_CATALOG.get_upstream_models(request, "openai")
+
+
 @router.get("/models")
 @router.get("/models/{url_idx}")
 async def get_models(
@@ -424,98 +400,27 @@ async def get_models(
         key = request.app.state.config.OPENAI_API_KEYS[url_idx]
 
         r = None
-        async with aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(
-                total=AIOHTTP_CLIENT_TIMEOUT_OPENAI_MODEL_LIST
-            )
-        ) as session:
-            try:
-                async with session.get(
-                    f"{url}/models",
-                    headers={
-                        "Authorization": f"Bearer {key}",
-                        "Content-Type": "application/json",
-                        **(
-                            {
-                                "X-OpenWebUI-User-Name": user.name,
-                                "X-OpenWebUI-User-Id": user.id,
-                                "X-OpenWebUI-User-Email": user.email,
-                                "X-OpenWebUI-User-Role": user.role,
-                            }
-                            if ENABLE_FORWARD_USER_INFO_HEADERS
-                            else {}
-                        ),
-                    },
-                ) as r:
-                    if r.status != 200:
-                        # Extract response error details if available
-                        error_detail = f"HTTP Error: {r.status}"
-                        res = await r.json()
-                        if "error" in res:
-                            error_detail = f"External Error: {res['error']}"
-                        raise Exception(error_detail)
-
-                    response_data = await r.json()
-
-                    # Check if we're calling OpenAI API based on the URL
-                    if "api.openai.com" in url:
-                        # Filter models according to the specified conditions
-                        response_data["data"] = [
-                            model
-                            for model in response_data.get("data", [])
-                            if not any(
-                                name in model["id"]
-                                for name in [
-                                    "babbage",
-                                    "dall-e",
-                                    "davinci",
-                                    "embedding",
-                                    "tts",
-                                    "whisper",
-                                ]
-                            )
-                        ]
-
-                    models = response_data
-            except aiohttp.ClientError as e:
-                # ClientError covers all aiohttp requests issues
-                log.exception(f"Client error: {str(e)}")
-                raise HTTPException(
-                    status_code=500, detail="Open WebUI: Server Connection Error"
-                )
-            except Exception as e:
-                log.exception(f"Unexpected error: {e}")
-                error_detail = f"Unexpected error: {str(e)}"
-                raise HTTPException(status_code=500, detail=error_detail)
-
-    if user.role == "user" and not BYPASS_MODEL_ACCESS_CONTROL:
-        models["data"] = await get_filtered_models(models, user)
-
-    return models
-
-
-class ConnectionVerificationForm(BaseModel):
-    url: str
-    key: str
-
-
-@router.post("/verify")
-async def verify_connection(
-    form_data: ConnectionVerificationForm, user=Depends(get_admin_user)
-):
-    url = form_data.url
-    key = form_data.key
-
-    async with aiohttp.ClientSession(
-        timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT_OPENAI_MODEL_LIST)
-    ) as session:
+        session = upstream_sessions.get_session(url)
         try:
             async with session.get(
                 f"{url}/models",
                 headers={
                     "Authorization": f"Bearer {key}",
                     "Content-Type": "application/json",
+                    **(
+                        {
+                            "X-OpenWebUI-User-Name": user.name,
+                            "X-OpenWebUI-User-Id": user.id,
+                            "X-OpenWebUI-User-Email": user.email,
+                            "X-OpenWebUI-User-Role": user.role,
+                        }
+                        if ENABLE_FORWARD_USER_INFO_HEADERS
+                        else {}
+                    ),
                 },
+                timeout=aiohttp.ClientTimeout(
+                    total=AIOHTTP_CLIENT_TIMEOUT_OPENAI_MODEL_LIST
+                ),
             ) as r:
                 if r.status != 200:
                     # Extract response error details if available
@@ -526,8 +431,27 @@ async def verify_connection(
                     raise Exception(error_detail)
 
                 response_data = await r.json()
-                return response_data
 
+                # Check if we're calling OpenAI API based on the URL
+                if "api.openai.com" in url:
+                    # Filter models according to the specified conditions
+                    response_data["data"] = [
+                        model
+                        for model in response_data.get("data", [])
+                        if not any(
+                            name in model["id"]
+                            for name in [
+                                "babbage",
+                                "dall-e",
+                                "davinci",
+                                "embedding",
+                                "tts",
+                                "whisper",
+                            ]
+                        )
+                    ]
+
+                models = response_data
         except aiohttp.ClientError as e:
             # ClientError covers all aiohttp requests issues
             log.exception(f"Client error: {str(e)}")
@@ -539,6 +463,58 @@ async def verify_connection(
             error_detail = f"Unexpected error: {str(e)}"
             raise HTTPException(status_code=500, detail=error_detail)
 
+    if user.role == "user" and not BYPASS_MODEL_ACCESS_CONTROL:
+        models["data"] = await get_filtered_models(models, user)
+
+    return models
+
+
+class ConnectionVerificationForm(BaseModel):
+    url: str
+    key: str
+
+
+@router.post("/verify")
+async def verify_connection(
+    form_data: ConnectionVerificationForm, user=Depends(get_admin_user)
+):
+    url = form_data.url
+    key = form_data.key
+
+    session = upstream_sessions.get_session(url)
+    try:
+        async with session.get(
+            f"{url}/models",
+            headers={
+                "Authorization": f"Bearer {key}",
+                "Content-Type": "application/json",
+            },
+            timeout=aiohttp.ClientTimeout(
+                total=AIOHTTP_CLIENT_TIMEOUT_OPENAI_MODEL_LIST
+            ),
+        ) as r:
+            if r.status != 200:
+                # Extract response error details if available
+                error_detail = f"HTTP Error: {r.status}"
+                res = await r.json()
+                if "error" in res:
+                    error_detail = f"External Error: {res['error']}"
+                raise Exception(error_detail)
+
+            response_data = await r.json()
+            return response_data
+
+    except aiohttp.ClientError as e:
+        # ClientError covers all aiohttp requests issues
+        log.exception(f"Client error: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail="Open WebUI: Server Connection Error"
+        )
+    except Exception as e:
+        log.exception(f"Unexpected error: {e}")
+        error_detail = f"Unexpected error: {str(e)}"
+        raise HTTPException(status_code=500, detail=error_detail)
+
 
 @router.post("/chat/completions")
 async def generate_chat_completion(
@@ -638,19 +614,17 @@ async def generate_chat_completion(
     payload = json.dumps(payload)
 
     r = None
-    session = None
     streaming = False
     response = None
 
     try:
-        session = aiohttp.ClientSession(
-            trust_env=True, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
-        )
+        session = upstream_sessions.get_session(url)
 
         r = await session.request(
             method="POST",
             url=f"{url}/chat/completions",
             data=payload,
+            timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT),
             headers={
                 "Authorization": f"Bearer {key}",
                 "Content-Type": "application/json",
@@ -682,9 +656,7 @@ async def generate_chat_completion(
                 r.content,
                 status_code=r.status,
                 headers=dict(r.headers),
-                background=BackgroundTask(
-                    cleanup_response, response=r, session=session
-                ),
+                background=BackgroundTask(cleanup_response, response=r),
             )
         else:
             try:
@@ -710,10 +682,8 @@ async def generate_chat_completion(
             detail=detail if detail else "Open WebUI: Server Connection Error",
         )
     finally:
-        if not streaming and session:
-            if r:
-                r.close()
-            await session.close()
+        if not streaming:
+            await cleanup_response(r)
 
 
 @router.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE"])
@@ -729,11 +699,10 @@ async def proxy(path: str, request: Request, user=Depends(get_verified_user)):
     key = request.app.state.config.OPENAI_API_KEYS[idx]
 
     r = None
-    session = None
     streaming = False
 
     try:
-        session = aiohttp.ClientSession(trust_env=True)
+        session = upstream_sessions.get_session(url)
         r = await session.request(
             method=request.method,
             url=f"{url}/{path}",
@@ -762,9 +731,7 @@ async def proxy(path: str, request: Request, user=Depends(get_verified_user)):
                 r.content,
                 status_code=r.status,
                 headers=dict(r.headers),
-                background=BackgroundTask(
-                    cleanup_response, response=r, session=session
-                ),
+                background=BackgroundTask(cleanup_response, response=r),
             )
         else:
             response_data = await r.json()
@@ -787,7 +754,5 @@ async def proxy(path: str, request: Request, user=Depends(get_verified_user)):
             detail=detail if detail else "Open WebUI: Server Connection Error",
         )
     finally:
-        if not streaming and session:
-            if r:
-                r.close()
-            await session.close()
+        if not streaming:
+            await cleanup_response(r)
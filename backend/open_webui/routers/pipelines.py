@@ -220,6 +220,8 @@ async def upload_pipeline(
         r.raise_for_status()
         data = r.json()
 
+        # The pipelines are listed as models of this API
+        await request.app.state.MODEL_CATALOG.refresh(request)
         return {**data}
     except Exception as e:
         # Handle connection error here
@@ -271,6 +273,8 @@ async def add_pipeline(
         r.raise_for_status()
         data = r.json()
 
+        # The pipelines are listed as models of this API
+        await request.app.state.MODEL_CATALOG.refresh(request)
         return {**data}
     except Exception as e:
         # Handle connection error here
@@ -316,6 +320,8 @@ async def delete_pipeline(
         r.raise_for_status()
         data = r.json()
 
+        # The pipelines are listed as models of this API
+        await request.app.state.MODEL_CATALOG.refresh(request)
         return {**data}
     except Exception as e:
         # Handle connection error here
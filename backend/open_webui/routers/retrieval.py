@@ -1,9 +1,10 @@
+import asyncio
 import json
 import logging
 import mimetypes
 import os
 import shutil
-
+import time
 import uuid
 from datetime import datetime
 from pathlib import Path
@@ -34,14 +35,21 @@ from open_webui.storage.provider import Storage
 
 
 from open_webui.retrieval.vector.connector import VECTOR_DB_CLIENT
+from open_webui.retrieval.embedding_cache import EMBEDDING_CACHE
+from open_webui.retrieval.reranker import Reranker
 
 # Document loaders
 from open_webui.retrieval.loaders.main import Loader
 from open_webui.retrieval.loaders.youtube import YoutubeLoader
 
 # Web search engines
-from open_webui.retrieval.web.main import SearchResult
-from open_webui.retrieval.web.utils import get_web_loader
+from open_webui.retrieval.web.cache import WEB_SEARCH_CACHE
+from open_webui.retrieval.web.main import SearchResult, merge_search_results
+from open_webui.retrieval.web.utils import (
+    get_web_loader,
+    safe_validate_urls,
+    web_page_fetcher,
+)
 from open_webui.retrieval.web.brave import search_brave
 from open_webui.retrieval.web.kagi import search_kagi
 from open_webui.retrieval.web.mojeek import search_mojeek
@@ -78,6 +86,10 @@ from open_webui.config import (
     RAG_EMBEDDING_MODEL_TRUST_REMOTE_CODE,
     RAG_RERANKING_MODEL_AUTO_UPDATE,
     RAG_RERANKING_MODEL_TRUST_REMOTE_CODE,
+    RAG_RERANKING_BATCH_SIZE,
+    RAG_RERANKING_MAX_WAIT,
+    RAG_RERANKING_CACHE_SIZE,
+    RAG_WEB_SEARCH_TIMEOUT,
     UPLOAD_DIR,
     DEFAULT_LOCALE,
 )
@@ -132,6 +144,7 @@ def get_rf(
                 rf = ColBERT(
                     get_model_path(reranking_model, auto_update),
                     env="docker" if DOCKER else None,
+                    cache_size=RAG_RERANKING_CACHE_SIZE,
                 )
 
             except Exception as e:
@@ -149,6 +162,10 @@ def get_rf(
             except:
                 log.error("CrossEncoder error")
                 raise Exception(ERROR_MESSAGES.DEFAULT("CrossEncoder error"))
+
+        rf = Reranker(
+            rf, batch_size=RAG_RERANKING_BATCH_SIZE, max_wait=RAG_RERANKING_MAX_WAIT
+        )
     return rf
 
 
@@ -172,6 +189,8 @@ class ProcessUrlForm(CollectionNameForm):
 
 class SearchForm(CollectionNameForm):
     query: str
+    # Searched at the same time as the query, into the same collection
+    queries: Optional[list[str]] = None
 
 
 @router.get("/")
@@ -206,6 +225,27 @@ async def get_embedding_config(request: Request, user=Depends(get_admin_user)):
     }
 
 
+@router.get("/embedding/cache")
+async def get_embedding_cache_stats(request: Request, user=Depends(get_admin_user)):
+    if EMBEDDING_CACHE is None:
+        return {"enabled": False}
+    return EMBEDDING_CACHE.get_stats()
+
+
+@router.get("/web/search/cache")
+async def get_web_search_cache_stats(request: Request, user=Depends(get_admin_user)):
+    if WEB_SEARCH_CACHE is None:
+        return {"enabled": False}
+    return WEB_SEARCH_CACHE.get_stats()
+
+
+@router.post("/web/search/cache/clear")
+async def clear_web_search_cache(request: Request, user=Depends(get_admin_user)):
+    if WEB_SEARCH_CACHE is not None:
+        WEB_SEARCH_CACHE.clear()
+    return {"status": True}
+
+
 @router.get("/reranking")
 async def get_reraanking_config(request: Request, user=Depends(get_admin_user)):
     return {
@@ -240,6 +280,14 @@ async def update_embedding_config(
         f"Updating embedding model: {request.app.state.config.RAG_EMBEDDING_MODEL} to {form_data.embedding_model}"
     )
     try:
+        if EMBEDDING_CACHE is not None and (
+            request.app.state.config.RAG_EMBEDDING_ENGINE != form_data.embedding_engine
+            or request.app.state.config.RAG_EMBEDDING_MODEL != form_data.embedding_model
+        ):
+            EMBEDDING_CACHE.invalidate(
+                form_data.embedding_engine, form_data.embedding_model
+            )
+
         request.app.state.config.RAG_EMBEDDING_ENGINE = form_data.embedding_engine
         request.app.state.config.RAG_EMBEDDING_MODEL = form_data.embedding_model
 
@@ -323,6 +371,10 @@ async def update_reranking_config(
         request.app.state.config.RAG_RERANKING_MODEL = form_data.reranking_model
 
         try:
+            if request.app.state.rf is not None:
+                request.app.state.rf.close()
+                request.app.state.rf = None
+
             request.app.state.rf = get_rf(
                 request.app.state.config.RAG_RERANKING_MODEL,
                 True,
@@ -1257,17 +1309,185 @@ def search_web(request: Request, engine: str, query: str) -> list[SearchResult]:
         raise Exception("No search engine API key found in environment variables")
 
 
+def search_web_cached(request: Request, engine: str, query: str) -> list[SearchResult]:
+    if WEB_SEARCH_CACHE is None:
+        return search_web(request, engine, query)
+
+    key = (
+        engine,
+        query,
+        request.app.state.config.RAG_WEB_SEARCH_RESULT_COUNT,
+        tuple(request.app.state.config.RAG_WEB_SEARCH_DOMAIN_FILTER_LIST or []),
+    )
+    if (results := WEB_SEARCH_CACHE.results.get(key)) is not None:
+        return results
+
+    results = search_web(request, engine, query)
+    WEB_SEARCH_CACHE.results.set(key, results)
+    return results
+
+
+async def search_web_queries(
+    request: Request, queries: list[str], timeout: float
+) -> list[str]:
+    """Search for all queries at once, returning the links found."""
+    engine = request.app.state.config.RAG_WEB_SEARCH_ENGINE
+    searches = [
+        asyncio.create_task(
+            asyncio.to_thread(search_web_cached, request, engine, query)
+        )
+        for query in queries
+    ]
+    done, pending = await asyncio.wait(searches, timeout=timeout)
+    for task in pending:
+        task.cancel()
+
+    results = []
+    errors = []
+    for query, task in zip(queries, searches):
+        if task not in done:
+            log.warning(f"Web search for {query} timed out")
+        elif task.exception() is not None:
+            log.error(f"Web search for {query} failed: {task.exception()}")
+            errors.append(task.exception())
+        else:
+            results.append(task.result())
+
+    if not results:
+        raise errors[0] if errors else TimeoutError("Web search timed out")
+
+    log.debug(f"web_results: {results}")
+    return merge_search_results(results)
+
+
+async def load_web_pages(
+    request: Request,
+    urls: list[str],
+    collection_name: str,
+    timeout: float,
+    user=None,
+) -> list[str]:
+    """
+    Load the pages into the collection, returning the urls loaded.
+
+    Pages are fetched at the same time and embedded as they arrive, the
+    ones still loading after `timeout` seconds are left out.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+
+    urls = await asyncio.to_thread(safe_validate_urls, urls)
+    if await asyncio.to_thread(
+        VECTOR_DB_CLIENT.has_collection, collection_name=collection_name
+    ):
+        await asyncio.to_thread(
+            VECTOR_DB_CLIENT.delete_collection, collection_name=collection_name
+        )
+
+    semaphore = asyncio.Semaphore(
+        request.app.state.config.RAG_WEB_SEARCH_CONCURRENT_REQUESTS
+    )
+    # Loaded pages waiting to be embedded, None once no more will be added
+    pages: asyncio.Queue[Optional[Document]] = asyncio.Queue()
+    loaded = set()
+
+    async def fetch(url: str):
+        async with semaphore:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            doc = await web_page_fetcher.fetch(
+                url,
+                timeout=remaining,
+                verify_ssl=request.app.state.config.ENABLE_RAG_WEB_LOADER_SSL_VERIFICATION,
+            )
+        if doc is not None and doc.page_content.strip():
+            pages.put_nowait(doc)
+
+    async def embed():
+        done = False
+        while not done:
+            # Pages that loaded while the previous ones were embedded are
+            # embedded together
+            docs = [await pages.get()]
+            while not pages.empty():
+                docs.append(pages.get_nowait())
+            if docs[-1] is None:
+                done = True
+                docs.pop()
+
+            if docs:
+                await asyncio.to_thread(
+                    save_docs_to_vector_db,
+                    request,
+                    docs,
+                    collection_name,
+                    add=True,
+                    user=user,
+                )
+                loaded.update(doc.metadata["source"] for doc in docs)
+
+    embedder = asyncio.create_task(embed())
+    fetches = [asyncio.create_task(fetch(url)) for url in urls]
+    try:
+        if fetches:
+            _, pending = await asyncio.wait(
+                fetches, timeout=max(deadline - loop.time(), 0)
+            )
+            for task in pending:
+                task.cancel()
+            if pending:
+                log.info(f"Dropped {len(pending)} pages still loading after {timeout}s")
+
+        pages.put_nowait(None)
+        await embedder
+    finally:
+        for task in [*fetches, embedder]:
+            task.cancel()
+
+    if not loaded:
+        raise ValueError(ERROR_MESSAGES.EMPTY_CONTENT)
+
+    return [url for url in urls if url in loaded]
+
+
 @router.post("/process/web/search")
-def process_web_search(
+async def process_web_search(
     request: Request, form_data: SearchForm, user=Depends(get_verified_user)
 ):
+    queries = form_data.queries or [form_data.query]
+    deadline = time.monotonic() + RAG_WEB_SEARCH_TIMEOUT
+
+    collection_name = form_data.collection_name
+    if collection_name == "" or collection_name is None:
+        query = "\n".join(queries)
+        collection_name = f"web-search-{calculate_sha256_string(query)}"[:63]
+
+    # Reuse the collection of the same search while it is fresh
+    collection_key = (
+        collection_name,
+        tuple(queries),
+        request.app.state.config.RAG_WEB_SEARCH_ENGINE,
+        request.app.state.config.RAG_WEB_SEARCH_RESULT_COUNT,
+        request.app.state.config.RAG_EMBEDDING_ENGINE,
+        request.app.state.config.RAG_EMBEDDING_MODEL,
+    )
+    if WEB_SEARCH_CACHE is not None:
+        urls = WEB_SEARCH_CACHE.collections.get(collection_key)
+        if urls is not None and await asyncio.to_thread(
+            VECTOR_DB_CLIENT.has_collection, collection_name=collection_name
+        ):
+            return {
+                "status": True,
+                "collection_name": collection_name,
+                "filenames": urls,
+            }
+
     try:
         logging.info(
-            f"trying to web search with {request.app.state.config.RAG_WEB_SEARCH_ENGINE, form_data.query}"
-        )
-        web_results = search_web(
-            request, request.app.state.config.RAG_WEB_SEARCH_ENGINE, form_data.query
+            f"trying to web search with {request.app.state.config.RAG_WEB_SEARCH_ENGINE, queries}"
         )
+        urls = await search_web_queries(request, queries, RAG_WEB_SEARCH_TIMEOUT)
     except Exception as e:
         log.exception(e)
 
@@ -1276,25 +1496,16 @@ def process_web_search(
             detail=ERROR_MESSAGES.WEB_SEARCH_ERROR(e),
         )
 
-    log.debug(f"web_results: {web_results}")
-
     try:
-        collection_name = form_data.collection_name
-        if collection_name == "" or collection_name is None:
-            collection_name = f"web-search-{calculate_sha256_string(form_data.query)}"[
-                :63
-            ]
-
-        urls = [result.link for result in web_results]
-        loader = get_web_loader(
+        urls = await load_web_pages(
+            request,
             urls,
-            verify_ssl=request.app.state.config.ENABLE_RAG_WEB_LOADER_SSL_VERIFICATION,
-            requests_per_second=request.app.state.config.RAG_WEB_SEARCH_CONCURRENT_REQUESTS,
-        )
-        docs = loader.load()
-        save_docs_to_vector_db(
-            request, docs, collection_name, overwrite=True, user=user
+            collection_name,
+            timeout=deadline - time.monotonic(),
+            user=user,
         )
+        if WEB_SEARCH_CACHE is not None:
+            WEB_SEARCH_CACHE.collections.set(collection_key, urls)
 
         return {
             "status": True,
@@ -12,9 +12,15 @@ from open_webui.env import (
     ENABLE_WEBSOCKET_SUPPORT,
     WEBSOCKET_MANAGER,
     WEBSOCKET_REDIS_URL,
+    WEBSOCKET_EMIT_INTERVAL,
+    WEBSOCKET_EMIT_MAX_SIZE,
 )
 from open_webui.utils.auth import decode_token
-from open_webui.socket.utils import RedisDict, RedisLock
+from open_webui.socket.utils import (
+    CoalescingEventEmitter,
+    RedisSocketPool,
+    SocketPool,
+)
 from open_webui.socket.voice_handler import VoiceHandler
 
 from open_webui.env import (
@@ -51,27 +57,15 @@ else:
 # Timeout duration in seconds
 TIMEOUT_DURATION = 3
 
-# Dictionary to maintain the user pool
+# Sessions of each user and the models in use
 
 if WEBSOCKET_MANAGER == "redis":
     log.debug("Using Redis to manage websockets.")
-    SESSION_POOL = RedisDict("open-webui:session_pool", redis_url=WEBSOCKET_REDIS_URL)
-    USER_POOL = RedisDict("open-webui:user_pool", redis_url=WEBSOCKET_REDIS_URL)
-    USAGE_POOL = RedisDict("open-webui:usage_pool", redis_url=WEBSOCKET_REDIS_URL)
-
-    clean_up_lock = RedisLock(
-        redis_url=WEBSOCKET_REDIS_URL,
-        lock_name="usage_cleanup_lock",
-        timeout_secs=TIMEOUT_DURATION * 2,
+    SOCKET_POOL = RedisSocketPool(
+        redis_url=WEBSOCKET_REDIS_URL, usage_timeout=TIMEOUT_DURATION
     )
-    aquire_func = clean_up_lock.aquire_lock
-    renew_func = clean_up_lock.renew_lock
-    release_func = clean_up_lock.release_lock
 else:
-    SESSION_POOL = {}
-    USER_POOL = {}
-    USAGE_POOL = {}
-    aquire_func = release_func = renew_func = lambda: True
+    SOCKET_POOL = SocketPool(usage_timeout=TIMEOUT_DURATION)
 
 
 app = socketio.ASGIApp(
@@ -85,67 +79,41 @@ voice_handler = VoiceHandler(sio)
 log.info("语音处理器初始化完成")
 
 
-async def periodic_usage_pool_cleanup():
-    if not aquire_func():
-        log.debug("Usage pool cleanup lock already exists. Not running it.")
-        return
-    log.debug("Running periodic_usage_pool_cleanup")
+usage_expiry_task = None
+
+
+async def watch_usage_expiry():
+    """Broadcast the models in use again whenever a model's usage expires."""
+    global usage_expiry_task
+
     try:
-        while True:
-            if not renew_func():
-                log.error(f"Unable to renew cleanup lock. Exiting usage pool cleanup.")
-                raise Exception("Unable to renew usage pool cleanup lock.")
-
-            now = int(time.time())
-            send_usage = False
-            for model_id, connections in list(USAGE_POOL.items()):
-                # Creating a list of sids to remove if they have timed out
-                expired_sids = [
-                    sid
-                    for sid, details in connections.items()
-                    if now - details["updated_at"] > TIMEOUT_DURATION
-                ]
-
-                for sid in expired_sids:
-                    del connections[sid]
-
-                if not connections:
-                    log.debug(f"Cleaning up model {model_id} from usage pool")
-                    del USAGE_POOL[model_id]
-                else:
-                    USAGE_POOL[model_id] = connections
-
-                send_usage = True
-
-            if send_usage:
-                # Emit updated usage information after cleaning
-                await sio.emit("usage", {"models": get_models_in_use()})
-
-            await asyncio.sleep(TIMEOUT_DURATION)
+        usage = await SOCKET_POOL.get_usage()
+        while usage:
+            # Wait for the next usage entry to expire
+            await asyncio.sleep(max(min(usage.values()) - time.time(), 0) + 0.1)
+
+            previous_usage, usage = usage, await SOCKET_POOL.get_usage()
+            if previous_usage.keys() - usage.keys():
+                await sio.emit("usage", {"models": list(usage)})
     finally:
-        release_func()
+        usage_expiry_task = None
 
 
-def get_models_in_use():
+async def get_models_in_use():
     # List models that are currently in use
-    models_in_use = list(USAGE_POOL.keys())
-    return models_in_use
+    return list(await SOCKET_POOL.get_usage())
 
 
 @sio.on("usage")
 async def usage(sid, data):
-    model_id = data["model"]
-    # Record the timestamp for the last update
-    current_time = int(time.time())
+    global usage_expiry_task
 
-    # Store the new usage data and task
-    USAGE_POOL[model_id] = {
-        **(USAGE_POOL[model_id] if model_id in USAGE_POOL else {}),
-        sid: {"updated_at": current_time},
-    }
+    # Only a model that was not already in use changes the usage
+    if await SOCKET_POOL.update_usage(data["model"]):
+        await sio.emit("usage", {"models": await get_models_in_use()})
 
-    # Broadcast the usage data to all clients
-    await sio.emit("usage", {"models": get_models_in_use()})
+    if usage_expiry_task is None:
+        usage_expiry_task = asyncio.create_task(watch_usage_expiry())
 
 
 @sio.event
@@ -159,15 +127,11 @@ async def connect(sid, environ, auth):
             user = Users.get_user_by_id(data["id"])
 
         if user:
-            SESSION_POOL[sid] = user.model_dump()
-            if user.id in USER_POOL:
-                USER_POOL[user.id] = USER_POOL[user.id] + [sid]
-            else:
-                USER_POOL[user.id] = [sid]
+            user_ids = await SOCKET_POOL.add_session(sid, user.model_dump())
 
             # print(f"user {user.name}({user.id}) connected with session ID {sid}")
-            await sio.emit("user-list", {"user_ids": list(USER_POOL.keys())})
-            await sio.emit("usage", {"models": get_models_in_use()})
+            await sio.emit("user-list", {"user_ids": user_ids})
+            await sio.emit("usage", {"models": await get_models_in_use()})
 
 
 @sio.on("user-join")
@@ -185,11 +149,7 @@ async def user_join(sid, data):
     if not user:
         return
 
-    SESSION_POOL[sid] = user.model_dump()
-    if user.id in USER_POOL:
-        USER_POOL[user.id] = USER_POOL[user.id] + [sid]
-    else:
-        USER_POOL[user.id] = [sid]
+    user_ids = await SOCKET_POOL.add_session(sid, user.model_dump())
 
     # Join all the channels
     channels = Channels.get_channels_by_user_id(user.id)
@@ -199,7 +159,7 @@ async def user_join(sid, data):
 
     # print(f"user {user.name}({user.id}) connected with session ID {sid}")
 
-    await sio.emit("user-list", {"user_ids": list(USER_POOL.keys())})
+    await sio.emit("user-list", {"user_ids": user_ids})
     return {"id": user.id, "name": user.name}
 
 
@@ -240,13 +200,17 @@ async def channel_events(sid, data):
     event_type = event_data["type"]
 
     if event_type == "typing":
+        user = await SOCKET_POOL.get_session(sid)
+        if user is None:
+            return
+
         await sio.emit(
             "channel-events",
             {
                 "channel_id": data["channel_id"],
                 "message_id": data.get("message_id", None),
                 "data": event_data,
-                "user": UserNameResponse(**SESSION_POOL[sid]).model_dump(),
+                "user": UserNameResponse(**user).model_dump(),
             },
             room=room,
         )
@@ -254,33 +218,38 @@ async def channel_events(sid, data):
 
 @sio.on("user-list")
 async def user_list(sid):
-    await sio.emit("user-list", {"user_ids": list(USER_POOL.keys())})
+    await sio.emit("user-list", {"user_ids": await SOCKET_POOL.get_user_ids()})
 
 
 @sio.event
 async def disconnect(sid):
-    if sid in SESSION_POOL:
-        user = SESSION_POOL[sid]
-        del SESSION_POOL[sid]
-
-        user_id = user["id"]
-        USER_POOL[user_id] = [_sid for _sid in USER_POOL[user_id] if _sid != sid]
-
-        if len(USER_POOL[user_id]) == 0:
-            del USER_POOL[user_id]
-
-        await sio.emit("user-list", {"user_ids": list(USER_POOL.keys())})
+    user_ids = await SOCKET_POOL.remove_session(sid)
+    if user_ids is not None:
+        await sio.emit("user-list", {"user_ids": user_ids})
     else:
         pass
         # print(f"Unknown session ID {sid} disconnected")
 
 
-def get_event_emitter(request_info):
+async def get_session_ids(request_info):
+    session_ids = await SOCKET_POOL.get_user_session_ids(request_info["user_id"])
+    return list(set(session_ids + [request_info["session_id"]]))
+
+
+def get_event_emitter(request_info, cache_session_ids=False):
+    session_ids = None
+
     async def __event_emitter__(event_data):
-        user_id = request_info["user_id"]
-        session_ids = list(
-            set(USER_POOL.get(user_id, []) + [request_info["session_id"]])
-        )
+        nonlocal session_ids
+
+        # Streams look the sessions up once, and again for the final event
+        data = event_data.get("data")
+        if (
+            session_ids is None
+            or not cache_session_ids
+            or (isinstance(data, dict) and data.get("done"))
+        ):
+            session_ids = await get_session_ids(request_info)
 
         for session_id in session_ids:
             await sio.emit(
@@ -331,6 +300,14 @@ def get_event_emitter(request_info):
     return __event_emitter__
 
 
+def get_buffered_event_emitter(request_info):
+    return CoalescingEventEmitter(
+        get_event_emitter(request_info, cache_session_ids=True),
+        interval=WEBSOCKET_EMIT_INTERVAL,
+        max_size=WEBSOCKET_EMIT_MAX_SIZE,
+    )
+
+
 def get_event_call(request_info):
     async def __event_caller__(event_data):
         response = await sio.call(
@@ -350,28 +327,25 @@ def get_event_call(request_info):
 get_event_caller = get_event_call
 
 
-def get_user_id_from_session_pool(sid):
-    user = SESSION_POOL.get(sid)
+async def get_user_id_from_session_pool(sid):
+    user = await SOCKET_POOL.get_session(sid)
     if user:
         return user["id"]
     return None
 
 
-def get_user_ids_from_room(room):
+async def get_user_ids_from_room(room):
     active_session_ids = sio.manager.get_participants(
         namespace="/",
         room=room,
     )
 
-    active_user_ids = list(
-        set(
-            [SESSION_POOL.get(session_id[0])["id"] for session_id in active_session_ids]
-        )
+    users = await SOCKET_POOL.get_sessions(
+        [session_id[0] for session_id in active_session_ids]
     )
+    active_user_ids = list(set([user["id"] for user in users if user]))
     return active_user_ids
 
 
-def get_active_status_by_user_id(user_id):
-    if user_id in USER_POOL:
-        return True
-    return False
+async def get_active_status_by_user_id(user_id):
+    return await SOCKET_POOL.is_user_active(user_id)
@@ -1,87 +1,327 @@
+import asyncio
 import json
-import redis
-import uuid
-
-
-class RedisLock:
-    def __init__(self, redis_url, lock_name, timeout_secs):
-        self.lock_name = lock_name
-        self.lock_id = str(uuid.uuid4())
-        self.timeout_secs = timeout_secs
-        self.lock_obtained = False
-        self.redis = redis.Redis.from_url(redis_url, decode_responses=True)
-
-    def aquire_lock(self):
-        # nx=True will only set this key if it _hasn't_ already been set
-        self.lock_obtained = self.redis.set(
-            self.lock_name, self.lock_id, nx=True, ex=self.timeout_secs
-        )
-        return self.lock_obtained
+import logging
+import math
+import redis.asyncio
+import time
+from typing import Optional
+
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["SOCKET"])
+
+
+class SocketPool:
+    """
+    Tracks the socket sessions of each user and the models in use, in the
+    memory of a single worker.
+
+    Usage entries expire `usage_timeout` seconds after their last update;
+    expired entries are dropped when the usage is read.
+    """
+
+    def __init__(self, usage_timeout: float):
+        self.usage_timeout = usage_timeout
+        self.sessions: dict[str, dict] = {}
+        self.user_sessions: dict[str, set[str]] = {}
+        # model id -> expiry time
+        self.usage: dict[str, float] = {}
+
+    async def add_session(self, sid: str, user: dict) -> list[str]:
+        """Add a session and return the ids of the active users."""
+        self.sessions[sid] = user
+        self.user_sessions.setdefault(user["id"], set()).add(sid)
+        return list(self.user_sessions)
+
+    async def remove_session(self, sid: str) -> Optional[list[str]]:
+        """Remove a session and return the ids of the active users."""
+        user = self.sessions.pop(sid, None)
+        if user is None:
+            return None
+
+        session_ids = self.user_sessions.get(user["id"], set())
+        session_ids.discard(sid)
+        if not session_ids:
+            self.user_sessions.pop(user["id"], None)
+        return list(self.user_sessions)
+
+    async def get_session(self, sid: str) -> Optional[dict]:
+        return self.sessions.get(sid)
+
+    async def get_sessions(self, sids: list[str]) -> list[Optional[dict]]:
+        return [self.sessions.get(sid) for sid in sids]
+
+    async def get_user_session_ids(self, user_id: str) -> list[str]:
+        return list(self.user_sessions.get(user_id, []))
+
+    async def get_user_ids(self) -> list[str]:
+        return list(self.user_sessions)
+
+    async def is_user_active(self, user_id: str) -> bool:
+        return user_id in self.user_sessions
+
+    async def update_usage(self, model_id: str) -> bool:
+        """Mark a model as in use, True if it was not in use before."""
+        now = time.time()
+        added = self.usage.get(model_id, 0) <= now
+        self.usage[model_id] = now + self.usage_timeout
+        return added
+
+    async def get_usage(self) -> dict[str, float]:
+        """Return the models in use and when their usage expires."""
+        now = time.time()
+        self.usage = {
+            model_id: expires_at
+            for model_id, expires_at in self.usage.items()
+            if expires_at > now
+        }
+        return dict(self.usage)
+
+
+# Removes a session and, with its last session, the user from the active users
+REMOVE_SESSION_SCRIPT = """
+local user = redis.call('HGET', KEYS[1], ARGV[1])
+if not user then
+    return false
+end
+redis.call('HDEL', KEYS[1], ARGV[1])
+
+local user_id = cjson.decode(user)['id']
+local user_sessions_key = ARGV[2] .. user_id
+redis.call('SREM', user_sessions_key, ARGV[1])
+if redis.call('SCARD', user_sessions_key) == 0 then
+    redis.call('SREM', KEYS[2], user_id)
+end
+return redis.call('SMEMBERS', KEYS[2])
+"""
+
+
+class RedisSocketPool:
+    """
+    SocketPool shared by all workers through Redis, using the asyncio client
+    so the socket handlers never block the event loop.
+
+    Related updates are batched into a single MULTI round trip. The models
+    in use are a sorted set scored by expiry time, trimmed on every access
+    and expiring as a whole once nothing updates it.
+    """
 
-    def renew_lock(self):
-        # xx=True will only set this key if it _has_ already been set
-        return self.redis.set(
-            self.lock_name, self.lock_id, xx=True, ex=self.timeout_secs
+    def __init__(
+        self, redis_url: str, usage_timeout: float, prefix: str = "open-webui"
+    ):
+        self.usage_timeout = usage_timeout
+        self.redis = redis.asyncio.from_url(redis_url, decode_responses=True)
+
+        self.sessions_key = f"{prefix}:sessions"
+        self.users_key = f"{prefix}:users"
+        self.user_sessions_prefix = f"{prefix}:user_sessions:"
+        self.usage_key = f"{prefix}:usage"
+
+        self.remove_session_script = self.redis.register_script(REMOVE_SESSION_SCRIPT)
+
+    async def add_session(self, sid: str, user: dict) -> list[str]:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.sessions_key, sid, json.dumps(user))
+            pipe.sadd(f"{self.user_sessions_prefix}{user['id']}", sid)
+            pipe.sadd(self.users_key, user["id"])
+            pipe.smembers(self.users_key)
+            *_, user_ids = await pipe.execute()
+        return list(user_ids)
+
+    async def remove_session(self, sid: str) -> Optional[list[str]]:
+        user_ids = await self.remove_session_script(
+            keys=[self.sessions_key, self.users_key],
+            args=[sid, self.user_sessions_prefix],
         )
+        return list(user_ids) if user_ids is not None else None
+
+    async def get_session(self, sid: str) -> Optional[dict]:
+        value = await self.redis.hget(self.sessions_key, sid)
+        return json.loads(value) if value is not None else None
+
+    async def get_sessions(self, sids: list[str]) -> list[Optional[dict]]:
+        if not sids:
+            return []
+        values = await self.redis.hmget(self.sessions_key, sids)
+        return [json.loads(value) if value is not None else None for value in values]
+
+    async def get_user_session_ids(self, user_id: str) -> list[str]:
+        return list(await self.redis.smembers(f"{self.user_sessions_prefix}{user_id}"))
+
+    async def get_user_ids(self) -> list[str]:
+        return list(await self.redis.smembers(self.users_key))
+
+    async def is_user_active(self, user_id: str) -> bool:
+        return bool(await self.redis.sismember(self.users_key, user_id))
+
+    async def update_usage(self, model_id: str) -> bool:
+        now = time.time()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(self.usage_key, "-inf", now)
+            pipe.zadd(self.usage_key, {model_id: now + self.usage_timeout})
+            pipe.expire(self.usage_key, math.ceil(self.usage_timeout) + 1)
+            _, added, _ = await pipe.execute()
+        return added > 0
+
+    async def get_usage(self) -> dict[str, float]:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(self.usage_key, "-inf", time.time())
+            pipe.zrange(self.usage_key, 0, -1, withscores=True)
+            _, usage = await pipe.execute()
+        return dict(usage)
+
 
-    def release_lock(self):
-        lock_value = self.redis.get(self.lock_name)
-        if lock_value and lock_value == self.lock_id:
-            self.redis.delete(self.lock_name)
+class CoalescingEventEmitter:
+    """
+    Wraps an event emitter to batch the chat:completion deltas of a
+    streamed message.
 
+    Deltas are merged and emitted at most once per `interval` seconds, or
+    as soon as `max_size` characters of new content are pending. Streamed
+    chunks have their delta content concatenated; full content replaces
+    the pending content. Any other event (and the final `done` event)
+    flushes the pending deltas first, so the order of events is kept.
+    """
 
-class RedisDict:
-    def __init__(self, name, redis_url):
-        self.name = name
-        self.redis = redis.Redis.from_url(redis_url, decode_responses=True)
+    def __init__(self, emitter, interval: float = 0.04, max_size: int = 4096):
+        self.emitter = emitter
+        self.interval = interval
+        self.max_size = max_size
 
-    def __setitem__(self, key, value):
-        serialized_value = json.dumps(value)
-        self.redis.hset(self.name, key, serialized_value)
+        self.pending = None
+        self.pending_size = 0
+        self.content_length = 0
+        # The first delta is emitted right away
+        self.last_emit = time.monotonic() - interval
+        self.flush_task = None
+        self.lock = asyncio.Lock()
 
-    def __getitem__(self, key):
-        value = self.redis.hget(self.name, key)
-        if value is None:
-            raise KeyError(key)
-        return json.loads(value)
+        self.started_at = time.monotonic()
+        self.events = 0
+        self.emits = 0
 
-    def __delitem__(self, key):
-        result = self.redis.hdel(self.name, key)
-        if result == 0:
-            raise KeyError(key)
+    @staticmethod
+    def get_delta(data: dict):
+        choices = data.get("choices")
+        if isinstance(choices, list) and len(choices) == 1:
+            delta = choices[0].get("delta")
+            if isinstance(delta, dict):
+                return delta
+        return None
 
-    def __contains__(self, key):
-        return self.redis.hexists(self.name, key)
+    def merge(self, data: dict) -> bool:
+        """Merge data into the pending deltas, False if it can't be merged."""
+        delta = self.get_delta(data)
+        if self.pending is None:
+            self.pending = data
+            return True
 
-    def __len__(self):
-        return self.redis.hlen(self.name)
+        if delta is None:
+            self.pending = {**self.pending, **data}
+            return True
 
-    def keys(self):
-        return self.redis.hkeys(self.name)
+        # The client applies streamed chunks before full content
+        if "content" in self.pending:
+            return False
 
-    def values(self):
-        return [json.loads(v) for v in self.redis.hvals(self.name)]
+        pending_delta = self.get_delta(self.pending)
+        if pending_delta is None:
+            self.pending = {**self.pending, **data}
+            return True
 
-    def items(self):
-        return [(k, json.loads(v)) for k, v in self.redis.hgetall(self.name).items()]
+        self.pending = {
+            **self.pending,
+            **data,
+            "choices": [
+                {
+                    **data["choices"][0],
+                    "delta": {
+                        **pending_delta,
+                        **delta,
+                        "content": (pending_delta.get("content") or "")
+                        + (delta.get("content") or ""),
+                    },
+                }
+            ],
+        }
+        return True
 
-    def get(self, key, default=None):
-        try:
-            return self[key]
-        except KeyError:
-            return default
+    def get_size(self, data: dict) -> int:
+        delta = self.get_delta(data)
+        if delta is not None:
+            return len(delta.get("content") or "")
 
-    def clear(self):
-        self.redis.delete(self.name)
+        content = data.get("content")
+        if isinstance(content, str):
+            size = abs(len(content) - self.content_length)
+            self.content_length = len(content)
+            return size
+        return 0
 
-    def update(self, other=None, **kwargs):
-        if other is not None:
-            for k, v in other.items() if hasattr(other, "items") else other:
-                self[k] = v
-        for k, v in kwargs.items():
-            self[k] = v
+    async def emit_pending(self):
+        if self.pending is None:
+            return
 
-    def setdefault(self, key, default=None):
-        if key not in self:
-            self[key] = default
-        return self[key]
+        data, self.pending = self.pending, None
+        self.pending_size = 0
+        self.last_emit = time.monotonic()
+
+        self.emits += 1
+        await self.emitter({"type": "chat:completion", "data": data})
+
+    async def flush(self):
+        async with self.lock:
+            await self.emit_pending()
+
+    async def flush_later(self):
+        await asyncio.sleep(max(self.interval - (time.monotonic() - self.last_emit), 0))
+        self.flush_task = None
+        await self.flush()
+
+    async def __call__(self, event_data: dict):
+        self.events += 1
+        data = event_data.get("data")
+
+        if (
+            self.interval <= 0
+            or event_data.get("type") != "chat:completion"
+            or not isinstance(data, dict)
+            or "done" in data
+            or "error" in data
+            or ("choices" in data and self.get_delta(data) is None)
+        ):
+            async with self.lock:
+                await self.emit_pending()
+                self.emits += 1
+                await self.emitter(event_data)
+            return
+
+        async with self.lock:
+            if not self.merge(data):
+                await self.emit_pending()
+                self.merge(data)
+
+            self.pending_size += self.get_size(data)
+            if (
+                self.pending_size >= self.max_size
+                or time.monotonic() - self.last_emit >= self.interval
+            ):
+                await self.emit_pending()
+                return
+
+        if self.flush_task is None:
+            self.flush_task = asyncio.create_task(self.flush_later())
+
+    async def close(self):
+        # The scheduled flush is only cancelled while it is still waiting
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+            self.flush_task = None
+        await self.flush()
+
+        elapsed = max(time.monotonic() - self.started_at, 1e-3)
+        log.debug(
+            f"{self.events} events in {self.emits} emits over {elapsed:.1f}s, "
+            f"{(self.events - self.emits) / elapsed:.1f} emits/s saved"
+        )
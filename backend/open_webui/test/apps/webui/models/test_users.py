@@ -0,0 +1,35 @@
+import uuid
+
+from open_webui.internal.db import get_db
+from open_webui.models.users import User, Users
+
+
+def new_user() -> str:
+    id = str(uuid.uuid4())
+    Users.insert_new_user(id, "User", f"{id}@example.com")
+    Users.update_user_by_id(id, {"last_active_at": 0})
+    return id
+
+
+def test_flush_skips_deleted_users():
+    active, deleted, removed = new_user(), new_user(), new_user()
+    for id in [active, deleted, removed]:
+        Users.touch_user_last_active_by_id(id)
+
+    assert Users.delete_user_by_id(removed)
+    assert removed not in Users.last_active
+
+    # Deleted behind the users table's back
+    with get_db() as db:
+        db.query(User).filter_by(id=deleted).delete()
+        db.commit()
+
+    Users.flush_last_active()
+    assert Users.last_active == {}
+    assert Users.get_user_by_id(active).last_active_at > 0
+
+    # Later flushes keep working
+    Users.update_user_by_id(active, {"last_active_at": 0})
+    Users.touch_user_last_active_by_id(active)
+    Users.flush_last_active()
+    assert Users.get_user_by_id(active).last_active_at > 0
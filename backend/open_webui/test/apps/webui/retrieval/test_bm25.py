@@ -0,0 +1,171 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from open_webui.retrieval.vector.bm25 import BM25Index, BM25IndexedVectorDBClient
+from open_webui.retrieval.vector.main import GetResult
+
+
+class MockVectorDBClient:
+    def __init__(self):
+        self.collections = {}
+
+    def has_collection(self, collection_name):
+        return collection_name in self.collections
+
+    def insert(self, collection_name, items):
+        self.collections.setdefault(collection_name, []).extend(items)
+
+    def upsert(self, collection_name, items):
+        self.insert(collection_name, items)
+
+    def delete(self, collection_name, ids=None, filter=None):
+        pass
+
+    def delete_collection(self, collection_name):
+        self.collections.pop(collection_name, None)
+
+    def get(self, collection_name):
+        items = self.collections.get(collection_name)
+        if items is None:
+            return None
+        return GetResult(
+            ids=[[item["id"] for item in items]],
+            documents=[[item["text"] for item in items]],
+            metadatas=[[item["metadata"] for item in items]],
+        )
+
+
+def make_items(texts, file_id="file"):
+    return [
+        {
+            "id": f"{file_id}-{idx}",
+            "text": text,
+            "vector": [0.0],
+            "metadata": {"file_id": file_id},
+        }
+        for idx, text in enumerate(texts)
+    ]
+
+
+class TestBM25Index:
+    def test_search_ranks_matching_chunks(self, tmp_path):
+        index = BM25Index(str(tmp_path))
+        index.upsert(
+            "c", make_items(["the quick brown fox", "a lazy dog", "quick quick fox"])
+        )
+
+        result = index.search("c", "quick fox", 5)
+        assert result.ids[0] == ["file-2", "file-0"]
+        assert result.metadatas[0][0] == {"file_id": "file"}
+
+    def test_search_escapes_query_syntax(self, tmp_path):
+        index = BM25Index(str(tmp_path))
+        index.upsert("c", make_items(["near the fox"]))
+
+        assert index.search("c", 'NEAR(" fox*', 5).ids[0] == ["file-0"]
+        assert index.search("c", "!!!", 5).ids[0] == []
+
+    def test_delete_by_ids_and_filter(self, tmp_path):
+        index = BM25Index(str(tmp_path))
+        index.upsert(
+            "c", make_items(["apple pie"], "a") + make_items(["apple tart"], "b")
+        )
+
+        index.delete("c", ids=["a-0"])
+        assert index.search("c", "apple", 5).ids[0] == ["b-0"]
+
+        index.delete("c", filter={"file_id": "b"})
+        assert index.search("c", "apple", 5).ids[0] == []
+
+    def test_delete_collection(self, tmp_path):
+        index = BM25Index(str(tmp_path))
+        index.upsert("c", make_items(["apple"]))
+        assert index.has_index("c")
+
+        index.delete_collection("c")
+        assert not index.has_index("c")
+        assert index.search("c", "apple", 5) is None
+
+
+class TestBM25IndexedVectorDBClient:
+    def test_writes_are_mirrored(self, tmp_path):
+        client = BM25IndexedVectorDBClient(
+            MockVectorDBClient(), BM25Index(str(tmp_path))
+        )
+        client.insert("c", make_items(["hello world"]))
+        assert client.bm25_search("c", "hello", 5).ids[0] == ["file-0"]
+
+        client.delete_collection("c")
+        assert not client.has_collection("c")
+        assert client.bm25_search("c", "hello", 5) is None
+
+    def test_existing_collection_is_backfilled(self, tmp_path):
+        vector_db = MockVectorDBClient()
+        vector_db.insert("c", make_items(["old chunk"], "old"))
+
+        client = BM25IndexedVectorDBClient(vector_db, BM25Index(str(tmp_path)))
+        client.insert("c", make_items(["new chunk"], "new"))
+        assert not client.bm25_index.has_index("c")
+
+        result = client.bm25_search("c", "chunk", 5)
+        assert sorted(result.ids[0]) == ["new-0", "old-0"]
+
+    def test_concurrent_first_searches_build_once(self, tmp_path):
+        vector_db = MockVectorDBClient()
+        vector_db.insert("c", make_items([f"chunk {idx}" for idx in range(200)]))
+
+        gets = []
+        get = vector_db.get
+        barrier = threading.Barrier(4)
+
+        def counting_get(collection_name):
+            gets.append(collection_name)
+            return get(collection_name)
+
+        vector_db.get = counting_get
+        client = BM25IndexedVectorDBClient(vector_db, BM25Index(str(tmp_path)))
+
+        def search(_):
+            barrier.wait()
+            return client.bm25_search("c", "chunk", 500)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(search, range(4)))
+
+        assert gets == ["c"]
+        assert all(len(result.ids[0]) == 200 for result in results)
+        assert [path.name for path in tmp_path.iterdir() if ".tmp" in path.name] == []
+
+    def test_empty_collection_is_indexed(self, tmp_path):
+        vector_db = MockVectorDBClient()
+        vector_db.collections["c"] = []
+
+        client = BM25IndexedVectorDBClient(vector_db, BM25Index(str(tmp_path)))
+        assert client.bm25_search("c", "chunk", 5).ids[0] == []
+        assert client.bm25_index.has_index("c")
+
+    def test_delete_collection_during_build_is_not_undone(self, tmp_path):
+        vector_db = MockVectorDBClient()
+        vector_db.insert("c", make_items(["chunk"]))
+
+        get = vector_db.get
+        started, release = threading.Event(), threading.Event()
+
+        def slow_get(collection_name):
+            result = get(collection_name)
+            started.set()
+            release.wait(timeout=5)
+            return result
+
+        vector_db.get = slow_get
+        client = BM25IndexedVectorDBClient(vector_db, BM25Index(str(tmp_path)))
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            search = executor.submit(client.bm25_search, "c", "chunk", 5)
+            started.wait(timeout=5)
+            delete = executor.submit(client.delete_collection, "c")
+            release.set()
+            search.result()
+            delete.result()
+
+        assert not client.bm25_index.has_index("c")
@@ -0,0 +1,31 @@
+import pytest
+
+from open_webui.retrieval.embedding_cache import EmbeddingCache
+
+
+def test_cache_is_bounded_by_bytes():
+    # Room for two 4-dimensional float32 vectors
+    cache = EmbeddingCache(max_entries=100, max_size=2 * 4 * 4)
+    calls = []
+
+    def func(texts):
+        calls.append(texts)
+        return [[float(len(text))] * 4 for text in texts]
+
+    assert cache.embed("", "m", ["a", "bb", "ccc"], func) == [
+        [1.0] * 4,
+        [2.0] * 4,
+        [3.0] * 4,
+    ]
+    stats = cache.get_stats()
+    assert (stats["entries"], stats["size"], stats["evictions"]) == (2, 32, 1)
+
+    assert cache.embed("", "m", "ccc", func) == [3.0] * 4
+    assert len(calls) == 1
+
+
+def test_missing_embeddings_raise():
+    cache = EmbeddingCache(max_entries=100, max_size=1024)
+
+    with pytest.raises(ValueError, match="1 embeddings for 2 texts"):
+        cache.embed("", "m", ["a", "b"], lambda texts: [[0.0]])
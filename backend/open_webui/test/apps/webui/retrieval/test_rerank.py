@@ -0,0 +1,75 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from langchain_core.documents import Document
+
+from open_webui.retrieval.reranker import Reranker
+from open_webui.retrieval.utils import VECTOR_METADATA_KEY, RerankCompressor
+
+
+def test_stored_vectors_are_not_embedded_again():
+    embedded = []
+
+    def embedding_function(query, user=None):
+        embedded.append(query)
+        if isinstance(query, list):
+            return [[0.0, 1.0] for _ in query]
+        return [1.0, 0.0]
+
+    documents = [
+        Document(page_content="a", metadata={"i": 0, VECTOR_METADATA_KEY: [1.0, 0.0]}),
+        Document(page_content="b", metadata={"i": 1}),
+        # Padded by the vector DB
+        Document(
+            page_content="c",
+            metadata={"i": 2, VECTOR_METADATA_KEY: np.array([1.0, 1.0, 0.0])},
+        ),
+    ]
+    compressor = RerankCompressor(
+        embedding_function=embedding_function,
+        top_n=3,
+        reranking_function=None,
+        r_score=0.0,
+    )
+
+    result = compressor.compress_documents(documents, "query")
+
+    assert embedded == [["b"], "query"]
+    assert [doc.metadata["i"] for doc in result] == [0, 2, 1]
+    assert [round(doc.metadata["score"], 4) for doc in result] == [1.0, 0.7071, 0.0]
+    assert all(VECTOR_METADATA_KEY not in doc.metadata for doc in result)
+
+
+class CountingModel:
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, sentences, batch_size=32):
+        self.calls.append(len(sentences))
+        return np.array([len(document) for _, document in sentences], dtype=float)
+
+
+def test_concurrent_requests_are_batched():
+    model = CountingModel()
+    reranker = Reranker(model, batch_size=64, max_wait=0.2)
+
+    requests = [[("q", "a" * (idx + 1)), ("q", "b")] for idx in range(4)]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(reranker.predict, requests))
+    reranker.close()
+
+    assert [result.tolist() for result in results] == [[idx + 1, 1] for idx in range(4)]
+    assert model.calls == [8]
+
+
+def test_predict_after_close_does_not_hang():
+    model = CountingModel()
+    reranker = Reranker(model, batch_size=64, max_wait=0.01)
+    reranker.close()
+    reranker.thread.join(timeout=1)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        result = executor.submit(reranker.predict, [("q", "abc")]).result(timeout=5)
+
+    assert result.tolist() == [3]
+    assert not reranker.thread.is_alive()
@@ -0,0 +1,155 @@
+import asyncio
+
+from aiohttp import web
+
+from open_webui.retrieval.web.cache import WebSearchCache
+from open_webui.retrieval.web.main import SearchResult, merge_search_results
+from open_webui.retrieval.web.utils import WebPageFetcher
+
+
+def result(link):
+    return SearchResult(link=link, title=None, snippet=None)
+
+
+def test_merge_search_results():
+    urls = merge_search_results(
+        [
+            [result("https://a.com"), result("https://b.com#intro")],
+            [result("https://b.com"), result("https://c.com"), result("https://d.com")],
+        ]
+    )
+
+    assert urls == ["https://a.com", "https://b.com", "https://c.com", "https://d.com"]
+
+
+def test_fetcher_skips_slow_and_binary_pages():
+    async def page(request):
+        return web.Response(
+            text="<html lang='en'><title>Page</title><p>Hello</p></html>",
+            content_type="text/html",
+        )
+
+    async def slow(request):
+        await asyncio.sleep(5)
+        return web.Response(text="late", content_type="text/html")
+
+    async def binary(request):
+        return web.Response(body=b"\0" * 10, content_type="application/pdf")
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/page", page)
+        app.router.add_get("/slow", slow)
+        app.router.add_get("/binary", binary)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+        fetcher = WebPageFetcher(limit_per_host=2)
+        try:
+            return await asyncio.gather(
+                fetcher.fetch(f"{url}/page", timeout=1),
+                fetcher.fetch(f"{url}/slow", timeout=0.2),
+                fetcher.fetch(f"{url}/binary", timeout=1),
+            )
+        finally:
+            await fetcher.close()
+            await runner.cleanup()
+
+    doc, slow_doc, binary_doc = asyncio.run(run())
+
+    assert doc.page_content == "PageHello"
+    assert doc.metadata["title"] == "Page"
+    assert doc.metadata["language"] == "en"
+    assert slow_doc is None
+    assert binary_doc is None
+
+
+def test_fetcher_revalidates_expired_pages():
+    responses = []
+
+    async def page(request):
+        if request.headers.get("If-None-Match") == '"v1"':
+            responses.append(304)
+            return web.Response(status=304)
+        responses.append(200)
+        return web.Response(
+            text="<p>Hello</p>", content_type="text/html", headers={"ETag": '"v1"'}
+        )
+
+    async def run(cache):
+        app = web.Application()
+        app.router.add_get("/page", page)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/page"
+
+        fetcher = WebPageFetcher(limit_per_host=2, cache=cache)
+        try:
+            docs = [await fetcher.fetch(url, timeout=1)]
+            await asyncio.sleep(0.1)
+            return docs + [await fetcher.fetch(url, timeout=1)]
+        finally:
+            await fetcher.close()
+            await runner.cleanup()
+
+    fresh = WebSearchCache(60, 10, page_ttl=60, page_max_entries=10)
+    assert [doc.page_content for doc in asyncio.run(run(fresh))] == ["Hello"] * 2
+    assert responses == [200]
+
+    responses.clear()
+    stale = WebSearchCache(60, 10, page_ttl=0.05, page_max_entries=10)
+    assert [doc.page_content for doc in asyncio.run(run(stale))] == ["Hello"] * 2
+    assert responses == [200, 304]
+    assert stale.revalidated == 1
+
+
+def test_fetcher_reads_chunked_pages_to_the_end():
+    async def page(request):
+        response = web.StreamResponse(headers={"Content-Type": "text/html"})
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        for idx in range(100):
+            await response.write(f"<p>{idx:03}{'x' * 996}</p>".encode())
+            await asyncio.sleep(0)
+        await response.write(b"<p>tail</p>")
+        await response.write_eof()
+        return response
+
+    async def large(request):
+        return web.Response(text="x" * 2000, content_type="text/html")
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/page", page)
+        app.router.add_get("/large", large)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+        try:
+            fetcher = WebPageFetcher(limit_per_host=2)
+            doc = await fetcher.fetch(f"{url}/page", timeout=5)
+            await fetcher.close()
+
+            small = WebPageFetcher(limit_per_host=2, max_size=1000)
+            skipped = await asyncio.gather(
+                small.fetch(f"{url}/page", timeout=5),
+                small.fetch(f"{url}/large", timeout=5),
+            )
+            await small.close()
+            return doc, skipped
+        finally:
+            await runner.cleanup()
+
+    doc, skipped = asyncio.run(run())
+
+    assert len(doc.page_content) == 100 * 999 + len("tail")
+    assert doc.page_content.endswith("099" + "x" * 996 + "tail")
+    assert skipped == [None, None]
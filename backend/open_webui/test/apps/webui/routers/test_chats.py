@@ -234,3 +234,74 @@ class TestChats(AbstractPostgresTest):
 
         chat = self.chats.get_chat_by_id(chat_id)
         assert chat.share_id is None
+
+    def test_get_chat_messages_by_id(self):
+        from open_webui.models.chats import ChatForm
+
+        messages = {
+            "1": {"id": "1", "parentId": None, "role": "user", "content": "hi"},
+            "2": {"id": "2", "parentId": "1", "role": "assistant", "content": "a"},
+            "3": {"id": "3", "parentId": "1", "role": "assistant", "content": "b"},
+        }
+        chat = self.chats.insert_new_chat(
+            "2",
+            ChatForm(
+                **{
+                    "chat": {
+                        "title": "tree",
+                        "history": {"currentId": "3", "messages": messages},
+                    }
+                }
+            ),
+        )
+        assert chat.chat["history"]["messages"] == messages
+        assert [message["id"] for message in chat.chat["messages"]] == ["1", "3"]
+
+        with mock_webui_user(id="2"):
+            response = self.fast_api_client.get(
+                self.create_url(f"/{chat.id}?messages=false")
+            )
+            assert response.status_code == 200
+            assert response.json()["chat"]["history"] == {"currentId": "3"}
+
+            response = self.fast_api_client.get(
+                self.create_url(f"/{chat.id}/messages/branch?limit=1")
+            )
+            assert [message["id"] for message in response.json()] == ["3"]
+
+            response = self.fast_api_client.get(
+                self.create_url(f"/{chat.id}/messages/branch?message_id=2")
+            )
+            assert [message["id"] for message in response.json()] == ["1", "2"]
+
+        assert (
+            self.chats.get_message_by_id_and_message_id(chat.id, "2") == messages["2"]
+        )
+
+    def test_search_user_chats(self):
+        from open_webui.models.chats import ChatForm
+
+        self.chats.insert_new_chat(
+            "2",
+            ChatForm(
+                **{
+                    "chat": {
+                        "title": "Recipes",
+                        "history": {
+                            "currentId": "1",
+                            "messages": {
+                                "1": {"id": "1", "content": "a quick <b>pasta</b>"}
+                            },
+                        },
+                    }
+                }
+            ),
+        )
+
+        with mock_webui_user(id="2"):
+            response = self.fast_api_client.get(self.create_url("/search?text=pas"))
+        assert response.status_code == 200
+        data = response.json()
+        assert [chat["title"] for chat in data] == ["Recipes"]
+        assert "<mark>pasta</mark>" in data[0]["snippet"]
+        assert "&lt;b&gt;" in data[0]["snippet"]
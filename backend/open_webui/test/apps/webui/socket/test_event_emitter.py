@@ -0,0 +1,87 @@
+import asyncio
+
+from open_webui.socket.utils import CoalescingEventEmitter
+
+
+def chunk(content):
+    return {
+        "type": "chat:completion",
+        "data": {"choices": [{"index": 0, "delta": {"content": content}}]},
+    }
+
+
+def run(events, interval=0.04, max_size=4096):
+    emitted = []
+
+    async def emitter(event_data):
+        emitted.append(event_data)
+
+    async def main():
+        event_emitter = CoalescingEventEmitter(emitter, interval, max_size)
+        for event in events:
+            if event == "sleep":
+                await asyncio.sleep(interval * 2)
+            else:
+                await event_emitter(event)
+        await event_emitter.close()
+        return event_emitter
+
+    return asyncio.run(main()), emitted
+
+
+def test_streamed_chunks_are_concatenated():
+    event_emitter, emitted = run([chunk("Hel"), chunk("lo"), chunk(" world")])
+
+    # The first delta goes out immediately, the rest is batched
+    assert [e["data"]["choices"][0]["delta"]["content"] for e in emitted] == [
+        "Hel",
+        "lo world",
+    ]
+    assert (event_emitter.events, event_emitter.emits) == (3, 2)
+
+
+def test_pending_deltas_are_flushed_after_interval():
+    _, emitted = run([chunk("a"), chunk("b"), "sleep", chunk("c")])
+
+    assert [e["data"]["choices"][0]["delta"]["content"] for e in emitted] == [
+        "a",
+        "b",
+        "c",
+    ]
+
+
+def test_full_content_keeps_latest_and_order():
+    events = [
+        {"type": "chat:completion", "data": {"content": "a"}},
+        {"type": "chat:completion", "data": {"content": "ab"}},
+        {"type": "chat:completion", "data": {"content": "abc", "usage": {"x": 1}}},
+        {"type": "status", "data": {"description": "searching"}},
+        {"type": "chat:completion", "data": {"content": "abcd"}},
+        {"type": "chat:completion", "data": {"done": True, "content": "abcd"}},
+    ]
+    _, emitted = run(events)
+
+    assert [e["data"] for e in emitted] == [
+        {"content": "a"},
+        {"content": "abc", "usage": {"x": 1}},
+        {"description": "searching"},
+        {"content": "abcd"},
+        {"done": True, "content": "abcd"},
+    ]
+
+
+def test_max_size_flushes():
+    _, emitted = run([chunk("a"), chunk("bb"), chunk("cc"), chunk("d")], max_size=4)
+
+    assert [e["data"]["choices"][0]["delta"]["content"] for e in emitted] == [
+        "a",
+        "bbcc",
+        "d",
+    ]
+
+
+def test_zero_interval_emits_every_event():
+    events = [chunk("a"), chunk("b"), chunk("c")]
+    _, emitted = run(events, interval=0)
+
+    assert emitted == events
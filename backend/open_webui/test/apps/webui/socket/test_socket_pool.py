@@ -0,0 +1,38 @@
+import asyncio
+
+from open_webui.socket.utils import SocketPool
+
+
+def test_sessions():
+    async def main():
+        pool = SocketPool(usage_timeout=3)
+
+        assert await pool.add_session("a", {"id": "1"}) == ["1"]
+        assert sorted(await pool.add_session("b", {"id": "1"})) == ["1"]
+        assert sorted(await pool.add_session("c", {"id": "2"})) == ["1", "2"]
+
+        assert sorted(await pool.get_user_session_ids("1")) == ["a", "b"]
+        assert await pool.get_sessions(["a", "x"]) == [{"id": "1"}, None]
+
+        assert sorted(await pool.remove_session("a")) == ["1", "2"]
+        assert await pool.is_user_active("1")
+        assert await pool.remove_session("b") == ["2"]
+        assert not await pool.is_user_active("1")
+        assert await pool.remove_session("b") is None
+
+    asyncio.run(main())
+
+
+def test_usage_expires():
+    async def main():
+        pool = SocketPool(usage_timeout=0.05)
+
+        assert await pool.update_usage("llama")
+        assert not await pool.update_usage("llama")
+        assert list(await pool.get_usage()) == ["llama"]
+
+        await asyncio.sleep(0.1)
+        assert await pool.get_usage() == {}
+        assert await pool.update_usage("llama")
+
+    asyncio.run(main())
@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+from open_webui.models.groups import GroupModel, Groups
+from open_webui.utils import access_control
+from open_webui.utils.access_control import filter_accessible, has_access
+
+
+def get_group(id, user_ids):
+    return GroupModel(
+        id=id,
+        user_id="admin",
+        name=id,
+        description="",
+        permissions={},
+        user_ids=user_ids,
+        created_at=0,
+        updated_at=0,
+    )
+
+
+def test_groups_are_cached_until_the_group_table_changes(monkeypatch):
+    groups = [get_group("a", ["u1"])]
+    calls = []
+
+    def get_groups_by_member_id(user_id):
+        calls.append(user_id)
+        return [group for group in groups if user_id in group.user_ids]
+
+    monkeypatch.setattr(Groups, "get_groups_by_member_id", get_groups_by_member_id)
+    Groups.memberships.clear()
+
+    access = {"read": {"group_ids": ["a"], "user_ids": []}}
+    assert has_access("u1", "read", access)
+    assert has_access("u1", "read", access)
+    assert calls == ["u1"]
+
+    groups.clear()
+    Groups.bump_version()
+    assert not has_access("u1", "read", access)
+    assert calls == ["u1", "u1"]
+
+
+def test_filter_accessible(monkeypatch):
+    monkeypatch.setattr(
+        access_control.Groups,
+        "get_cached_groups_by_member_id",
+        lambda user_id: [get_group("a", [user_id])],
+    )
+
+    resources = [
+        SimpleNamespace(id="owned", user_id="u1", access_control={}),
+        SimpleNamespace(id="public", user_id="u2", access_control=None),
+        SimpleNamespace(
+            id="group",
+            user_id="u2",
+            access_control={"read": {"group_ids": ["a"]}},
+        ),
+        SimpleNamespace(
+            id="user",
+            user_id="u2",
+            access_control={"read": {"user_ids": ["u3"]}},
+        ),
+        SimpleNamespace(id="private", user_id="u2", access_control={}),
+    ]
+
+    assert [r.id for r in filter_accessible("u1", resources)] == [
+        "owned",
+        "public",
+        "group",
+    ]
+    assert [r.id for r in filter_accessible("u1", resources, "write")] == ["owned"]
@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+from aiohttp import web
+
+from open_webui.utils.balancer import OllamaBalancer
+
+CANDIDATES = [(0, "http://a", "llama:latest"), (1, "http://b", "llama:latest")]
+
+
+def test_least_loaded_backend_is_picked():
+    balancer = OllamaBalancer(strategy="least_load")
+
+    requests = [balancer.start_request("http://a", "llama:latest") for _ in range(2)]
+    assert balancer.select(CANDIDATES) == 1
+
+    for request in requests:
+        request.finish()
+    balancer.start_request("http://b", "llama:latest")
+    assert balancer.select(CANDIDATES) == 0
+
+
+def test_warm_backend_is_preferred():
+    balancer = OllamaBalancer(strategy="warm")
+    for url, models in [("http://a", set()), ("http://b", {"llama:latest"})]:
+        backend = balancer.get_backend(url)
+        backend.loaded_models = models
+        backend.loaded_models_at = time.time()
+
+    # Still quicker than loading the model elsewhere
+    for _ in range(3):
+        balancer.start_request("http://b", "llama:latest")
+    assert balancer.select(CANDIDATES) == 1
+
+    for _ in range(10):
+        balancer.start_request("http://b", "llama:latest")
+    assert balancer.select(CANDIDATES) == 0
+
+
+def test_failing_backend_is_skipped_until_probe_succeeds():
+    balancer = OllamaBalancer(failure_threshold=2, cooldown=0.05)
+
+    for _ in range(2):
+        balancer.start_request("http://a", "llama:latest").finish(failed=True)
+    assert balancer.get_backend("http://a").get_state(time.monotonic()) == "open"
+    assert all(balancer.select(CANDIDATES) == 1 for _ in range(10))
+
+    time.sleep(0.06)
+    backend = balancer.get_backend("http://a")
+    assert backend.get_state(time.monotonic()) == "half_open"
+
+    # A single probe at a time
+    probe = balancer.start_request("http://a", "llama:latest")
+    assert not backend.is_available(time.monotonic())
+    probe.first_token()
+    probe.finish()
+
+    assert backend.get_state(time.monotonic()) == "closed"
+    assert backend.ttft is not None
+
+
+def test_poll_errors_are_counted_apart_from_failures():
+    balancer = OllamaBalancer(failure_threshold=3)
+    statuses = [500, 200]
+
+    async def ps(request):
+        status = statuses.pop(0)
+        if status != 200:
+            return web.Response(status=status)
+        return web.json_response({"models": [{"model": "llama:latest"}]})
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/api/ps", ps)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+        try:
+            balancer.start_request(url, "llama:latest").finish(failed=True)
+            await balancer.refresh_backend(url, {})
+            stats = balancer.get_stats([url])[0]
+            await balancer.refresh_backend(url, {})
+            return stats, balancer.get_stats([url])[0]
+        finally:
+            await runner.cleanup()
+
+    failed, polled = asyncio.run(run())
+
+    assert (failed["failures"], failed["poll_errors"]) == (1, 1)
+    assert failed["consecutive_failures"] == 2
+    # Any successful poll resets the streak, even with the circuit closed
+    assert polled["consecutive_failures"] == 0
+    assert polled["loaded_models"] == ["llama:latest"]
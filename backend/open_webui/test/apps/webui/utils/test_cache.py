@@ -0,0 +1,54 @@
+import time
+
+from pydantic import BaseModel
+
+from open_webui.utils.cache import TTLCache
+
+
+class Item(BaseModel):
+    id: str
+
+
+def test_entries_expire():
+    cache = TTLCache("items", ttl=0.05, model=Item)
+    cache.set("a", Item(id="a"))
+
+    assert cache.get("a") == Item(id="a")
+    time.sleep(0.06)
+    assert cache.get("a") is None
+
+
+def test_least_recently_used_is_evicted():
+    cache = TTLCache("items", ttl=60, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert [cache.get(key) for key in ["a", "b", "c"]] == [1, None, 3]
+
+    cache.delete("a", "c")
+    assert cache.entries == {}
+
+
+def test_zero_ttl_disables_cache():
+    cache = TTLCache("items", ttl=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_expired_entries_can_be_peeked():
+    cache = TTLCache("items", ttl=0.05, maxsize=2)
+    cache.set("a", 1)
+    time.sleep(0.06)
+
+    assert cache.get("a") is None
+    assert cache.peek("a") == 1
+
+    cache.set("b", 2)
+    cache.set("c", 3)
+    assert cache.peek("a") is None
+
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["expired"]) == (0, 1, 1)
+    assert (stats["entries"], stats["evictions"]) == (2, 1)
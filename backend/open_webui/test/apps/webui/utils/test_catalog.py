@@ -0,0 +1,100 @@
+import asyncio
+from types import SimpleNamespace
+
+from aiohttp import web
+from fastapi import FastAPI
+
+import open_webui.utils.catalog as catalog
+from open_webui.utils.catalog import ModelCatalog
+from open_webui.utils.http import upstream_sessions
+
+
+async def build_all_models(request):
+    return [
+        {"id": model["model"], "name": model["name"]}
+        for model in (
+            await request.app.state.MODEL_CATALOG.get_upstream_models(request, "ollama")
+        )["models"]
+    ]
+
+
+def get_app(model_catalog, base_urls):
+    app = FastAPI()
+    app.state.config = SimpleNamespace(
+        ENABLE_OLLAMA_API=True,
+        OLLAMA_BASE_URLS=base_urls,
+        OLLAMA_API_CONFIGS={},
+        ENABLE_OPENAI_API=False,
+        OPENAI_API_BASE_URLS=[],
+        OPENAI_API_KEYS=[],
+        OPENAI_API_CONFIGS={},
+    )
+    app.state.MODEL_CATALOG = model_catalog
+    model_catalog.app = app
+    return app
+
+
+def test_models_are_served_from_snapshot(monkeypatch):
+    monkeypatch.setattr(catalog, "build_all_models", build_all_models)
+
+    async def main():
+        tags = {"models": [{"model": "llama", "name": "llama"}]}
+        hits = []
+
+        async def handler(request):
+            hits.append(request.path)
+            return web.json_response(tags)
+
+        server = web.Application()
+        server.router.add_get("/api/tags", handler)
+        runner = web.AppRunner(server)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        model_catalog = ModelCatalog(interval=10, timeout=1)
+        events = []
+        model_catalog.on_change(events.append)
+
+        # The second upstream is down
+        app = get_app(model_catalog, [f"http://127.0.0.1:{port}", "http://127.0.0.1:1"])
+        request = model_catalog.get_request()
+
+        try:
+            for _ in range(3):
+                models = await model_catalog.get_models(request)
+                assert [model["id"] for model in models] == ["llama"]
+            assert len(hits) == 1
+            assert list(app.state.MODELS) == ["llama"]
+            assert app.state.OLLAMA_MODELS["llama"]["urls"] == [0]
+
+            upstream = model_catalog.upstreams[f"ollama:1:http://127.0.0.1:1"]
+            assert upstream.failures == 1 and upstream.error
+
+            # A failed refresh keeps the last good model list
+            await runner.cleanup()
+            await model_catalog.refresh(request)
+            models = await model_catalog.get_models(request)
+            assert [model["id"] for model in models] == ["llama"]
+
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", port)
+            await site.start()
+
+            tags["models"].append({"model": "qwen", "name": "qwen"})
+            await model_catalog.refresh(request)
+            models = await model_catalog.get_models(request)
+            assert [model["id"] for model in models] == ["llama", "qwen"]
+        finally:
+            await runner.cleanup()
+            await upstream_sessions.close()
+            upstream_sessions.start()
+
+        return events
+
+    events = asyncio.run(main())
+    assert [(event["version"], event["added"]) for event in events] == [
+        (1, ["llama"]),
+        (2, ["qwen"]),
+    ]
@@ -0,0 +1,100 @@
+from open_webui.utils.content_blocks import (
+    ContentBlockParser,
+    ContentBlockSerializer,
+)
+
+TAGS = {
+    "think": "reasoning",
+    "thinking": "reasoning",
+    "code_interpreter": "code_interpreter",
+}
+
+
+def feed(deltas):
+    content_blocks = [{"type": "text", "content": ""}]
+    parser = ContentBlockParser(content_blocks, TAGS)
+    end = False
+    for value in deltas:
+        end = parser.feed(value)
+        if end:
+            break
+    return content_blocks, end
+
+
+def test_reasoning_block_split_across_deltas():
+    content_blocks, end = feed(
+        [
+            "Hi <thi",
+            "nking>step",
+            " one\n",
+            "step two</thin",
+            "king>\n\nThe answer",
+            " is 4",
+        ]
+    )
+
+    assert not end
+    assert [block["type"] for block in content_blocks] == [
+        "text",
+        "reasoning",
+        "text",
+    ]
+    assert content_blocks[0]["content"] == "Hi "
+    assert content_blocks[1]["tag"] == "thinking"
+    assert content_blocks[1]["content"] == "step one\nstep two"
+    assert content_blocks[2]["content"] == "The answer is 4"
+
+
+def test_text_that_is_not_a_tag():
+    content_blocks, _ = feed(["if a <", "b and c <th", "e end> d"])
+
+    assert content_blocks == [{"type": "text", "content": "if a <b and c <the end> d"}]
+
+
+def test_code_interpreter_block_ends_response():
+    content_blocks, end = feed(
+        [
+            '<code_interpreter type="code" lang="python">',
+            "print(1)",
+            "</code_",
+            "interpreter>ignored",
+        ]
+    )
+
+    assert end
+    assert content_blocks[-1]["type"] == "code_interpreter"
+    assert content_blocks[-1]["attributes"] == {"type": "code", "lang": "python"}
+    assert content_blocks[-1]["content"] == "print(1)"
+
+
+def test_empty_block_is_removed():
+    content_blocks, _ = feed(["<think>", " </think>", "Hello"])
+
+    assert content_blocks == [{"type": "text", "content": "Hello"}]
+
+
+def test_serializer_matches_uncached_render():
+    content_blocks = [{"type": "text", "content": ""}]
+    parser = ContentBlockParser(content_blocks, TAGS)
+    serializer = ContentBlockSerializer()
+
+    for value in ["<think>", "a\n", "> b\nc", "\nd", "</think>", "Done", "!"]:
+        parser.feed(value)
+        assert serializer.serialize(
+            content_blocks
+        ) == ContentBlockSerializer().serialize(content_blocks)
+
+    content_blocks.append(
+        {
+            "type": "tool_calls",
+            "content": [{"id": "1", "function": {"name": "search"}}],
+        }
+    )
+    assert "Tool Executing..." in serializer.serialize(content_blocks)
+
+    content_blocks[-1]["results"] = [{"tool_call_id": "1", "content": "ok"}]
+    assert "> search: ok" in serializer.serialize(content_blocks)
+    assert (
+        serializer.serialize(content_blocks, raw=True)
+        == "<think>a\n> b\nc\nd</think>\nDone!"
+    )
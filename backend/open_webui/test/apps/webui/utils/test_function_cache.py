@@ -0,0 +1,80 @@
+import asyncio
+from types import ModuleType, SimpleNamespace
+
+import pytest
+from pydantic import BaseModel
+
+from open_webui.models.functions import Functions
+from open_webui.utils.function_cache import FunctionCache
+
+
+def get_module(name):
+    module = ModuleType(name)
+
+    class Valves(BaseModel):
+        priority: int = 0
+
+    def inlet(body, __id__=None):
+        return {**body, "filters": body.get("filters", []) + [__id__]}
+
+    module.Valves = Valves
+    module.valves = Valves()
+    module.inlet = inlet
+    return module
+
+
+@pytest.fixture
+def functions(monkeypatch):
+    valves = {"a": {"priority": 2}, "b": {"priority": 1}, "c": {}}
+    calls = []
+
+    def get_function_by_id(id):
+        calls.append(id)
+        return SimpleNamespace(id=id) if id in valves else None
+
+    monkeypatch.setattr(Functions, "get_function_by_id", get_function_by_id)
+    monkeypatch.setattr(
+        Functions,
+        "get_global_filter_functions",
+        lambda: [SimpleNamespace(id="a")],
+    )
+    monkeypatch.setattr(
+        Functions,
+        "get_functions_by_type",
+        lambda type, active_only=False: [SimpleNamespace(id=id) for id in valves],
+    )
+    monkeypatch.setattr(Functions, "get_function_valves_by_id", valves.get)
+
+    request = SimpleNamespace(
+        app=SimpleNamespace(
+            state=SimpleNamespace(FUNCTIONS={id: get_module(id) for id in valves})
+        )
+    )
+    return request, valves, calls
+
+
+def test_filters_are_ordered_and_cached(functions):
+    request, valves, calls = functions
+    cache = FunctionCache(ttl=60)
+    model = {"id": "m", "info": {"meta": {"filterIds": ["b", "missing"]}}}
+
+    for _ in range(2):
+        filters = cache.get_filters(request, model)
+        assert [filter.id for filter in filters] == ["b", "a"]
+
+    async def run_inlets(body):
+        for filter in filters:
+            inlet = filter.get_handler("inlet")
+            assert inlet.parameters == {"body", "__id__"}
+            body = await inlet(body=body, __id__=filter.id)
+        return body
+
+    assert asyncio.run(run_inlets({})) == {"filters": ["b", "a"]}
+    assert calls == ["b", "a"]
+    assert request.app.state.FUNCTIONS["a"].valves.priority == 2
+
+    valves["a"] = {"priority": 0}
+    cache.invalidate("a")
+    assert [filter.id for filter in cache.get_filters(request, model)] == ["a", "b"]
+    assert request.app.state.FUNCTIONS["a"].valves.priority == 0
+    assert calls == ["b", "a", "a"]
@@ -0,0 +1,59 @@
+import asyncio
+
+from aiohttp import web
+
+from open_webui.utils.http import UpstreamSessions, cleanup_response
+
+
+def test_upstream_connections_are_reused():
+    async def main():
+        async def handler(request):
+            return web.json_response({"status": True})
+
+        app = web.Application()
+        app.router.add_get("/api/version", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        upstream_sessions = UpstreamSessions(limit=4)
+        try:
+            url = f"http://127.0.0.1:{port}/api/version"
+            for _ in range(3):
+                session = upstream_sessions.get_session(url)
+                r = await session.get(url)
+                assert await r.json() == {"status": True}
+                await cleanup_response(r)
+
+            assert upstream_sessions.get_session(url.upper()) is session
+            return upstream_sessions.get_metrics()[f"http://127.0.0.1:{port}"]
+        finally:
+            await upstream_sessions.close()
+            await runner.cleanup()
+
+    metrics = asyncio.run(main())
+    assert metrics["requests"] == 3
+    assert metrics["connections_created"] == 1
+    assert metrics["connections_reused"] == 2
+    assert metrics["in_use"] == 0
+
+
+def test_least_recently_used_sessions_are_closed():
+    async def main():
+        upstream_sessions = UpstreamSessions(limit=4, max_sessions=2)
+        try:
+            a = upstream_sessions.get_session("http://a.example/api")
+            b = upstream_sessions.get_session("http://b.example/api")
+            assert upstream_sessions.get_session("http://a.example/v1") is a
+            upstream_sessions.get_session("http://c.example/api")
+            await asyncio.sleep(0)
+
+            return a.closed, b.closed, list(upstream_sessions.sessions)
+        finally:
+            await upstream_sessions.close()
+
+    a_closed, b_closed, upstreams = asyncio.run(main())
+    assert (a_closed, b_closed) == (False, True)
+    assert upstreams == ["http://a.example", "http://c.example"]
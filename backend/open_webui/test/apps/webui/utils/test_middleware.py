@@ -0,0 +1,59 @@
+import asyncio
+from types import SimpleNamespace
+
+import open_webui.utils.middleware as middleware
+from open_webui.utils.middleware import process_chat_response
+
+
+def test_non_streaming_response_is_saved_and_notified(monkeypatch):
+    events, saved, webhooks = [], [], []
+
+    async def event_emitter(event):
+        events.append(event)
+
+    async def get_active_status_by_user_id(user_id):
+        return False
+
+    monkeypatch.setattr(middleware, "get_event_emitter", lambda metadata: event_emitter)
+    monkeypatch.setattr(middleware, "get_event_call", lambda metadata: None)
+    monkeypatch.setattr(
+        middleware, "get_active_status_by_user_id", get_active_status_by_user_id
+    )
+    monkeypatch.setattr(
+        middleware.Chats,
+        "upsert_message_to_chat_by_id_and_message_id",
+        lambda chat_id, message_id, message: saved.append(message),
+    )
+    monkeypatch.setattr(
+        middleware.Chats, "get_chat_title_by_id", lambda chat_id: "Title"
+    )
+    monkeypatch.setattr(
+        middleware.Chats, "get_messages_by_chat_id", lambda chat_id: None
+    )
+    monkeypatch.setattr(
+        middleware.Users, "get_user_webhook_url_by_id", lambda user_id: "http://hook"
+    )
+    monkeypatch.setattr(
+        middleware,
+        "post_webhook",
+        lambda url, message, event_data: webhooks.append(event_data["message"]),
+    )
+
+    request = SimpleNamespace(
+        app=SimpleNamespace(
+            state=SimpleNamespace(config=SimpleNamespace(WEBUI_URL="http://webui"))
+        )
+    )
+    response = {"choices": [{"message": {"content": "Hello"}}]}
+    metadata = {"session_id": "s", "chat_id": "c", "message_id": "m"}
+
+    result = asyncio.run(
+        process_chat_response(
+            request, response, {}, SimpleNamespace(id="u"), [], metadata, {}
+        )
+    )
+
+    assert result is response
+    assert saved == [{"content": "Hello"}]
+    assert events[-1]["data"] == {"done": True, "content": "Hello", "title": "Title"}
+    assert webhooks == ["Hello"]
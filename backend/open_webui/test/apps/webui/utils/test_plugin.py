@@ -0,0 +1,25 @@
+import marshal
+
+from open_webui.utils import plugin
+
+
+def test_compiled_plugins_are_cached_by_content(tmp_path, monkeypatch):
+    monkeypatch.setattr(plugin, "PLUGIN_CACHE_DIR", tmp_path)
+    content = "class Filter:\n    priority = 1\n"
+
+    code, path = plugin.compile_plugin(content)
+    namespace = {}
+    exec(code, namespace)
+    assert namespace["Filter"].priority == 1
+    assert open(path).read() == content
+
+    # Reused from disk rather than compiled again
+    (code_path,) = tmp_path.glob("*.marshal")
+    code_path.write_bytes(marshal.dumps(compile("cached = True", path, "exec")))
+    code, _ = plugin.compile_plugin(content)
+    namespace = {}
+    exec(code, namespace)
+    assert namespace == {"__builtins__": namespace["__builtins__"], "cached": True}
+
+    code, other_path = plugin.compile_plugin(content.replace("1", "2"))
+    assert other_path != path
@@ -0,0 +1,57 @@
+import asyncio
+import os
+import time
+
+from open_webui.utils.speech_cache import SpeechCache
+
+
+def write(cache, name, size, used_at):
+    path = cache.get_path(name)
+    path.write_bytes(b"x" * size)
+    os.utime(path, (used_at, used_at))
+
+
+def test_least_recently_used_is_evicted(tmp_path):
+    cache = SpeechCache(tmp_path, max_size=250, max_age=3600)
+    now = time.time()
+    write(cache, "a", 100, now - 30)
+    write(cache, "b", 100, now - 20)
+    write(cache, "c", 100, now - 10)
+    cache.get("a")
+
+    assert cache.clean() == 1
+    assert sorted(path.stem for path in tmp_path.glob("*.mp3")) == ["a", "c"]
+    assert sorted(cache.load_index()) == ["a", "c"]
+
+
+def test_expired_entries_are_evicted(tmp_path):
+    cache = SpeechCache(tmp_path, max_size=1000, max_age=60)
+    write(cache, "a", 100, time.time() - 120)
+    write(cache, "b", 100, time.time())
+
+    assert cache.clean() == 1
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+
+
+def test_tee_only_caches_complete_streams(tmp_path):
+    cache = SpeechCache(tmp_path, max_size=1000, max_age=60)
+
+    async def chunks(fail):
+        yield b"ab"
+        if fail:
+            raise ConnectionError()
+        yield b"cd"
+
+    async def consume(name, fail=False):
+        return [chunk async for chunk in cache.tee(name, chunks(fail), {})]
+
+    assert asyncio.run(consume("a")) == [b"ab", b"cd"]
+    assert cache.get("a").read_bytes() == b"abcd"
+
+    try:
+        asyncio.run(consume("b", fail=True))
+    except ConnectionError:
+        pass
+    assert cache.get("b") is None
+    assert list(tmp_path.glob("*.part")) == []
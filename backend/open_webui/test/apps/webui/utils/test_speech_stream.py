@@ -0,0 +1,92 @@
+import asyncio
+import random
+
+from open_webui.utils.content_blocks import ContentBlockParser
+from open_webui.utils.speech_stream import SentenceSegmenter, SpeechStream
+
+
+def test_sentences_are_split_as_they_complete():
+    segmenter = SentenceSegmenter()
+    sentences = []
+    for chunk in [
+        "The **quick** brown fox jumps over the lazy dog, ",
+        "then it runs away. Short one! And here",
+        " is some code:\n```python\nprint('a. b. c.')\n``",
+        "`\nThat was the code, and this sentence ends the reply",
+    ]:
+        sentences += segmenter.feed(chunk)
+
+    assert sentences == [
+        "The quick brown fox jumps over the lazy dog, then it runs away.",
+    ]
+    assert segmenter.flush() == [
+        "Short one! And here is some code: That was the code, "
+        "and this sentence ends the reply",
+    ]
+
+
+def test_audio_is_emitted_in_order():
+    events = []
+    running = 0
+    max_running = 0
+
+    async def synthesize(text):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(random.random() / 100)
+        running -= 1
+        return text.encode("utf-8"), "audio/mpeg"
+
+    async def event_emitter(event):
+        events.append(event["data"])
+
+    async def main():
+        stream = SpeechStream(synthesize, event_emitter, concurrency=2)
+        block = {"type": "text", "content": ""}
+        for idx in range(6):
+            block[
+                "content"
+            ] += f"This is sentence number {idx} of the response being streamed. "
+            stream.feed_block(block, len(block["content"]))
+        await stream.close()
+
+    asyncio.run(main())
+
+    assert [event.get("index") for event in events] == [0, 1, 2, 3, 4, 5, None]
+    assert events[-1] == {"done": True}
+    assert max_running == 2
+
+
+def test_reasoning_split_across_chunks_is_not_spoken():
+    events = []
+
+    async def synthesize(text):
+        return text.encode("utf-8"), "audio/mpeg"
+
+    async def event_emitter(event):
+        events.append(event["data"])
+
+    async def main():
+        content_blocks = [{"type": "text", "content": ""}]
+        parser = ContentBlockParser(content_blocks, {"think": "reasoning"})
+        stream = SpeechStream(
+            synthesize, event_emitter, concurrency=2, content_blocks=content_blocks
+        )
+        for chunk in [
+            "<",
+            "think>The user wants secret internal reasoning here.",
+            " More reasoning that should never be read out loud.</think>",
+            "This is the answer that should be spoken to the user in full.",
+        ]:
+            parser.feed(chunk)
+            if content_blocks[-1]["type"] == "text":
+                stream.feed_block(content_blocks[-1], parser.offset)
+        await stream.close()
+
+    asyncio.run(main())
+
+    assert [event.get("text") for event in events] == [
+        "This is the answer that should be spoken to the user in full.",
+        None,
+    ]
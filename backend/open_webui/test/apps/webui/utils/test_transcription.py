@@ -0,0 +1,41 @@
+import time
+import wave
+from types import SimpleNamespace
+
+import pytest
+
+from open_webui.utils.transcription import SAMPLING_RATE, WhisperEngine
+
+pytest.importorskip("faster_whisper")
+
+
+class Model:
+    def transcribe(self, audio, beam_size=5):
+        # Later chunks finish first
+        time.sleep(0.1 if len(audio) > SAMPLING_RATE else 0)
+
+        def segments():
+            yield SimpleNamespace(start=0.0, end=0.5, text=f" {len(audio)}")
+
+        return segments(), SimpleNamespace(language="en", language_probability=1.0)
+
+
+def test_chunks_are_transcribed_in_parallel_and_in_order(tmp_path, monkeypatch):
+    file_path = str(tmp_path / "audio.wav")
+    with wave.open(file_path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLING_RATE)
+        f.writeframes(b"\0\0" * SAMPLING_RATE * 4)
+
+    engine = WhisperEngine(workers=2, chunk_length=30)
+    monkeypatch.setattr(
+        engine,
+        "split",
+        lambda audio: [(0, 2 * SAMPLING_RATE), (3 * SAMPLING_RATE, 4 * SAMPLING_RATE)],
+    )
+
+    assert list(engine.transcribe(Model(), file_path)) == [
+        {"start": 0.0, "end": 0.5, "text": f" {2 * SAMPLING_RATE}"},
+        {"start": 3.0, "end": 3.5, "text": f" {SAMPLING_RATE}"},
+    ]
@@ -0,0 +1,374 @@
+"""
+Replays a streamed reasoning model response through the previous
+regex-based tag handling and the incremental ContentBlockParser /
+ContentBlockSerializer, serializing the message after every delta like
+the chat middleware does.
+
+    python -m open_webui.test.benchmarks.bench_content_blocks [--tokens 20000]
+    python -m open_webui.test.benchmarks.bench_content_blocks --stream stream.txt
+
+`--stream` replays a recorded response: the raw "data: {...}" lines of a
+/api/chat/completions event stream. Without it a reproducible stream of
+`--tokens` deltas is generated.
+"""
+
+import argparse
+import html
+import json
+import random
+import re
+import time
+
+from open_webui.utils.content_blocks import (
+    ContentBlockParser,
+    ContentBlockSerializer,
+)
+
+REASONING_TAGS = ["think", "thinking", "reason", "reasoning", "thought", "Thought"]
+CODE_INTERPRETER_TAGS = ["code_interpreter"]
+
+WORDS = (
+    "the a model answer we should check whether this value is <b> x < y "
+    "first then compute result so maybe wait step consider"
+).split(" ")
+
+
+# Previous implementation, copied from utils/middleware.py
+
+
+def legacy_serialize_content_blocks(content_blocks, raw=False):
+    content = ""
+
+    for block in content_blocks:
+        if block["type"] == "text":
+            content = f"{content}{block['content'].strip()}\n"
+        elif block["type"] == "tool_calls":
+            attributes = block.get("attributes", {})
+
+            block_content = block.get("content", [])
+            results = block.get("results", [])
+
+            if results:
+
+                result_display_content = ""
+
+                for result in results:
+                    tool_call_id = result.get("tool_call_id", "")
+                    tool_name = ""
+
+                    for tool_call in block_content:
+                        if tool_call.get("id", "") == tool_call_id:
+                            tool_name = tool_call.get("function", {}).get("name", "")
+                            break
+
+                    result_display_content = f"{result_display_content}\n> {tool_name}: {result.get('content', '')}"
+
+                if not raw:
+                    content = f'{content}\n<details type="tool_calls" done="true" content="{html.escape(json.dumps(block_content))}" results="{html.escape(json.dumps(results))}">\n<summary>Tool Executed</summary>\n{result_display_content}\n</details>\n'
+            else:
+                tool_calls_display_content = ""
+
+                for tool_call in block_content:
+                    tool_calls_display_content = f"{tool_calls_display_content}\n> Executing {tool_call.get('function', {}).get('name', '')}"
+
+                if not raw:
+                    content = f'{content}\n<details type="tool_calls" done="false" content="{html.escape(json.dumps(block_content))}">\n<summary>Tool Executing...</summary>\n{tool_calls_display_content}\n</details>\n'
+
+        elif block["type"] == "reasoning":
+            reasoning_display_content = "\n".join(
+                (f"> {line}" if not line.startswith(">") else line)
+                for line in block["content"].splitlines()
+            )
+
+            reasoning_duration = block.get("duration", None)
+
+            if reasoning_duration is not None:
+                if raw:
+                    content = f'{content}\n<{block["tag"]}>{block["content"]}</{block["tag"]}>\n'
+                else:
+                    content = f'{content}\n<details type="reasoning" done="true" duration="{reasoning_duration}">\n<summary>Thought for {reasoning_duration} seconds</summary>\n{reasoning_display_content}\n</details>\n'
+            else:
+                if raw:
+                    content = f'{content}\n<{block["tag"]}>{block["content"]}</{block["tag"]}>\n'
+                else:
+                    content = f'{content}\n<details type="reasoning" done="false">\n<summary>Thinking…</summary>\n{reasoning_display_content}\n</details>\n'
+
+        elif block["type"] == "code_interpreter":
+            attributes = block.get("attributes", {})
+            output = block.get("output", None)
+            lang = attributes.get("lang", "")
+
+            if output:
+                output = html.escape(json.dumps(output))
+
+                if raw:
+                    content = f'{content}\n<code_interpreter type="code" lang="{lang}">\n{block["content"]}\n</code_interpreter>\n```output\n{output}\n```\n'
+                else:
+                    content = f'{content}\n<details type="code_interpreter" done="true" output="{output}">\n<summary>Analyzed</summary>\n```{lang}\n{block["content"]}\n```\n</details>\n'
+            else:
+                if raw:
+                    content = f'{content}\n<code_interpreter type="code" lang="{lang}">\n{block["content"]}\n</code_interpreter>\n'
+                else:
+                    content = f'{content}\n<details type="code_interpreter" done="false">\n<summary>Analyzing...</summary>\n```{lang}\n{block["content"]}\n```\n</details>\n'
+
+        else:
+            block_content = str(block["content"]).strip()
+            content = f"{content}{block['type']}: {block_content}\n"
+
+    return content.strip()
+
+
+def legacy_tag_content_handler(content_type, tags, content, content_blocks):
+    end_flag = False
+
+    def extract_attributes(tag_content):
+        """Extract attributes from a tag if they exist."""
+        attributes = {}
+        if not tag_content:  # Ensure tag_content is not None
+            return attributes
+        # Match attributes in the format: key="value" (ignores single quotes for simplicity)
+        matches = re.findall(r'(\w+)\s*=\s*"([^"]+)"', tag_content)
+        for key, value in matches:
+            attributes[key] = value
+        return attributes
+
+    if content_blocks[-1]["type"] == "text":
+        for tag in tags:
+            # Match start tag e.g., <tag> or <tag attr="value">
+            start_tag_pattern = rf"<{tag}(\s.*?)?>"
+            match = re.search(start_tag_pattern, content)
+            if match:
+                attr_content = (
+                    match.group(1) if match.group(1) else ""
+                )  # Ensure it's not None
+                attributes = extract_attributes(
+                    attr_content
+                )  # Extract attributes safely
+
+                # Capture everything before and after the matched tag
+                before_tag = content[: match.start()]  # Content before opening tag
+                after_tag = content[match.end() :]  # Content after opening tag
+
+                # Remove the start tag from the currently handling text block
+                content_blocks[-1]["content"] = content_blocks[-1]["content"].replace(
+                    match.group(0), ""
+                )
+
+                if before_tag:
+                    content_blocks[-1]["content"] = before_tag
+
+                if not content_blocks[-1]["content"]:
+                    content_blocks.pop()
+
+                # Append the new block
+                content_blocks.append(
+                    {
+                        "type": content_type,
+                        "tag": tag,
+                        "attributes": attributes,
+                        "content": "",
+                        "started_at": time.time(),
+                    }
+                )
+
+                if after_tag:
+                    content_blocks[-1]["content"] = after_tag
+
+                break
+    elif content_blocks[-1]["type"] == content_type:
+        tag = content_blocks[-1]["tag"]
+        # Match end tag e.g., </tag>
+        end_tag_pattern = rf"</{tag}>"
+
+        # Check if the content has the end tag
+        if re.search(end_tag_pattern, content):
+            end_flag = True
+
+            block_content = content_blocks[-1]["content"]
+            # Strip start and end tags from the content
+            start_tag_pattern = rf"<{tag}(.*?)>"
+            block_content = re.sub(start_tag_pattern, "", block_content).strip()
+
+            end_tag_regex = re.compile(end_tag_pattern, re.DOTALL)
+            split_content = end_tag_regex.split(block_content, maxsplit=1)
+
+            # Content inside the tag
+            block_content = split_content[0].strip() if split_content else ""
+
+            # Leftover content (everything after `</tag>`)
+            leftover_content = (
+                split_content[1].strip() if len(split_content) > 1 else ""
+            )
+
+            if block_content:
+                content_blocks[-1]["content"] = block_content
+                content_blocks[-1]["ended_at"] = time.time()
+                content_blocks[-1]["duration"] = int(
+                    content_blocks[-1]["ended_at"] - content_blocks[-1]["started_at"]
+                )
+
+                # Reset the content_blocks by appending a new text block
+                if content_type != "code_interpreter":
+                    if leftover_content:
+
+                        content_blocks.append(
+                            {
+                                "type": "text",
+                                "content": leftover_content,
+                            }
+                        )
+                    else:
+                        content_blocks.append(
+                            {
+                                "type": "text",
+                                "content": "",
+                            }
+                        )
+
+            else:
+                # Remove the block if content is empty
+                content_blocks.pop()
+
+                if leftover_content:
+                    content_blocks.append(
+                        {
+                            "type": "text",
+                            "content": leftover_content,
+                        }
+                    )
+                else:
+                    content_blocks.append(
+                        {
+                            "type": "text",
+                            "content": "",
+                        }
+                    )
+
+            # Clean processed content
+            content = re.sub(
+                rf"<{tag}(.*?)>(.|\n)*?</{tag}>",
+                "",
+                content,
+                flags=re.DOTALL,
+            )
+
+    return content, content_blocks, end_flag
+
+
+def legacy_replay(deltas):
+    content = ""
+    content_blocks = [{"type": "text", "content": ""}]
+    size = 0
+
+    for value in deltas:
+        content = f"{content}{value}"
+        content_blocks[-1]["content"] = content_blocks[-1]["content"] + value
+
+        content, content_blocks, _ = legacy_tag_content_handler(
+            "reasoning", REASONING_TAGS, content, content_blocks
+        )
+        content, content_blocks, end = legacy_tag_content_handler(
+            "code_interpreter", CODE_INTERPRETER_TAGS, content, content_blocks
+        )
+        if end:
+            break
+
+        size += len(legacy_serialize_content_blocks(content_blocks))
+
+    return legacy_serialize_content_blocks(content_blocks), size
+
+
+def replay(deltas):
+    content_blocks = [{"type": "text", "content": ""}]
+    tags = {tag: "reasoning" for tag in REASONING_TAGS}
+    tags.update({tag: "code_interpreter" for tag in CODE_INTERPRETER_TAGS})
+
+    parser = ContentBlockParser(content_blocks, tags)
+    serialize_content_blocks = ContentBlockSerializer().serialize
+    size = 0
+
+    for value in deltas:
+        if parser.feed(value):
+            break
+
+        size += len(serialize_content_blocks(content_blocks))
+
+    return serialize_content_blocks(content_blocks), size
+
+
+def generate_deltas(tokens: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+
+    def words(count):
+        deltas = []
+        for _ in range(count):
+            word = rng.choice(WORDS)
+            deltas.append(f" {word}" if rng.random() > 0.05 else f"{word}\n")
+        return deltas
+
+    # Most of a reasoning model response is spent thinking
+    reasoning = int(tokens * 0.8)
+    return [
+        "<th",
+        "ink>",
+        *words(reasoning - 2),
+        "</think>",
+        "\n\n",
+        *words(tokens - reasoning - 2),
+    ]
+
+
+def load_deltas(path: str) -> list[str]:
+    deltas = []
+    with open(path) as f:
+        for line in f:
+            if not line.startswith("data:"):
+                continue
+            try:
+                data = json.loads(line[len("data:") :].strip())
+            except json.JSONDecodeError:
+                continue
+            for choice in data.get("choices", [])[:1]:
+                value = choice.get("delta", {}).get("content")
+                if value:
+                    deltas.append(value)
+    return deltas
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=20000)
+    parser.add_argument("--stream", help="recorded event stream to replay")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    deltas = (
+        load_deltas(args.stream)
+        if args.stream
+        else generate_deltas(args.tokens, args.seed)
+    )
+    print(f"{len(deltas)} deltas, {sum(len(value) for value in deltas)} characters")
+
+    results = {}
+    for name, fn in [("regex", legacy_replay), ("incremental", replay)]:
+        start = time.perf_counter()
+        content, size = fn(deltas)
+        elapsed = time.perf_counter() - start
+        results[name] = content
+
+        print(
+            f"{name:>12}: {elapsed:8.3f}s  {elapsed / len(deltas) * 1e6:8.1f}us/delta  "
+            f"{size / 1e6:.1f}M characters serialized"
+        )
+
+    # Reasoning durations depend on how long the replay took
+    legacy_content, content = (
+        re.sub(r"\d+ seconds|duration=\"\d+\"", "", results[name])
+        for name in ["regex", "incremental"]
+    )
+    if legacy_content != content:
+        print("warning: final content differs between implementations")
+
+
+if __name__ == "__main__":
+    main()
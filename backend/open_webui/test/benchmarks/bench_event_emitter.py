@@ -0,0 +1,106 @@
+"""
+Simulates concurrent streamed chat completions and counts the socket emits
+and user session lookups (a Redis round-trip with WEBSOCKET_MANAGER=redis)
+with and without CoalescingEventEmitter.
+
+    python -m open_webui.test.benchmarks.bench_event_emitter [--streams 200]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from open_webui.socket.utils import CoalescingEventEmitter
+
+
+class Counter:
+    def __init__(self):
+        self.lookups = 0
+        self.emits = 0
+
+
+def get_emitter(counter: Counter, sessions: int, cache_session_ids: bool):
+    session_ids = None
+
+    async def emitter(event_data):
+        nonlocal session_ids
+        if session_ids is None or not cache_session_ids:
+            counter.lookups += 1
+            session_ids = [f"sid-{idx}" for idx in range(sessions)]
+
+        for _ in session_ids:
+            counter.emits += 1
+            await asyncio.sleep(0)
+
+    return emitter
+
+
+async def stream(event_emitter, deltas: int, rate: float, rng: random.Random):
+    for _ in range(deltas):
+        await event_emitter(
+            {
+                "type": "chat:completion",
+                "data": {"choices": [{"index": 0, "delta": {"content": " token"}}]},
+            }
+        )
+        # Tokens arrive at `rate` per second on average, often in bursts
+        await asyncio.sleep(rng.expovariate(rate))
+
+    await event_emitter({"type": "chat:completion", "data": {"done": True}})
+
+
+async def run(args, interval):
+    counter = Counter()
+    rng = random.Random(args.seed)
+    event_emitters = []
+
+    for _ in range(args.streams):
+        emitter = get_emitter(counter, args.sessions, cache_session_ids=interval > 0)
+        if interval > 0:
+            emitter = CoalescingEventEmitter(emitter, interval=interval)
+        event_emitters.append(emitter)
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *[
+            stream(event_emitter, args.deltas, args.rate, rng)
+            for event_emitter in event_emitters
+        ]
+    )
+    for event_emitter in event_emitters:
+        if isinstance(event_emitter, CoalescingEventEmitter):
+            await event_emitter.close()
+
+    return counter, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--streams", type=int, default=200)
+    parser.add_argument("--deltas", type=int, default=250)
+    parser.add_argument("--rate", type=float, default=50, help="tokens/s per stream")
+    parser.add_argument("--sessions", type=int, default=2, help="sessions per user")
+    parser.add_argument("--interval", type=float, default=0.04)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(
+        f"{args.streams} streams x {args.deltas} deltas at ~{args.rate:.0f} tokens/s, "
+        f"{args.sessions} sessions per user"
+    )
+
+    results = {}
+    for name, interval in [("per delta", 0), ("coalesced", args.interval)]:
+        counter, elapsed = asyncio.run(run(args, interval))
+        results[name] = counter.emits / elapsed
+        print(
+            f"{name:>10}: {counter.emits / elapsed:9.0f} emits/s  "
+            f"{counter.lookups / elapsed:9.0f} session lookups/s  ({elapsed:.1f}s)"
+        )
+
+    print(f"{results['per delta'] - results['coalesced']:.0f} emits/s saved")
+
+
+if __name__ == "__main__":
+    main()
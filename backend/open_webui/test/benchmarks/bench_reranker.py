@@ -0,0 +1,110 @@
+"""
+Measures reranking throughput on CPU, in (query, document) pairs per
+second: first of the model itself at different batch sizes, then of
+concurrent retrievals reranking one after another on the shared model, as
+before, and through the micro-batching Reranker.
+
+    python -m open_webui.test.benchmarks.bench_reranker \
+        [--model cross-encoder/ms-marco-MiniLM-L-6-v2] [--requests 32]
+"""
+
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from open_webui.retrieval.reranker import Reranker
+
+WORDS = (
+    "the model retrieval document query search vector chunk embedding score "
+    "answer context user question relevant index batch worker latency"
+).split()
+
+
+def get_text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def get_requests(args) -> list[list[tuple[str, str]]]:
+    rng = random.Random(args.seed)
+    requests = []
+    for _ in range(args.requests):
+        query = get_text(rng, 8)
+        requests.append([(query, get_text(rng, args.words)) for _ in range(args.docs)])
+    return requests
+
+
+def run(predict, requests, concurrency) -> tuple[float, float]:
+    latencies = []
+
+    def rerank(sentences):
+        start = time.perf_counter()
+        predict(sentences)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(rerank, requests))
+    elapsed = time.perf_counter() - start
+
+    pairs = sum(len(sentences) for sentences in requests)
+    return pairs / elapsed, sum(latencies) / len(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="cross-encoder/ms-marco-MiniLM-L-6-v2")
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--docs", type=int, default=8, help="pairs per request")
+    parser.add_argument("--words", type=int, default=120, help="words per document")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch-sizes", default="1,8,16,32,64")
+    parser.add_argument("--max-wait", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import sentence_transformers
+
+    model = sentence_transformers.CrossEncoder(args.model, device="cpu")
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",")]
+    requests = get_requests(args)
+    pairs = [pair for sentences in requests for pair in sentences]
+
+    # Warm up
+    model.predict(pairs[:8])
+
+    print(f"{args.model}, {len(pairs)} pairs of ~{args.words} words")
+    print("model.predict")
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        model.predict(pairs, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"  batch size {batch_size:>3}: {len(pairs) / elapsed:8.1f} pairs/s")
+
+    print(
+        f"{args.requests} requests of {args.docs} pairs, "
+        f"{args.concurrency} at a time"
+    )
+
+    lock = threading.Lock()
+
+    def predict(sentences):
+        with lock:
+            return model.predict(sentences)
+
+    rate, latency = run(predict, requests, args.concurrency)
+    print(f"  {'serial':>15}: {rate:8.1f} pairs/s  {latency * 1000:7.0f} ms/request")
+
+    for batch_size in batch_sizes:
+        reranker = Reranker(model, batch_size=batch_size, max_wait=args.max_wait)
+        rate, latency = run(reranker.predict, requests, args.concurrency)
+        reranker.close()
+        print(
+            f"  {f'batched ({batch_size})':>15}: {rate:8.1f} pairs/s  "
+            f"{latency * 1000:7.0f} ms/request"
+        )
+
+
+if __name__ == "__main__":
+    main()
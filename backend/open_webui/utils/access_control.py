@@ -1,4 +1,4 @@
-from typing import Optional, Union, List, Dict, Any
+from typing import Optional, Union, List, Dict, Any, TypeVar
 from open_webui.models.users import Users, UserModel
 from open_webui.models.groups import Groups
 
@@ -6,6 +6,8 @@ from open_webui.models.groups import Groups
 from open_webui.config import DEFAULT_USER_PERMISSIONS
 import json
 
+T = TypeVar("T")
+
 
 def fill_missing_permissions(
     permissions: Dict[str, Any], default_permissions: Dict[str, Any]
@@ -53,7 +55,7 @@ def get_permissions(
                     )  # Use the most permissive value (True > False)
         return permissions
 
-    user_groups = Groups.get_groups_by_member_id(user_id)
+    user_groups = Groups.get_cached_groups_by_member_id(user_id)
 
     # Deep copy default permissions to avoid modifying the original dict
     permissions = json.loads(json.dumps(default_permissions))
@@ -93,7 +95,7 @@ def has_permission(
     permission_hierarchy = permission_key.split(".")
 
     # Retrieve user group permissions
-    user_groups = Groups.get_groups_by_member_id(user_id)
+    user_groups = Groups.get_cached_groups_by_member_id(user_id)
 
     for group in user_groups:
         group_permissions = group.permissions
@@ -115,17 +117,50 @@ def has_access(
     if access_control is None:
         return type == "read"
 
-    user_groups = Groups.get_groups_by_member_id(user_id)
-    user_group_ids = [group.id for group in user_groups]
+    user_groups = Groups.get_cached_groups_by_member_id(user_id)
+    return check_access(
+        user_id, {group.id for group in user_groups}, type, access_control
+    )
+
+
+def check_access(
+    user_id: str,
+    user_group_ids: set[str],
+    type: str = "write",
+    access_control: Optional[dict] = None,
+) -> bool:
+    if access_control is None:
+        return type == "read"
+
     permission_access = access_control.get(type, {})
     permitted_group_ids = permission_access.get("group_ids", [])
     permitted_user_ids = permission_access.get("user_ids", [])
 
     return user_id in permitted_user_ids or any(
-        group_id in permitted_group_ids for group_id in user_group_ids
+        group_id in user_group_ids for group_id in permitted_group_ids
     )
 
 
+def filter_accessible(
+    user_id: str,
+    resources: list[T],
+    type: str = "read",
+) -> list[T]:
+    """
+    Filter resources with `user_id` and `access_control` attributes down to
+    those the user owns or has access to, looking up the user's groups once.
+    """
+    user_groups = Groups.get_cached_groups_by_member_id(user_id)
+    user_group_ids = {group.id for group in user_groups}
+
+    return [
+        resource
+        for resource in resources
+        if resource.user_id == user_id
+        or check_access(user_id, user_group_ids, type, resource.access_control)
+    ]
+
+
 # Get all users with access to a resource
 def get_users_with_access(
     type: str = "write", access_control: Optional[dict] = None
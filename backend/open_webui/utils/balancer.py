@@ -0,0 +1,324 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Optional
+
+import aiohttp
+from fastapi import FastAPI
+
+from open_webui.utils.http import upstream_sessions
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    OLLAMA_ROUTING_STRATEGY,
+    OLLAMA_ROUTING_PS_INTERVAL,
+    OLLAMA_ROUTING_FAILURE_THRESHOLD,
+    OLLAMA_ROUTING_COOLDOWN,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["OLLAMA"])
+
+# Assumed until a backend has served a streamed request
+DEFAULT_TTFT = 1.0
+DEFAULT_COLD_TTFT = 10.0
+
+EWMA_ALPHA = 0.2
+
+
+class Backend:
+    def __init__(self, url: str):
+        self.url = url
+
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.poll_errors = 0
+        self.consecutive_failures = 0
+
+        # Time to first token with the model loaded and not loaded (EWMA)
+        self.ttft: Optional[float] = None
+        self.cold_ttft: Optional[float] = None
+
+        # From /api/ps, None until it has been polled
+        self.loaded_models: set[str] = set()
+        self.loaded_models_at: Optional[float] = None
+
+        self.open_until: Optional[float] = None
+
+    def get_state(self, now: float) -> str:
+        if self.open_until is None:
+            return "closed"
+        return "open" if now < self.open_until else "half_open"
+
+    def is_available(self, now: float) -> bool:
+        state = self.get_state(now)
+        # A half open circuit lets a single request through to probe it
+        return state == "closed" or (state == "half_open" and self.in_flight == 0)
+
+    def is_warm(self, model: str) -> bool:
+        # Without /api/ps data every backend is assumed warm
+        return self.loaded_models_at is None or model in self.loaded_models
+
+
+class BackendRequest:
+    """Tracks a request to a backend, `finish()` must be called exactly once."""
+
+    def __init__(self, balancer: "OllamaBalancer", backend: Backend, model: str):
+        self.balancer = balancer
+        self.backend = backend
+        self.model = model
+        self.warm = backend.is_warm(model)
+
+        self.started_at = time.monotonic()
+        self.first_token_at: Optional[float] = None
+        self.finished = False
+
+    def first_token(self):
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+
+    def finish(self, failed: bool = False):
+        if not self.finished:
+            self.finished = True
+            self.balancer.finish_request(self, failed)
+
+
+class OllamaBalancer:
+    """
+    Picks the Ollama backend for a model served by several of them.
+
+    Per backend it tracks the requests in flight, the time to first token of
+    streamed responses and the models loaded according to `/api/ps`, which is
+    polled in the background. The `warm` strategy sends a request where it is
+    expected to get its first token soonest, counting the requests queued
+    ahead of it and the time to load the model if it isn't loaded yet.
+    `least_load` only counts the requests in flight.
+
+    Backends that fail `failure_threshold` times in a row are skipped for
+    `cooldown` seconds, then get a single request to probe whether they have
+    recovered. The state is per worker.
+    """
+
+    def __init__(
+        self,
+        strategy: str = OLLAMA_ROUTING_STRATEGY,
+        ps_interval: float = OLLAMA_ROUTING_PS_INTERVAL,
+        failure_threshold: int = OLLAMA_ROUTING_FAILURE_THRESHOLD,
+        cooldown: float = OLLAMA_ROUTING_COOLDOWN,
+    ):
+        self.strategy = strategy
+        self.ps_interval = ps_interval
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+        self.backends: dict[str, Backend] = {}
+        self.app: Optional[FastAPI] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def get_backend(self, url: str) -> Backend:
+        backend = self.backends.get(url)
+        if backend is None:
+            backend = self.backends[url] = Backend(url)
+        return backend
+
+    def get_score(self, backend: Backend, model: str) -> float:
+        """Expected wait for the first token, lower is better."""
+        if self.strategy == "least_load":
+            return backend.in_flight
+
+        ttft = backend.ttft or DEFAULT_TTFT
+        if backend.is_warm(model):
+            return (backend.in_flight + 1) * ttft
+        return backend.in_flight * ttft + (backend.cold_ttft or DEFAULT_COLD_TTFT)
+
+    def select(self, candidates: list[tuple[int, str, str]]) -> int:
+        """
+        Pick one of the (url_idx, url, model) candidates, with the model name
+        as the backend knows it, and return its url_idx.
+        """
+        if len(candidates) == 1:
+            return candidates[0][0]
+
+        if self.strategy == "random":
+            return random.choice(candidates)[0]
+
+        now = time.monotonic()
+        available = [
+            candidate
+            for candidate in candidates
+            if self.get_backend(candidate[1]).is_available(now)
+        ]
+        # Everything is failing, try anyway rather than fail outright
+        if not available:
+            available = candidates
+
+        scores = [
+            (self.get_score(self.get_backend(url), model), url_idx)
+            for url_idx, url, model in available
+        ]
+        best_score = min(score for score, _ in scores)
+        return random.choice(
+            [url_idx for score, url_idx in scores if score <= best_score]
+        )
+
+    def start_request(self, url: str, model: str) -> BackendRequest:
+        backend = self.get_backend(url)
+        backend.in_flight += 1
+        backend.requests += 1
+        return BackendRequest(self, backend, model)
+
+    def finish_request(self, request: BackendRequest, failed: bool):
+        backend = request.backend
+        backend.in_flight -= 1
+
+        if failed:
+            self.record_failure(backend)
+            return
+
+        if request.first_token_at is not None:
+            ttft = request.first_token_at - request.started_at
+            if request.warm:
+                backend.ttft = get_ewma(backend.ttft, ttft)
+            else:
+                backend.cold_ttft = get_ewma(backend.cold_ttft, ttft)
+
+        # Ollama keeps the model loaded for a while after serving it
+        backend.loaded_models.add(request.model)
+        self.record_success(backend)
+
+    def record_failure(self, backend: Backend, poll: bool = False):
+        # Failed /api/ps polls trip the circuit too, but aren't failed requests
+        if poll:
+            backend.poll_errors += 1
+        else:
+            backend.failures += 1
+        backend.consecutive_failures += 1
+
+        # A failed probe opens the circuit again right away
+        if (
+            backend.open_until is not None
+            or backend.consecutive_failures >= self.failure_threshold
+        ):
+            if backend.get_state(time.monotonic()) != "open":
+                log.warning(
+                    f"Ollama backend {backend.url} failed "
+                    f"{backend.consecutive_failures} times in a row, "
+                    f"skipping it for {self.cooldown:.0f}s"
+                )
+            backend.open_until = time.monotonic() + self.cooldown
+
+    def record_success(self, backend: Backend):
+        if backend.open_until is not None:
+            log.info(f"Ollama backend {backend.url} recovered")
+
+        backend.consecutive_failures = 0
+        backend.open_until = None
+
+    ####################################
+    # /api/ps polling
+    ####################################
+
+    def start(self, app: FastAPI):
+        self.app = app
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def run(self):
+        while True:
+            try:
+                await self.refresh_loaded_models()
+            except Exception as e:
+                log.exception(f"Failed to refresh loaded Ollama models: {e}")
+            await asyncio.sleep(self.ps_interval)
+
+    async def refresh_loaded_models(self):
+        config = self.app.state.config
+
+        # Nothing to choose from with a single backend
+        if not config.ENABLE_OLLAMA_API or len(config.OLLAMA_BASE_URLS) < 2:
+            return
+
+        await asyncio.gather(
+            *[
+                self.refresh_backend(
+                    url,
+                    config.OLLAMA_API_CONFIGS.get(
+                        str(idx),
+                        config.OLLAMA_API_CONFIGS.get(url, {}),  # Legacy support
+                    ),
+                )
+                for idx, url in enumerate(config.OLLAMA_BASE_URLS)
+            ]
+        )
+
+    async def refresh_backend(self, url: str, api_config: dict):
+        if not api_config.get("enable", True):
+            return
+
+        key = api_config.get("key", None)
+        backend = self.get_backend(url)
+
+        try:
+            session = upstream_sessions.get_session(url)
+            async with session.get(
+                f"{url}/api/ps",
+                headers={**({"Authorization": f"Bearer {key}"} if key else {})},
+                timeout=aiohttp.ClientTimeout(total=self.ps_interval),
+            ) as r:
+                r.raise_for_status()
+                data = await r.json()
+        except Exception as e:
+            log.debug(f"Failed to get loaded models from {url}: {e}")
+            self.record_failure(backend, poll=True)
+            return
+
+        backend.loaded_models = {
+            model.get("model", model.get("name")) for model in data.get("models", [])
+        }
+        backend.loaded_models_at = time.time()
+
+        # Reachable again, but an open circuit still waits out its cooldown
+        if backend.get_state(time.monotonic()) == "open":
+            backend.consecutive_failures = 0
+        else:
+            self.record_success(backend)
+
+    def get_stats(self, urls: list[str]) -> list[dict]:
+        now = time.monotonic()
+        stats = []
+        for url_idx, url in enumerate(urls):
+            backend = self.get_backend(url)
+            stats.append(
+                {
+                    "url_idx": url_idx,
+                    "url": url,
+                    "state": backend.get_state(now),
+                    "in_flight": backend.in_flight,
+                    "requests": backend.requests,
+                    "failures": backend.failures,
+                    "poll_errors": backend.poll_errors,
+                    "consecutive_failures": backend.consecutive_failures,
+                    "ttft": round(backend.ttft, 3) if backend.ttft else None,
+                    "cold_ttft": (
+                        round(backend.cold_ttft, 3) if backend.cold_ttft else None
+                    ),
+                    "loaded_models": sorted(backend.loaded_models),
+                    "loaded_models_at": backend.loaded_models_at,
+                }
+            )
+        return stats
+
+
+def get_ewma(average: Optional[float], value: float) -> float:
+    if average is None:
+        return value
+    return EWMA_ALPHA * value + (1 - EWMA_ALPHA) * average
+
+
+ollama_balancer = OllamaBalancer()
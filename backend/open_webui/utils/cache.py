@@ -0,0 +1,185 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+import redis
+from pydantic import BaseModel
+
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache with a time to live per entry, evicting the
+    least recently used entries beyond `maxsize`. Expired entries are kept
+    until they are evicted, so that `peek` can still return them.
+
+    With a Redis URL, entries are also stored in Redis so the other workers
+    don't each have to load them, and deletes are published so every worker
+    drops its copy right away instead of serving it until it expires.
+    Values must then be JSON serializable, or instances of `model`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        maxsize: int = 10000,
+        model: Optional[type[BaseModel]] = None,
+        redis_url: Optional[str] = None,
+        prefix: str = "open-webui",
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.model = model
+
+        self.entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+        self.redis = redis.Redis.from_url(redis_url) if redis_url else None
+        self.key_prefix = f"{prefix}:cache:{name}:"
+        self.channel = f"{prefix}:cache:{name}:invalidate"
+        self.pubsub_thread = None
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if self.ttl <= 0:
+            return None
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                self.expired += 1
+
+        if self.redis:
+            try:
+                value = self.redis.get(f"{self.key_prefix}{key}")
+            except Exception as e:
+                log.warning(f"Failed to get {self.name} from Redis: {e}")
+                value = None
+
+            if value is not None:
+                value = (
+                    self.model.model_validate_json(value)
+                    if self.model
+                    else json.loads(value)
+                )
+                self.set_local(key, value)
+                with self.lock:
+                    self.hits += 1
+                return value
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Return the local value even if it has expired, without counting a lookup."""
+        with self.lock:
+            entry = self.entries.get(key)
+            return entry[1] if entry is not None else None
+
+    def set(self, key: Hashable, value: Any):
+        if self.ttl <= 0:
+            return
+
+        self.set_local(key, value)
+
+        if self.redis:
+            try:
+                self.redis.set(
+                    f"{self.key_prefix}{key}",
+                    value.model_dump_json() if self.model else json.dumps(value),
+                    px=int(self.ttl * 1000),
+                )
+            except Exception as e:
+                log.warning(f"Failed to set {self.name} in Redis: {e}")
+
+    def set_local(self, key: Hashable, value: Any):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys: Hashable):
+        self.delete_local(keys)
+
+        if self.redis and keys:
+            try:
+                with self.redis.pipeline(transaction=True) as pipe:
+                    pipe.delete(*[f"{self.key_prefix}{key}" for key in keys])
+                    pipe.publish(self.channel, json.dumps(keys))
+                    pipe.execute()
+            except Exception as e:
+                log.warning(f"Failed to delete {self.name} from Redis: {e}")
+
+    def delete_local(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "ttl": self.ttl,
+                "entries": len(self.entries),
+                "max_entries": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    ####################################
+    # Invalidation from other workers
+    ####################################
+
+    def start(self):
+        if self.redis is None or self.pubsub_thread is not None:
+            return
+
+        def on_message(message):
+            self.delete_local(json.loads(message["data"]))
+
+        def on_error(e, pubsub, thread):
+            log.warning(f"{self.name} cache invalidation failed: {e}")
+            # Redis is unreachable, don't serve entries nobody can invalidate
+            self.clear()
+            time.sleep(1)
+
+        try:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{self.channel: on_message})
+            self.pubsub_thread = pubsub.run_in_thread(
+                sleep_time=1, daemon=True, exception_handler=on_error
+            )
+        except Exception as e:
+            log.warning(f"Failed to subscribe to {self.name} cache invalidation: {e}")
+
+    def stop(self):
+        if self.pubsub_thread is not None:
+            self.pubsub_thread.stop()
+            self.pubsub_thread = None
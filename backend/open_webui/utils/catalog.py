@@ -0,0 +1,508 @@
+import asyncio
+import inspect
+import json
+import logging
+import time
+import uuid
+from typing import Callable, Optional
+
+import redis
+from fastapi import FastAPI, Request
+
+from open_webui.routers import ollama, openai
+from open_webui.utils.models import build_all_models
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    MODEL_CATALOG_REFRESH_INTERVAL,
+    MODEL_CATALOG_REFRESH_TIMEOUT,
+    MODEL_CATALOG_MAX_BACKOFF,
+    WEBSOCKET_MANAGER,
+    WEBSOCKET_REDIS_URL,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
+
+# type -> (router, enable config, base urls config)
+UPSTREAM_TYPES = {
+    "ollama": (ollama, "ENABLE_OLLAMA_API", "OLLAMA_BASE_URLS"),
+    "openai": (openai, "ENABLE_OPENAI_API", "OPENAI_API_BASE_URLS"),
+}
+
+LEASE_TIMEOUT = 15
+LEASE_RENEW_INTERVAL = 5
+
+RENEW_LEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("EXPIRE", KEYS[1], ARGV[2])
+end
+return redis.call("SET", KEYS[1], ARGV[1], "NX", "EX", ARGV[2]) and 1 or 0
+"""
+
+
+class Upstream:
+    def __init__(self, type: str, idx: int, url: str):
+        self.type = type
+        self.idx = idx
+        self.url = url
+
+        # Last good model list, None if disabled or never loaded
+        self.response = None
+        self.updated_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.failures = 0
+        self.refresh_at = 0.0
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.type}:{self.idx}:{self.url}"
+
+
+class ModelCatalog:
+    """
+    Model lists of all upstream APIs, refreshed in the background, and the
+    merged model list built from them.
+
+    Every upstream is refreshed on its own schedule with its own timeout and
+    backs off exponentially while it fails, keeping its last good model list
+    in the meantime. Requests are served from the merged snapshot and only
+    wait on the upstreams for the very first load.
+
+    With a Redis URL the upstream model lists are shared between workers:
+    the worker holding the lease refreshes them and the others load the new
+    lists when notified over pub/sub. Changes to models and functions are
+    announced the same way, so every worker rebuilds its snapshot.
+    """
+
+    def __init__(
+        self,
+        interval: float = MODEL_CATALOG_REFRESH_INTERVAL,
+        timeout: float = MODEL_CATALOG_REFRESH_TIMEOUT,
+        max_backoff: float = MODEL_CATALOG_MAX_BACKOFF,
+        redis_url: Optional[str] = None,
+        prefix: str = "open-webui",
+    ):
+        self.interval = interval
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+
+        self.app: Optional[FastAPI] = None
+        self.upstreams: dict[str, Upstream] = {}
+        self.upstream_models: dict[str, dict] = {}
+        self.models: list[dict] = []
+        self.fingerprints: dict[str, str] = {}
+        self.version = 0
+        self.built_at = 0.0
+        self.dirty = True
+        self.listeners: list[Callable] = []
+
+        self.lock = asyncio.Lock()
+        self.load_task: Optional[asyncio.Task] = None
+        self.upstreams_loaded = False
+        self.tasks: list[asyncio.Task] = []
+
+        self.worker_id = str(uuid.uuid4())
+        self.redis = (
+            redis.asyncio.from_url(redis_url, decode_responses=True)
+            if redis_url
+            else None
+        )
+        self.is_leader = self.redis is None
+        self.lease_checked_at = 0.0
+
+        self.upstreams_key = f"{prefix}:model_catalog:upstreams"
+        self.lease_key = f"{prefix}:model_catalog:lease"
+        self.channel = f"{prefix}:model_catalog:events"
+
+    def get_request(self) -> Request:
+        # The router helpers only need request.app
+        return Request({"type": "http", "app": self.app})
+
+    def on_change(self, listener: Callable):
+        """Call `listener(event)` whenever the merged model list changes."""
+        self.listeners.append(listener)
+
+    ####################################
+    # Public API
+    ####################################
+
+    async def get_models(self, request: Request) -> list[dict]:
+        await self.ensure_loaded(request)
+        if self.dirty:
+            await self.rebuild(only_if_dirty=True)
+        return self.models
+
+    async def get_upstream_models(self, request: Request, type: str) -> dict:
+        if not self.upstreams_loaded:
+            await self.ensure_loaded(request)
+        # Callers replace the model list of the response, not its models
+        return dict(self.upstream_models[type])
+
+    async def invalidate(self):
+        """Rebuild on next access, e.g. after a model or function changed."""
+        self.dirty = True
+        await self.publish({"type": "invalidate"})
+
+    async def refresh(self, request: Request):
+        """Refresh all upstreams right away, e.g. after their config changed."""
+        await self.ensure_loaded(request)
+
+        self.sync_upstreams()
+        await asyncio.gather(
+            *[self.refresh_upstream(upstream) for upstream in self.upstreams.values()]
+        )
+        self.merge_upstreams()
+        await self.rebuild()
+
+    ####################################
+    # Lifecycle
+    ####################################
+
+    def start(self, app: FastAPI):
+        self.app = app
+        self.tasks = [asyncio.create_task(self.run())]
+        if self.redis:
+            self.tasks.append(asyncio.create_task(self.listen()))
+
+    async def stop(self):
+        tasks = self.tasks + [
+            upstream.task for upstream in self.upstreams.values() if upstream.task
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.tasks = []
+
+        if self.redis:
+            await self.redis.aclose()
+
+    async def ensure_loaded(self, request: Request):
+        if self.load_task is None:
+            self.app = self.app or request.app
+            self.load_task = asyncio.create_task(self.load())
+
+        try:
+            await asyncio.shield(self.load_task)
+        except Exception:
+            # Try again on the next call
+            self.load_task = None
+            raise
+
+    async def load(self):
+        self.sync_upstreams()
+
+        # Start from the snapshot of the other workers, if there is one
+        if self.redis:
+            await self.load_upstreams()
+
+        await asyncio.gather(
+            *[
+                self.refresh_upstream(upstream)
+                for upstream in self.upstreams.values()
+                if upstream.updated_at is None
+            ]
+        )
+        self.merge_upstreams()
+        self.upstreams_loaded = True
+
+        await self.rebuild()
+
+    async def run(self):
+        await self.ensure_loaded(self.get_request())
+
+        while True:
+            await asyncio.sleep(1)
+            try:
+                await self.tick()
+            except Exception as e:
+                log.exception(f"Model catalog refresh failed: {e}")
+
+    async def tick(self):
+        if self.sync_upstreams():
+            self.merge_upstreams()
+
+        if self.redis:
+            await self.renew_lease()
+
+        if self.is_leader:
+            now = time.monotonic()
+            for upstream in self.upstreams.values():
+                if upstream.refresh_at <= now and (
+                    upstream.task is None or upstream.task.done()
+                ):
+                    upstream.task = asyncio.create_task(
+                        self.refresh_in_background(upstream)
+                    )
+
+        # Picks up changes to models and functions made without invalidate()
+        if self.dirty or time.monotonic() - self.built_at >= self.interval:
+            await self.rebuild()
+
+    ####################################
+    # Upstreams
+    ####################################
+
+    def sync_upstreams(self) -> bool:
+        """Match the upstreams to the API config, returns whether they changed."""
+        config = self.app.state.config
+
+        upstreams = {}
+        for type, (_, enable, base_urls) in UPSTREAM_TYPES.items():
+            if getattr(config, enable):
+                for idx, url in enumerate(getattr(config, base_urls)):
+                    upstream = Upstream(type, idx, url)
+                    upstreams[upstream.key] = self.upstreams.get(upstream.key, upstream)
+
+        if upstreams.keys() == self.upstreams.keys():
+            return False
+
+        for key in self.upstreams.keys() - upstreams.keys():
+            if self.upstreams[key].task:
+                self.upstreams[key].task.cancel()
+
+        self.upstreams = upstreams
+        self.dirty = True
+        return True
+
+    def merge_upstreams(self):
+        request = self.get_request()
+        config = self.app.state.config
+
+        for type, (router, _, base_urls) in UPSTREAM_TYPES.items():
+            # The routers expect the responses indexed by url_idx
+            responses = [None] * len(getattr(config, base_urls))
+            for upstream in self.upstreams.values():
+                if upstream.type == type and upstream.idx < len(responses):
+                    responses[upstream.idx] = upstream.response
+
+            self.upstream_models[type] = router.merge_models_responses(
+                request, responses
+            )
+
+    async def refresh_upstream(self, upstream: Upstream) -> bool:
+        """Fetch the model list of one upstream, returns whether it changed."""
+        router = UPSTREAM_TYPES[upstream.type][0]
+
+        try:
+            response = await asyncio.wait_for(
+                router.get_models_by_url_idx(self.get_request(), upstream.idx),
+                self.timeout,
+            )
+        except Exception as e:
+            upstream.failures += 1
+            upstream.error = str(e) or e.__class__.__name__
+
+            delay = min(self.interval * 2**upstream.failures, self.max_backoff)
+            upstream.refresh_at = time.monotonic() + delay
+            log.warning(
+                f"Failed to refresh {upstream.type} models from {upstream.url} "
+                f"({upstream.failures} in a row), retrying in {delay:.0f}s: "
+                f"{upstream.error}"
+            )
+            return False
+
+        changed = upstream.updated_at is None or response != upstream.response
+
+        upstream.response = response
+        upstream.updated_at = time.time()
+        upstream.error = None
+        upstream.failures = 0
+        upstream.refresh_at = time.monotonic() + self.interval
+
+        # The config changed while fetching
+        if self.upstreams.get(upstream.key) is not upstream:
+            return False
+
+        if changed and self.redis:
+            await self.save_upstream(upstream)
+        return changed
+
+    async def refresh_in_background(self, upstream: Upstream):
+        if await self.refresh_upstream(upstream):
+            self.merge_upstreams()
+            self.dirty = True
+
+    ####################################
+    # Snapshot
+    ####################################
+
+    async def rebuild(self, only_if_dirty: bool = False):
+        async with self.lock:
+            if only_if_dirty and not self.dirty:
+                return
+
+            self.dirty = False
+            models = await build_all_models(self.get_request())
+
+            self.models = models
+            self.built_at = time.monotonic()
+            self.app.state.MODELS = {model["id"]: model for model in models}
+
+        await self.dispatch_changes(models)
+
+    async def dispatch_changes(self, models: list[dict]):
+        fingerprints = {
+            model["id"]: json.dumps(
+                {key: value for key, value in model.items() if key != "created"},
+                sort_keys=True,
+                default=str,
+            )
+            for model in models
+        }
+
+        event = {
+            "type": "changed",
+            "added": [id for id in fingerprints if id not in self.fingerprints],
+            "removed": [id for id in self.fingerprints if id not in fingerprints],
+            "updated": [
+                id
+                for id, fingerprint in fingerprints.items()
+                if id in self.fingerprints and self.fingerprints[id] != fingerprint
+            ],
+        }
+        self.fingerprints = fingerprints
+
+        if not (event["added"] or event["removed"] or event["updated"]):
+            return
+
+        self.version += 1
+        event["version"] = self.version
+        log.info(
+            f"Model catalog changed (version {self.version}): "
+            f"{len(event['added'])} added, {len(event['removed'])} removed, "
+            f"{len(event['updated'])} updated"
+        )
+
+        for listener in self.listeners:
+            try:
+                result = listener(event)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                log.exception(f"Model catalog listener failed: {e}")
+
+        if self.redis and self.is_leader:
+            await self.publish(event)
+
+    ####################################
+    # Redis
+    ####################################
+
+    async def publish(self, event: dict):
+        if self.redis:
+            try:
+                await self.redis.publish(
+                    self.channel, json.dumps({**event, "worker": self.worker_id})
+                )
+            except Exception as e:
+                log.warning(f"Failed to publish model catalog event: {e}")
+
+    async def save_upstream(self, upstream: Upstream):
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.hset(
+                    self.upstreams_key,
+                    upstream.key,
+                    json.dumps(
+                        {
+                            "response": upstream.response,
+                            "updated_at": upstream.updated_at,
+                        }
+                    ),
+                )
+                pipe.publish(
+                    self.channel,
+                    json.dumps(
+                        {
+                            "type": "upstream",
+                            "key": upstream.key,
+                            "worker": self.worker_id,
+                        }
+                    ),
+                )
+                await pipe.execute()
+        except Exception as e:
+            log.warning(f"Failed to save {upstream.type} models to Redis: {e}")
+
+    async def load_upstreams(self, keys: Optional[list[str]] = None) -> bool:
+        """Load newer upstream model lists from Redis, returns whether any were."""
+        keys = [key for key in keys or self.upstreams.keys() if key in self.upstreams]
+        if not keys:
+            return False
+
+        try:
+            values = await self.redis.hmget(self.upstreams_key, keys)
+        except Exception as e:
+            log.warning(f"Failed to load models from Redis: {e}")
+            return False
+
+        loaded = False
+        for key, value in zip(keys, values):
+            if value is None:
+                continue
+
+            value = json.loads(value)
+            upstream = self.upstreams[key]
+            if upstream.updated_at is None or value["updated_at"] > upstream.updated_at:
+                upstream.response = value["response"]
+                upstream.updated_at = value["updated_at"]
+                loaded = True
+        return loaded
+
+    async def renew_lease(self):
+        now = time.monotonic()
+        if now - self.lease_checked_at < LEASE_RENEW_INTERVAL:
+            return
+        self.lease_checked_at = now
+
+        try:
+            is_leader = bool(
+                await self.redis.eval(
+                    RENEW_LEASE_SCRIPT,
+                    1,
+                    self.lease_key,
+                    self.worker_id,
+                    LEASE_TIMEOUT,
+                )
+            )
+        except Exception as e:
+            # Keep the catalog fresh without Redis
+            log.warning(f"Failed to renew model catalog lease: {e}")
+            is_leader = True
+
+        if is_leader != self.is_leader:
+            log.info(
+                f"Model catalog {'acquired' if is_leader else 'lost'} refresh lease"
+            )
+            self.is_leader = is_leader
+
+    async def listen(self):
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            await self.handle_event(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning(f"Model catalog subscription failed: {e}")
+                await asyncio.sleep(1)
+
+    async def handle_event(self, event: dict):
+        if event.get("worker") == self.worker_id:
+            return
+
+        if event["type"] == "upstream":
+            if await self.load_upstreams([event["key"]]):
+                self.merge_upstreams()
+                self.dirty = True
+        elif event["type"] == "invalidate":
+            self.dirty = True
+
+
+model_catalog = ModelCatalog(
+    redis_url=WEBSOCKET_REDIS_URL if WEBSOCKET_MANAGER == "redis" else None
+)
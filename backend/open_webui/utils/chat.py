@@ -37,7 +37,7 @@ from open_webui.models.functions import Functions
 from open_webui.models.models import Models
 
 
-from open_webui.utils.plugin import load_function_module_by_id
+from open_webui.utils.function_cache import function_cache
 from open_webui.utils.models import get_all_models, check_model_access
 from open_webui.utils.payload import convert_payload_openai_to_ollama
 from open_webui.utils.response import (
@@ -195,53 +195,14 @@ async def chat_completed(request: Request, form_data: dict, user: Any):
         }
     )
 
-    def get_priority(function_id):
-        function = Functions.get_function_by_id(function_id)
-        if function is not None and hasattr(function, "valves"):
-            # TODO: Fix FunctionModel to include vavles
-            return (function.valves if function.valves else {}).get("priority", 0)
-        return 0
-
-    filter_ids = [function.id for function in Functions.get_global_filter_functions()]
-    if "info" in model and "meta" in model["info"]:
-        filter_ids.extend(model["info"]["meta"].get("filterIds", []))
-        filter_ids = list(set(filter_ids))
-
-    enabled_filter_ids = [
-        function.id
-        for function in Functions.get_functions_by_type("filter", active_only=True)
-    ]
-    filter_ids = [
-        filter_id for filter_id in filter_ids if filter_id in enabled_filter_ids
-    ]
-
-    # Sort filter_ids by priority, using the get_priority function
-    filter_ids.sort(key=get_priority)
-
-    for filter_id in filter_ids:
-        filter = Functions.get_function_by_id(filter_id)
-        if not filter:
-            continue
-
-        if filter_id in request.app.state.FUNCTIONS:
-            function_module = request.app.state.FUNCTIONS[filter_id]
-        else:
-            function_module, _, _ = load_function_module_by_id(filter_id)
-            request.app.state.FUNCTIONS[filter_id] = function_module
-
-        if hasattr(function_module, "valves") and hasattr(function_module, "Valves"):
-            valves = Functions.get_function_valves_by_id(filter_id)
-            function_module.valves = function_module.Valves(
-                **(valves if valves else {})
-            )
+    for filter in function_cache.get_filters(request, model):
+        filter_id = filter.id
+        function_module = filter.module
 
-        if not hasattr(function_module, "outlet"):
+        outlet = filter.get_handler("outlet")
+        if outlet is None:
             continue
         try:
-            outlet = function_module.outlet
-
-            # Get the signature of the function
-            sig = inspect.signature(outlet)
             params = {"body": data}
 
             # Extra parameters to be passed to the function
@@ -255,10 +216,10 @@ async def chat_completed(request: Request, form_data: dict, user: Any):
 
             # Add extra params in contained in function signature
             for key, value in extra_params.items():
-                if key in sig.parameters:
+                if key in outlet.parameters:
                     params[key] = value
 
-            if "__user__" in sig.parameters:
+            if "__user__" in outlet.parameters:
                 __user__ = {
                     "id": user.id,
                     "email": user.email,
@@ -278,10 +239,7 @@ async def chat_completed(request: Request, form_data: dict, user: Any):
 
                 params = {**params, "__user__": __user__}
 
-            if inspect.iscoroutinefunction(outlet):
-                data = await outlet(**params)
-            else:
-                data = outlet(**params)
+            data = await outlet(**params)
 
         except Exception as e:
             return Exception(f"Error: {e}")
@@ -295,8 +253,8 @@ async def chat_action(request: Request, action_id: str, form_data: dict, user: A
     else:
         sub_action_id = None
 
-    action = Functions.get_function_by_id(action_id)
-    if not action:
+    loaded = function_cache.get_function(request, action_id)
+    if not loaded:
         raise Exception(f"Action not found: {action_id}")
 
     if not request.app.state.MODELS:
@@ -327,22 +285,11 @@ async def chat_action(request: Request, action_id: str, form_data: dict, user: A
         }
     )
 
-    if action_id in request.app.state.FUNCTIONS:
-        function_module = request.app.state.FUNCTIONS[action_id]
-    else:
-        function_module, _, _ = load_function_module_by_id(action_id)
-        request.app.state.FUNCTIONS[action_id] = function_module
-
-    if hasattr(function_module, "valves") and hasattr(function_module, "Valves"):
-        valves = Functions.get_function_valves_by_id(action_id)
-        function_module.valves = function_module.Valves(**(valves if valves else {}))
+    function_module = loaded.module
 
-    if hasattr(function_module, "action"):
+    action = loaded.get_handler("action")
+    if action is not None:
         try:
-            action = function_module.action
-
-            # Get the signature of the function
-            sig = inspect.signature(action)
             params = {"body": data}
 
             # Extra parameters to be passed to the function
@@ -356,10 +303,10 @@ async def chat_action(request: Request, action_id: str, form_data: dict, user: A
 
             # Add extra params in contained in function signature
             for key, value in extra_params.items():
-                if key in sig.parameters:
+                if key in action.parameters:
                     params[key] = value
 
-            if "__user__" in sig.parameters:
+            if "__user__" in action.parameters:
                 __user__ = {
                     "id": user.id,
                     "email": user.email,
@@ -379,10 +326,7 @@ async def chat_action(request: Request, action_id: str, form_data: dict, user: A
 
                 params = {**params, "__user__": __user__}
 
-            if inspect.iscoroutinefunction(action):
-                data = await action(**params)
-            else:
-                data = action(**params)
+            data = await action(**params)
 
         except Exception as e:
             return Exception(f"Error: {e}")
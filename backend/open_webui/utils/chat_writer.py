@@ -0,0 +1,76 @@
+import logging
+import time
+from typing import Optional
+
+from open_webui.models.chats import Chats
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    REALTIME_CHAT_SAVE_INTERVAL,
+    REALTIME_CHAT_SAVE_MAX_PENDING,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
+
+
+class ChatMessageWriter:
+    """
+    Coalesces the updates of a streamed message into periodic writes.
+
+    Updates are merged into a pending dict and written once `interval`
+    seconds have passed since the last write or `max_pending` characters
+    of new content are buffered. `flush` must be called when the stream
+    ends (including on cancellation) to persist the tail.
+    """
+
+    def __init__(
+        self,
+        chat_id: str,
+        message_id: str,
+        interval: float = REALTIME_CHAT_SAVE_INTERVAL,
+        max_pending: int = REALTIME_CHAT_SAVE_MAX_PENDING,
+    ):
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.interval = interval
+        self.max_pending = max_pending
+
+        self.pending: dict = {}
+        self.pending_size = 0
+        self.last_flush = time.monotonic()
+
+        self.writes = 0
+        self.updates = 0
+
+    def update(self, message: dict, size: Optional[int] = None):
+        self.pending.update(message)
+        self.pending_size += size if size is not None else 1
+        self.updates += 1
+
+        if (
+            self.pending_size >= self.max_pending
+            or time.monotonic() - self.last_flush >= self.interval
+        ):
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+
+        message, self.pending = self.pending, {}
+        self.pending_size = 0
+        self.last_flush = time.monotonic()
+
+        if not Chats.update_message_by_id_and_message_id(
+            self.chat_id, self.message_id, message
+        ):
+            Chats.upsert_message_to_chat_by_id_and_message_id(
+                self.chat_id, self.message_id, message
+            )
+        self.writes += 1
+
+    def close(self):
+        self.flush()
+        log.debug(
+            f"chat {self.chat_id} message {self.message_id}: {self.updates} updates in {self.writes} writes"
+        )
@@ -0,0 +1,283 @@
+import html
+import json
+import re
+import time
+from typing import Optional
+
+
+def extract_attributes(tag_content: str) -> dict:
+    """Extract attributes from a tag if they exist."""
+    attributes = {}
+    if not tag_content:
+        return attributes
+    # Match attributes in the format: key="value" (ignores single quotes for simplicity)
+    for key, value in re.findall(r'(\w+)\s*=\s*"([^"]+)"', tag_content):
+        attributes[key] = value
+    return attributes
+
+
+def render_quoted_lines(content: str) -> str:
+    return "\n".join(
+        (f"> {line}" if not line.startswith(">") else line)
+        for line in content.splitlines()
+    )
+
+
+class ContentBlockParser:
+    """
+    Splits streamed model output into text and tagged blocks
+    (e.g. <think>...</think>) as it arrives.
+
+    Only the newly arrived text of the last block is scanned on each `feed`,
+    so a response is parsed in linear time regardless of its length. The
+    parser works on the caller's `content_blocks` list, which may also be
+    modified between calls (e.g. to append tool call blocks).
+    """
+
+    def __init__(self, content_blocks: list[dict], tags: dict[str, str]):
+        # tags maps tag name -> block type, e.g. {"think": "reasoning"}
+        self.content_blocks = content_blocks
+        self.tags = tags
+        self.block_types = set(tags.values())
+        self.max_tag_length = max(len(tag) for tag in tags)
+
+        self.start_tag_pattern = re.compile(
+            rf"<({'|'.join(re.escape(tag) for tag in tags)})(\s.*?)?>"
+        )
+
+        # Last scanned block and the position up to which it has been scanned
+        self.block: Optional[dict] = None
+        self.offset = 0
+
+    def is_partial_start_tag(self, content: str, position: int) -> bool:
+        """Whether the "<" at `position` may still become a start tag."""
+        name = content[position + 1 : position + 2 + self.max_tag_length]
+        for tag in self.tags:
+            if tag.startswith(name):
+                return True
+            if name.startswith(tag):
+                end = position + 1 + len(tag)
+                if end == len(content) or (
+                    content[end].isspace() and content.find("\n", end + 1) == -1
+                ):
+                    return True
+        return False
+
+    def get_text_offset(self, content: str, start: int) -> int:
+        # No tag can start before the first "<" that is not yet closed by ">"
+        position = max(content.rfind(">", start) + 1, start)
+        while (position := content.find("<", position)) != -1:
+            if self.is_partial_start_tag(content, position):
+                return position
+            position += 1
+        return len(content)
+
+    def start_block(self, match: re.Match) -> dict:
+        block = self.content_blocks[-1]
+        before_tag = block["content"][: match.start()]
+        after_tag = block["content"][match.end() :]
+
+        if before_tag:
+            block["content"] = before_tag
+        else:
+            self.content_blocks.pop()
+
+        tag = match.group(1)
+        block = {
+            "type": self.tags[tag],
+            "tag": tag,
+            "attributes": extract_attributes(match.group(2) or ""),
+            "content": after_tag,
+            "started_at": time.time(),
+        }
+        self.content_blocks.append(block)
+        return block
+
+    def end_block(self, position: int, end_tag: str) -> bool:
+        block = self.content_blocks[-1]
+        block_content = block["content"][:position].strip()
+        leftover_content = block["content"][position + len(end_tag) :].lstrip()
+
+        if block_content:
+            block["content"] = block_content
+            block["ended_at"] = time.time()
+            block["duration"] = int(block["ended_at"] - block["started_at"])
+
+            # The code has to be executed before the response continues
+            if block["type"] == "code_interpreter":
+                return True
+        else:
+            # Remove the block if content is empty
+            self.content_blocks.pop()
+
+        self.content_blocks.append({"type": "text", "content": leftover_content})
+        return False
+
+    def feed(self, value: str) -> bool:
+        """
+        Append streamed text to the last block and split off any blocks it
+        opens or closes. Returns True once a code interpreter block has been
+        closed; the response should then be stopped to run the code.
+        """
+        if not self.content_blocks or (
+            self.content_blocks[-1]["type"] != "text"
+            and self.content_blocks[-1]["type"] not in self.block_types
+        ):
+            self.content_blocks.append({"type": "text", "content": ""})
+
+        block = self.content_blocks[-1]
+        block["content"] = block["content"] + value
+
+        while True:
+            block = self.content_blocks[-1]
+            if block is not self.block:
+                self.block, self.offset = block, 0
+
+            content = block["content"]
+            if block["type"] == "text":
+                match = self.start_tag_pattern.search(content, self.offset)
+                if not match:
+                    self.offset = self.get_text_offset(content, self.offset)
+                    return False
+
+                self.start_block(match)
+            else:
+                end_tag = f"</{block['tag']}>"
+                position = content.find(end_tag, self.offset)
+                if position == -1:
+                    self.offset = max(len(content) - len(end_tag) + 1, 0)
+                    return False
+
+                if self.end_block(position, end_tag):
+                    return True
+
+
+class ContentBlockSerializer:
+    """
+    Renders content blocks to the message content format.
+
+    Blocks that have not changed since the last call are not rendered
+    again, so only the block being streamed costs anything. The reasoning
+    block being streamed is rendered incrementally as well.
+    """
+
+    def __init__(self):
+        # (block index, raw) -> (block values, rendered block)
+        self.cache: dict[tuple[int, bool], tuple[dict, str]] = {}
+        # id(reasoning block) -> (completed lines, their rendered form)
+        self.reasoning_cache: dict[int, tuple[str, str]] = {}
+
+    def serialize(self, content_blocks: list[dict], raw: bool = False) -> str:
+        parts = []
+        for idx, block in enumerate(content_blocks):
+            cached = self.cache.get((idx, raw))
+            if cached and self.is_unchanged(block, cached[0]):
+                parts.append(cached[1])
+                continue
+
+            rendered = self.render_block(block, raw)
+            self.cache[(idx, raw)] = (dict(block), rendered)
+            parts.append(rendered)
+
+        for idx, raw_ in list(self.cache):
+            if idx >= len(content_blocks):
+                del self.cache[(idx, raw_)]
+
+        return "".join(parts).strip()
+
+    @staticmethod
+    def is_unchanged(block: dict, values: dict) -> bool:
+        # Blocks are updated by assigning new values, never in place
+        return len(block) == len(values) and all(
+            key in values and value is values[key] for key, value in block.items()
+        )
+
+    def render_reasoning(self, block: dict) -> str:
+        content = block["content"]
+        key = id(block)
+
+        # Only lines completed since the last call need to be rendered
+        prefix, rendered = self.reasoning_cache.get(key, ("", ""))
+        if not content.startswith(prefix):
+            prefix, rendered = "", ""
+
+        done = content.rfind("\n", len(prefix)) + 1
+        if done > len(prefix):
+            lines = render_quoted_lines(content[len(prefix) : done])
+            rendered = f"{rendered}\n{lines}" if rendered else lines
+            prefix = content[:done]
+            self.reasoning_cache[key] = (prefix, rendered)
+
+        tail = render_quoted_lines(content[len(prefix) :])
+        if rendered and tail:
+            return f"{rendered}\n{tail}"
+        return rendered or tail
+
+    def render_block(self, block: dict, raw: bool) -> str:
+        if block["type"] == "text":
+            return f"{block['content'].strip()}\n"
+
+        elif block["type"] == "tool_calls":
+            block_content = block.get("content", [])
+            results = block.get("results", [])
+
+            if raw:
+                return ""
+
+            if results:
+                result_display_content = ""
+
+                for result in results:
+                    tool_call_id = result.get("tool_call_id", "")
+                    tool_name = ""
+
+                    for tool_call in block_content:
+                        if tool_call.get("id", "") == tool_call_id:
+                            tool_name = tool_call.get("function", {}).get("name", "")
+                            break
+
+                    result_display_content = f"{result_display_content}\n> {tool_name}: {result.get('content', '')}"
+
+                return f'\n<details type="tool_calls" done="true" content="{html.escape(json.dumps(block_content))}" results="{html.escape(json.dumps(results))}">\n<summary>Tool Executed</summary>\n{result_display_content}\n</details>\n'
+            else:
+                tool_calls_display_content = ""
+
+                for tool_call in block_content:
+                    tool_calls_display_content = f"{tool_calls_display_content}\n> Executing {tool_call.get('function', {}).get('name', '')}"
+
+                return f'\n<details type="tool_calls" done="false" content="{html.escape(json.dumps(block_content))}">\n<summary>Tool Executing...</summary>\n{tool_calls_display_content}\n</details>\n'
+
+        elif block["type"] == "reasoning":
+            if raw:
+                return f'\n<{block["tag"]}>{block["content"]}</{block["tag"]}>\n'
+
+            reasoning_display_content = self.render_reasoning(block)
+            reasoning_duration = block.get("duration", None)
+
+            if reasoning_duration is not None:
+                self.reasoning_cache.pop(id(block), None)
+                return f'\n<details type="reasoning" done="true" duration="{reasoning_duration}">\n<summary>Thought for {reasoning_duration} seconds</summary>\n{reasoning_display_content}\n</details>\n'
+            else:
+                return f'\n<details type="reasoning" done="false">\n<summary>Thinking…</summary>\n{reasoning_display_content}\n</details>\n'
+
+        elif block["type"] == "code_interpreter":
+            attributes = block.get("attributes", {})
+            output = block.get("output", None)
+            lang = attributes.get("lang", "")
+
+            if output:
+                output = html.escape(json.dumps(output))
+
+                if raw:
+                    return f'\n<code_interpreter type="code" lang="{lang}">\n{block["content"]}\n</code_interpreter>\n```output\n{output}\n```\n'
+                else:
+                    return f'\n<details type="code_interpreter" done="true" output="{output}">\n<summary>Analyzed</summary>\n```{lang}\n{block["content"]}\n```\n</details>\n'
+            else:
+                if raw:
+                    return f'\n<code_interpreter type="code" lang="{lang}">\n{block["content"]}\n</code_interpreter>\n'
+                else:
+                    return f'\n<details type="code_interpreter" done="false">\n<summary>Analyzing...</summary>\n```{lang}\n{block["content"]}\n```\n</details>\n'
+
+        else:
+            block_content = str(block["content"]).strip()
+            return f"{block['type']}: {block_content}\n"
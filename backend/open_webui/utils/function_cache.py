@@ -0,0 +1,148 @@
+import inspect
+import logging
+from typing import Any, Callable, Optional
+
+from fastapi import Request
+
+from open_webui.models.functions import FunctionModel, Functions
+from open_webui.utils.cache import TTLCache
+from open_webui.utils.plugin import load_function_module_by_id
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    FUNCTION_CACHE_TTL,
+    WEBSOCKET_MANAGER,
+    WEBSOCKET_REDIS_URL,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+class Handler:
+    """A function's inlet, outlet, action or pipe with its parsed signature."""
+
+    def __init__(self, fn: Callable):
+        self.fn = fn
+        self.parameters = frozenset(inspect.signature(fn).parameters)
+        self.is_coroutine = inspect.iscoroutinefunction(fn)
+
+    async def __call__(self, **params) -> Any:
+        if self.is_coroutine:
+            return await self.fn(**params)
+        return self.fn(**params)
+
+
+class LoadedFunction:
+    def __init__(self, function: FunctionModel, module):
+        self.id = function.id
+        self.function = function
+        self.module = module
+        self.handlers: dict[str, Optional[Handler]] = {}
+
+        # Applied once, the module is shared by all requests
+        if hasattr(module, "valves") and hasattr(module, "Valves"):
+            valves = Functions.get_function_valves_by_id(function.id)
+            module.valves = module.Valves(**(valves if valves else {}))
+
+    def get_handler(self, name: str) -> Optional[Handler]:
+        if name not in self.handlers:
+            fn = getattr(self.module, name, None)
+            self.handlers[name] = Handler(fn) if callable(fn) else None
+        return self.handlers[name]
+
+
+class FilterIndex:
+    def __init__(self):
+        self.global_ids = {
+            function.id for function in Functions.get_global_filter_functions()
+        }
+        self.priorities = {
+            function.id: (Functions.get_function_valves_by_id(function.id) or {}).get(
+                "priority", 0
+            )
+            for function in Functions.get_functions_by_type("filter", active_only=True)
+        }
+
+        # Ordered filter ids by the filter ids of a model
+        self.chains: dict[tuple[str, ...], list[str]] = {}
+
+    def get_chain(self, model_filter_ids: list[str]) -> list[str]:
+        key = tuple(sorted(set(model_filter_ids)))
+        chain = self.chains.get(key)
+        if chain is None:
+            chain = sorted(
+                (
+                    filter_id
+                    for filter_id in self.global_ids.union(key)
+                    if filter_id in self.priorities
+                ),
+                key=lambda filter_id: (self.priorities[filter_id], filter_id),
+            )
+            self.chains[key] = chain
+        return chain
+
+
+class FunctionCache:
+    """
+    Loaded functions with their valves applied and the filters to run per
+    model, so that chat requests don't query them from the database.
+
+    `invalidate()` must be called whenever a function or its valves change.
+    With a Redis URL, the invalidation reaches all workers.
+    """
+
+    def __init__(self, ttl: float, redis_url: Optional[str] = None):
+        # Modules can't be shared, only the invalidations are
+        self.cache = TTLCache("functions", ttl=ttl, redis_url=redis_url)
+
+    def get_function(self, request: Request, id: str) -> Optional[LoadedFunction]:
+        loaded = self.cache.get(id)
+        if loaded is not None:
+            return loaded
+
+        function = Functions.get_function_by_id(id)
+        if function is None:
+            return None
+
+        if id in request.app.state.FUNCTIONS:
+            function_module = request.app.state.FUNCTIONS[id]
+        else:
+            function_module, _, _ = load_function_module_by_id(id)
+            request.app.state.FUNCTIONS[id] = function_module
+
+        loaded = LoadedFunction(function, function_module)
+        self.cache.set_local(id, loaded)
+        return loaded
+
+    def get_filters(self, request: Request, model: dict) -> list[LoadedFunction]:
+        """The enabled global and model filters, ordered by priority."""
+        index = self.cache.get("filters")
+        if index is None:
+            index = FilterIndex()
+            self.cache.set_local("filters", index)
+
+        model_filter_ids = []
+        if "info" in model and "meta" in model["info"]:
+            model_filter_ids = model["info"]["meta"].get("filterIds", [])
+
+        filters = []
+        for filter_id in index.get_chain(model_filter_ids):
+            loaded = self.get_function(request, filter_id)
+            if loaded is not None:
+                filters.append(loaded)
+        return filters
+
+    def invalidate(self, id: str):
+        self.cache.delete(id, "filters")
+
+    def start(self):
+        self.cache.start()
+
+    def stop(self):
+        self.cache.stop()
+
+
+function_cache = FunctionCache(
+    FUNCTION_CACHE_TTL,
+    redis_url=WEBSOCKET_REDIS_URL if WEBSOCKET_MANAGER == "redis" else None,
+)
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    AIOHTTP_CLIENT_POOL_LIMIT,
+    AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT,
+    AIOHTTP_CLIENT_DNS_CACHE_TTL,
+    AIOHTTP_CLIENT_MAX_SESSIONS,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+class UpstreamStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.queued = 0
+        self.queued_time = 0.0
+
+
+class UpstreamSessions:
+    """
+    Shared aiohttp sessions for upstream backends, one per
+    scheme://host:port.
+
+    Each upstream gets its own connector, so a slow or saturated backend
+    can't take connections from the others, and connections are kept alive
+    between requests instead of being set up for every call. Sessions are
+    created on first use and closed on shutdown.
+
+    Arbitrary hosts can get here (connection checks, model downloads), so
+    only the `max_sessions` most recently used upstreams keep a session.
+    An evicted session is closed once its requests have finished.
+    """
+
+    def __init__(
+        self,
+        limit: int = AIOHTTP_CLIENT_POOL_LIMIT,
+        keepalive_timeout: float = AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT,
+        dns_cache_ttl: int = AIOHTTP_CLIENT_DNS_CACHE_TTL,
+        max_sessions: int = AIOHTTP_CLIENT_MAX_SESSIONS,
+    ):
+        self.limit = limit
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.max_sessions = max_sessions
+
+        self.sessions: OrderedDict[str, aiohttp.ClientSession] = OrderedDict()
+        self.stats: dict[str, UpstreamStats] = {}
+        # Evicted sessions with requests still in flight
+        self.retired: set[aiohttp.ClientSession] = set()
+        self.closed = False
+
+    @staticmethod
+    def get_upstream(url: str) -> str:
+        parsed_url = urlparse(url)
+        return f"{parsed_url.scheme}://{parsed_url.netloc}".lower()
+
+    def get_trace_config(self, stats: UpstreamStats) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            stats.requests += 1
+
+        async def on_request_exception(session, context, params):
+            stats.errors += 1
+
+        async def on_connection_create_end(session, context, params):
+            stats.connections_created += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            stats.connections_reused += 1
+
+        async def on_connection_queued_start(session, context, params):
+            stats.queued += 1
+            context.queued_at = time.monotonic()
+
+        async def on_connection_queued_end(session, context, params):
+            stats.queued_time += time.monotonic() - context.queued_at
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_exception.append(on_request_exception)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_connection_queued_start.append(on_connection_queued_start)
+        trace_config.on_connection_queued_end.append(on_connection_queued_end)
+        return trace_config
+
+    def get_session(self, url: str) -> aiohttp.ClientSession:
+        """Return the shared session for the upstream of `url`."""
+        upstream = self.get_upstream(url)
+
+        session = self.sessions.get(upstream)
+        if session is None or session.closed:
+            if self.closed:
+                raise RuntimeError("Upstream sessions are closed")
+
+            stats = self.stats.setdefault(upstream, UpstreamStats())
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.limit,
+                    keepalive_timeout=self.keepalive_timeout,
+                    ttl_dns_cache=self.dns_cache_ttl,
+                ),
+                # Timeouts are set per request
+                timeout=aiohttp.ClientTimeout(total=None),
+                trust_env=True,
+                trace_configs=[self.get_trace_config(stats)],
+            )
+            self.sessions[upstream] = session
+
+        self.sessions.move_to_end(upstream)
+        self.evict()
+        return session
+
+    def evict(self):
+        while len(self.sessions) > self.max_sessions:
+            upstream, session = self.sessions.popitem(last=False)
+            self.stats.pop(upstream, None)
+            self.retired.add(session)
+
+        for session in list(self.retired):
+            connector = session.connector
+            if session.closed or not getattr(connector, "_acquired", None):
+                self.retired.discard(session)
+                if not session.closed:
+                    asyncio.create_task(session.close())
+
+    def start(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+        sessions = [*self.sessions.values(), *self.retired]
+        self.sessions, self.retired = OrderedDict(), set()
+        if not sessions:
+            return
+
+        log.info(f"Closing {len(sessions)} upstream sessions")
+        await asyncio.gather(
+            *[session.close() for session in sessions],
+            return_exceptions=True,
+        )
+        # Give SSL connections time to shut down cleanly
+        await asyncio.sleep(0.25)
+
+    def get_metrics(self) -> dict:
+        metrics = {}
+        for upstream, stats in self.stats.items():
+            session = self.sessions.get(upstream)
+            connector = session.connector if session and not session.closed else None
+
+            # aiohttp has no public counters for the pool itself
+            in_use = len(getattr(connector, "_acquired", ())) if connector else 0
+            idle = (
+                sum(len(conns) for conns in getattr(connector, "_conns", {}).values())
+                if connector
+                else 0
+            )
+
+            metrics[upstream] = {
+                "limit": self.limit,
+                "in_use": in_use,
+                "idle": idle,
+                "utilization": round(in_use / self.limit, 3) if self.limit else None,
+                "requests": stats.requests,
+                "errors": stats.errors,
+                "connections_created": stats.connections_created,
+                "connections_reused": stats.connections_reused,
+                "queued": stats.queued,
+                "queued_time": round(stats.queued_time, 3),
+            }
+        return metrics
+
+
+upstream_sessions = UpstreamSessions()
+
+
+async def cleanup_response(response: Optional[aiohttp.ClientResponse]):
+    """Return the response's connection to the pool, the session stays open."""
+    if response:
+        # A partially read body can't be reused
+        if response.content.is_eof():
+            response.release()
+        else:
+            response.close()
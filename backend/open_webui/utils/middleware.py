@@ -9,9 +9,7 @@ from aiocache import cached
 from typing import Any, Optional
 import random
 import json
-import html
 import inspect
-import re
 import ast
 
 from uuid import uuid4
@@ -29,6 +27,7 @@ from open_webui.models.users import Users
 from open_webui.socket.main import (
     get_event_call,
     get_event_emitter,
+    get_buffered_event_emitter,
     get_active_status_by_user_id,
 )
 from open_webui.routers.tasks import (
@@ -39,6 +38,7 @@ from open_webui.routers.tasks import (
 )
 from open_webui.routers.retrieval import process_web_search, SearchForm
 from open_webui.routers.images import image_generations, GenerateImageForm
+from open_webui.routers.audio import synthesize_speech
 
 
 from open_webui.utils.webhook import post_webhook
@@ -52,6 +52,11 @@ from open_webui.retrieval.utils import get_sources_from_files
 
 
 from open_webui.utils.chat import generate_chat_completion
+from open_webui.utils.chat_writer import ChatMessageWriter
+from open_webui.utils.content_blocks import (
+    ContentBlockParser,
+    ContentBlockSerializer,
+)
 from open_webui.utils.task import (
     get_task_model_id,
     rag_template,
@@ -67,7 +72,8 @@ from open_webui.utils.misc import (
     prepend_to_first_user_message_content,
 )
 from open_webui.utils.tools import get_tools
-from open_webui.utils.plugin import load_function_module_by_id
+from open_webui.utils.function_cache import function_cache
+from open_webui.utils.speech_stream import SpeechStream
 
 
 from open_webui.tasks import create_task
@@ -76,6 +82,7 @@ from open_webui.config import (
     CACHE_DIR,
     DEFAULT_TOOLS_FUNCTION_CALLING_PROMPT_TEMPLATE,
     DEFAULT_CODE_INTERPRETER_PROMPT,
+    AUDIO_TTS_STREAM_CONCURRENCY,
 )
 from open_webui.env import (
     SRC_LOG_LEVELS,
@@ -94,60 +101,17 @@ log.setLevel(SRC_LOG_LEVELS["MAIN"])
 async def chat_completion_filter_functions_handler(request, body, model, extra_params):
     skip_files = None
 
-    def get_filter_function_ids(model):
-        def get_priority(function_id):
-            function = Functions.get_function_by_id(function_id)
-            if function is not None and hasattr(function, "valves"):
-                # TODO: Fix FunctionModel
-                return (function.valves if function.valves else {}).get("priority", 0)
-            return 0
-
-        filter_ids = [
-            function.id for function in Functions.get_global_filter_functions()
-        ]
-        if "info" in model and "meta" in model["info"]:
-            filter_ids.extend(model["info"]["meta"].get("filterIds", []))
-            filter_ids = list(set(filter_ids))
-
-        enabled_filter_ids = [
-            function.id
-            for function in Functions.get_functions_by_type("filter", active_only=True)
-        ]
-
-        filter_ids = [
-            filter_id for filter_id in filter_ids if filter_id in enabled_filter_ids
-        ]
-
-        filter_ids.sort(key=get_priority)
-        return filter_ids
-
-    filter_ids = get_filter_function_ids(model)
-    for filter_id in filter_ids:
-        filter = Functions.get_function_by_id(filter_id)
-        if not filter:
-            continue
-
-        if filter_id in request.app.state.FUNCTIONS:
-            function_module = request.app.state.FUNCTIONS[filter_id]
-        else:
-            function_module, _, _ = load_function_module_by_id(filter_id)
-            request.app.state.FUNCTIONS[filter_id] = function_module
+    for filter in function_cache.get_filters(request, model):
+        filter_id = filter.id
+        function_module = filter.module
 
         # Check if the function has a file_handler variable
         if hasattr(function_module, "file_handler"):
             skip_files = function_module.file_handler
 
-        # Apply valves to the function
-        if hasattr(function_module, "valves") and hasattr(function_module, "Valves"):
-            valves = Functions.get_function_valves_by_id(filter_id)
-            function_module.valves = function_module.Valves(
-                **(valves if valves else {})
-            )
-
-        if hasattr(function_module, "inlet"):
+        inlet = filter.get_handler("inlet")
+        if inlet is not None:
             try:
-                inlet = function_module.inlet
-
                 # Create a dictionary of parameters to be passed to the function
                 params = {"body": body} | {
                     k: v
@@ -156,7 +120,7 @@ async def chat_completion_filter_functions_handler(request, body, model, extra_p
                         "__model__": model,
                         "__id__": filter_id,
                     }.items()
-                    if k in inspect.signature(inlet).parameters
+                    if k in inlet.parameters
                 }
 
                 if "__user__" in params and hasattr(function_module, "UserValves"):
@@ -169,10 +133,7 @@ async def chat_completion_filter_functions_handler(request, body, model, extra_p
                     except Exception as e:
                         print(e)
 
-                if inspect.iscoroutinefunction(inlet):
-                    body = await inlet(**params)
-                else:
-                    body = inlet(**params)
+                body = await inlet(**params)
 
             except Exception as e:
                 print(f"Error: {e}")
@@ -407,7 +368,7 @@ async def chat_web_search_handler(
         )
         return form_data
 
-    searchQuery = queries[0]
+    searchQuery = ", ".join(queries)
 
     await event_emitter(
         {
@@ -422,22 +383,16 @@ async def chat_web_search_handler(
     )
 
     try:
-
-        # Offload process_web_search to a separate thread
-        loop = asyncio.get_running_loop()
-        with ThreadPoolExecutor() as executor:
-            results = await loop.run_in_executor(
-                executor,
-                lambda: process_web_search(
-                    request,
-                    SearchForm(
-                        **{
-                            "query": searchQuery,
-                        }
-                    ),
-                    user,
-                ),
-            )
+        results = await process_web_search(
+            request,
+            SearchForm(
+                **{
+                    "query": searchQuery,
+                    "queries": queries,
+                }
+            ),
+            user,
+        )
 
         if results:
             await event_emitter(
@@ -1082,7 +1037,7 @@ async def process_chat_response(
                     )
 
                     # Send a webhook notification if the user is not active
-                    if get_active_status_by_user_id(user.id) is None:
+                    if not await get_active_status_by_user_id(user.id):
                         webhook_url = Users.get_user_webhook_url_by_id(user.id)
                         if webhook_url:
                             post_webhook(
@@ -1114,6 +1069,9 @@ async def process_chat_response(
         task_id = str(uuid4())  # Create a unique task ID.
         model_id = form_data.get("model", "")
 
+        # Batch the streamed deltas into fewer socket emits
+        event_emitter = get_buffered_event_emitter(metadata)
+
         Chats.upsert_message_to_chat_by_id_and_message_id(
             metadata["chat_id"],
             metadata["message_id"],
@@ -1124,233 +1082,8 @@ async def process_chat_response(
 
         # Handle as a background task
         async def post_response_handler(response, events):
-            def serialize_content_blocks(content_blocks, raw=False):
-                content = ""
-
-                for block in content_blocks:
-                    if block["type"] == "text":
-                        content = f"{content}{block['content'].strip()}\n"
-                    elif block["type"] == "tool_calls":
-                        attributes = block.get("attributes", {})
-
-                        block_content = block.get("content", [])
-                        results = block.get("results", [])
-
-                        if results:
-
-                            result_display_content = ""
-
-                            for result in results:
-                                tool_call_id = result.get("tool_call_id", "")
-                                tool_name = ""
-
-                                for tool_call in block_content:
-                                    if tool_call.get("id", "") == tool_call_id:
-                                        tool_name = tool_call.get("function", {}).get(
-                                            "name", ""
-                                        )
-                                        break
-
-                                result_display_content = f"{result_display_content}\n> {tool_name}: {result.get('content', '')}"
-
-                            if not raw:
-                                content = f'{content}\n<details type="tool_calls" done="true" content="{html.escape(json.dumps(block_content))}" results="{html.escape(json.dumps(results))}">\n<summary>Tool Executed</summary>\n{result_display_content}\n</details>\n'
-                        else:
-                            tool_calls_display_content = ""
-
-                            for tool_call in block_content:
-                                tool_calls_display_content = f"{tool_calls_display_content}\n> Executing {tool_call.get('function', {}).get('name', '')}"
-
-                            if not raw:
-                                content = f'{content}\n<details type="tool_calls" done="false" content="{html.escape(json.dumps(block_content))}">\n<summary>Tool Executing...</summary>\n{tool_calls_display_content}\n</details>\n'
-
-                    elif block["type"] == "reasoning":
-                        reasoning_display_content = "\n".join(
-                            (f"> {line}" if not line.startswith(">") else line)
-                            for line in block["content"].splitlines()
-                        )
-
-                        reasoning_duration = block.get("duration", None)
-
-                        if reasoning_duration is not None:
-                            if raw:
-                                content = f'{content}\n<{block["tag"]}>{block["content"]}</{block["tag"]}>\n'
-                            else:
-                                content = f'{content}\n<details type="reasoning" done="true" duration="{reasoning_duration}">\n<summary>Thought for {reasoning_duration} seconds</summary>\n{reasoning_display_content}\n</details>\n'
-                        else:
-                            if raw:
-                                content = f'{content}\n<{block["tag"]}>{block["content"]}</{block["tag"]}>\n'
-                            else:
-                                content = f'{content}\n<details type="reasoning" done="false">\n<summary>Thinking…</summary>\n{reasoning_display_content}\n</details>\n'
-
-                    elif block["type"] == "code_interpreter":
-                        attributes = block.get("attributes", {})
-                        output = block.get("output", None)
-                        lang = attributes.get("lang", "")
-
-                        if output:
-                            output = html.escape(json.dumps(output))
-
-                            if raw:
-                                content = f'{content}\n<code_interpreter type="code" lang="{lang}">\n{block["content"]}\n</code_interpreter>\n```output\n{output}\n```\n'
-                            else:
-                                content = f'{content}\n<details type="code_interpreter" done="true" output="{output}">\n<summary>Analyzed</summary>\n```{lang}\n{block["content"]}\n```\n</details>\n'
-                        else:
-                            if raw:
-                                content = f'{content}\n<code_interpreter type="code" lang="{lang}">\n{block["content"]}\n</code_interpreter>\n'
-                            else:
-                                content = f'{content}\n<details type="code_interpreter" done="false">\n<summary>Analyzing...</summary>\n```{lang}\n{block["content"]}\n```\n</details>\n'
-
-                    else:
-                        block_content = str(block["content"]).strip()
-                        content = f"{content}{block['type']}: {block_content}\n"
-
-                return content.strip()
-
-            def tag_content_handler(content_type, tags, content, content_blocks):
-                end_flag = False
-
-                def extract_attributes(tag_content):
-                    """Extract attributes from a tag if they exist."""
-                    attributes = {}
-                    if not tag_content:  # Ensure tag_content is not None
-                        return attributes
-                    # Match attributes in the format: key="value" (ignores single quotes for simplicity)
-                    matches = re.findall(r'(\w+)\s*=\s*"([^"]+)"', tag_content)
-                    for key, value in matches:
-                        attributes[key] = value
-                    return attributes
-
-                if content_blocks[-1]["type"] == "text":
-                    for tag in tags:
-                        # Match start tag e.g., <tag> or <tag attr="value">
-                        start_tag_pattern = rf"<{tag}(\s.*?)?>"
-                        match = re.search(start_tag_pattern, content)
-                        if match:
-                            attr_content = (
-                                match.group(1) if match.group(1) else ""
-                            )  # Ensure it's not None
-                            attributes = extract_attributes(
-                                attr_content
-                            )  # Extract attributes safely
-
-                            # Capture everything before and after the matched tag
-                            before_tag = content[
-                                : match.start()
-                            ]  # Content before opening tag
-                            after_tag = content[
-                                match.end() :
-                            ]  # Content after opening tag
-
-                            # Remove the start tag from the currently handling text block
-                            content_blocks[-1]["content"] = content_blocks[-1][
-                                "content"
-                            ].replace(match.group(0), "")
-
-                            if before_tag:
-                                content_blocks[-1]["content"] = before_tag
-
-                            if not content_blocks[-1]["content"]:
-                                content_blocks.pop()
-
-                            # Append the new block
-                            content_blocks.append(
-                                {
-                                    "type": content_type,
-                                    "tag": tag,
-                                    "attributes": attributes,
-                                    "content": "",
-                                    "started_at": time.time(),
-                                }
-                            )
-
-                            if after_tag:
-                                content_blocks[-1]["content"] = after_tag
-
-                            break
-                elif content_blocks[-1]["type"] == content_type:
-                    tag = content_blocks[-1]["tag"]
-                    # Match end tag e.g., </tag>
-                    end_tag_pattern = rf"</{tag}>"
-
-                    # Check if the content has the end tag
-                    if re.search(end_tag_pattern, content):
-                        end_flag = True
-
-                        block_content = content_blocks[-1]["content"]
-                        # Strip start and end tags from the content
-                        start_tag_pattern = rf"<{tag}(.*?)>"
-                        block_content = re.sub(
-                            start_tag_pattern, "", block_content
-                        ).strip()
-
-                        end_tag_regex = re.compile(end_tag_pattern, re.DOTALL)
-                        split_content = end_tag_regex.split(block_content, maxsplit=1)
-
-                        # Content inside the tag
-                        block_content = (
-                            split_content[0].strip() if split_content else ""
-                        )
-
-                        # Leftover content (everything after `</tag>`)
-                        leftover_content = (
-                            split_content[1].strip() if len(split_content) > 1 else ""
-                        )
-
-                        if block_content:
-                            content_blocks[-1]["content"] = block_content
-                            content_blocks[-1]["ended_at"] = time.time()
-                            content_blocks[-1]["duration"] = int(
-                                content_blocks[-1]["ended_at"]
-                                - content_blocks[-1]["started_at"]
-                            )
-
-                            # Reset the content_blocks by appending a new text block
-                            if content_type != "code_interpreter":
-                                if leftover_content:
-
-                                    content_blocks.append(
-                                        {
-                                            "type": "text",
-                                            "content": leftover_content,
-                                        }
-                                    )
-                                else:
-                                    content_blocks.append(
-                                        {
-                                            "type": "text",
-                                            "content": "",
-                                        }
-                                    )
-
-                        else:
-                            # Remove the block if content is empty
-                            content_blocks.pop()
-
-                            if leftover_content:
-                                content_blocks.append(
-                                    {
-                                        "type": "text",
-                                        "content": leftover_content,
-                                    }
-                                )
-                            else:
-                                content_blocks.append(
-                                    {
-                                        "type": "text",
-                                        "content": "",
-                                    }
-                                )
-
-                        # Clean processed content
-                        content = re.sub(
-                            rf"<{tag}(.*?)>(.|\n)*?</{tag}>",
-                            "",
-                            content,
-                            flags=re.DOTALL,
-                        )
-
-                return content, content_blocks, end_flag
+            # Finalized blocks are rendered once and reused on every delta
+            serialize_content_blocks = ContentBlockSerializer().serialize
 
             message = Chats.get_message_by_id_and_message_id(
                 metadata["chat_id"], metadata["message_id"]
@@ -1381,6 +1114,43 @@ async def process_chat_response(
             ]
             code_interpreter_tags = ["code_interpreter"]
 
+            tags = {}
+            if DETECT_REASONING:
+                tags.update({tag: "reasoning" for tag in reasoning_tags})
+            if DETECT_CODE_INTERPRETER:
+                tags.update({tag: "code_interpreter" for tag in code_interpreter_tags})
+            content_block_parser = ContentBlockParser(content_blocks, tags)
+
+            message_writer = ChatMessageWriter(
+                metadata["chat_id"], metadata["message_id"]
+            )
+
+            # Speak the response while it is being generated
+            speech_stream = None
+            if (metadata.get("features") or {}).get(
+                "speech"
+            ) and request.app.state.config.TTS_ENGINE:
+                voice = request.app.state.config.TTS_VOICE
+                tts_settings = (
+                    ((user.settings.ui if user.settings else None) or {})
+                    .get("audio", {})
+                    .get("tts", {})
+                )
+                if tts_settings.get("defaultVoice") == voice:
+                    voice = tts_settings.get("voice") or voice
+
+                async def synthesize(text):
+                    return await synthesize_speech(
+                        request, user, {"input": text, "voice": voice}
+                    )
+
+                speech_stream = SpeechStream(
+                    synthesize,
+                    event_emitter,
+                    AUDIO_TTS_STREAM_CONCURRENCY,
+                    content_blocks=content_blocks,
+                )
+
             try:
                 for event in events:
                     await event_emitter(
@@ -1400,9 +1170,6 @@ async def process_chat_response(
                     )
 
                 async def stream_body_handler(response):
-                    nonlocal content
-                    nonlocal content_blocks
-
                     response_tool_calls = []
 
                     async for line in response.body_iterator:
@@ -1475,53 +1242,28 @@ async def process_chat_response(
                                 value = delta.get("content")
 
                                 if value:
-                                    content = f"{content}{value}"
-
-                                    if not content_blocks:
-                                        content_blocks.append(
-                                            {
-                                                "type": "text",
-                                                "content": "",
-                                            }
-                                        )
-
-                                    content_blocks[-1]["content"] = (
-                                        content_blocks[-1]["content"] + value
-                                    )
-
-                                    if DETECT_REASONING:
-                                        content, content_blocks, _ = (
-                                            tag_content_handler(
-                                                "reasoning",
-                                                reasoning_tags,
-                                                content,
-                                                content_blocks,
-                                            )
-                                        )
+                                    # Only the new text is scanned for tags
+                                    if content_block_parser.feed(value):
+                                        break
 
-                                    if DETECT_CODE_INTERPRETER:
-                                        content, content_blocks, end = (
-                                            tag_content_handler(
-                                                "code_interpreter",
-                                                code_interpreter_tags,
-                                                content,
-                                                content_blocks,
-                                            )
+                                    if (
+                                        speech_stream
+                                        and content_blocks[-1]["type"] == "text"
+                                    ):
+                                        speech_stream.feed_block(
+                                            content_blocks[-1],
+                                            content_block_parser.offset,
                                         )
 
-                                        if end:
-                                            break
-
                                     if ENABLE_REALTIME_CHAT_SAVE:
-                                        # Save message in the database
-                                        Chats.upsert_message_to_chat_by_id_and_message_id(
-                                            metadata["chat_id"],
-                                            metadata["message_id"],
+                                        # Buffered, written periodically and on completion
+                                        message_writer.update(
                                             {
                                                 "content": serialize_content_blocks(
                                                     content_blocks
                                                 ),
                                             },
+                                            len(value),
                                         )
                                     else:
                                         data = {
@@ -1544,6 +1286,16 @@ async def process_chat_response(
                                 log.debug("Error: ", e)
                                 continue
 
+                    if (
+                        speech_stream
+                        and content_blocks
+                        and content_blocks[-1]["type"] == "text"
+                    ):
+                        # The rest of the text is final
+                        speech_stream.feed_block(
+                            content_blocks[-1], len(content_blocks[-1]["content"])
+                        )
+
                     if content_blocks:
                         # Clean up the last text block
                         if content_blocks[-1]["type"] == "text":
@@ -1565,6 +1317,9 @@ async def process_chat_response(
                     if response_tool_calls:
                         tool_calls.append(response_tool_calls)
 
+                    # Don't hold buffered content back while tools run
+                    message_writer.flush()
+
                     if response.background:
                         await response.background()
 
@@ -1805,18 +1560,22 @@ async def process_chat_response(
                     "title": title,
                 }
 
-                if not ENABLE_REALTIME_CHAT_SAVE:
-                    # Save message in the database
-                    Chats.upsert_message_to_chat_by_id_and_message_id(
-                        metadata["chat_id"],
-                        metadata["message_id"],
-                        {
-                            "content": serialize_content_blocks(content_blocks),
-                        },
-                    )
+                # Save message in the database
+                message_writer.update(
+                    {
+                        "content": serialize_content_blocks(content_blocks),
+                    }
+                )
+                message_writer.close()
+
+                content = "\n".join(
+                    block["content"]
+                    for block in content_blocks
+                    if block["type"] == "text"
+                ).strip()
 
                 # Send a webhook notification if the user is not active
-                if get_active_status_by_user_id(user.id) is None:
+                if not await get_active_status_by_user_id(user.id):
                     webhook_url = Users.get_user_webhook_url_by_id(user.id)
                     if webhook_url:
                         post_webhook(
@@ -1837,20 +1596,27 @@ async def process_chat_response(
                     }
                 )
 
+                if speech_stream:
+                    speech_stream.end()
+
                 await background_tasks_handler()
             except asyncio.CancelledError:
                 print("Task was cancelled!")
+                if speech_stream:
+                    speech_stream.cancel()
                 await event_emitter({"type": "task-cancelled"})
 
-                if not ENABLE_REALTIME_CHAT_SAVE:
-                    # Save message in the database
-                    Chats.upsert_message_to_chat_by_id_and_message_id(
-                        metadata["chat_id"],
-                        metadata["message_id"],
-                        {
-                            "content": serialize_content_blocks(content_blocks),
-                        },
-                    )
+                # Save message in the database
+                message_writer.update(
+                    {
+                        "content": serialize_content_blocks(content_blocks),
+                    }
+                )
+                message_writer.close()
+            finally:
+                if speech_stream:
+                    await speech_stream.close()
+                await event_emitter.close()
 
             if response.background is not None:
                 await response.background()
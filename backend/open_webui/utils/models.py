@@ -2,7 +2,6 @@ import time
 import logging
 import sys
 
-from aiocache import cached
 from fastapi import Request
 
 from open_webui.routers import openai, ollama
@@ -13,7 +12,7 @@ from open_webui.models.functions import Functions
 from open_webui.models.models import Models
 
 
-from open_webui.utils.plugin import load_function_module_by_id
+from open_webui.utils.function_cache import function_cache
 from open_webui.utils.access_control import has_access
 
 
@@ -58,7 +57,15 @@ async def get_all_base_models(request: Request):
     return models
 
 
-async def get_all_models(request):
+async def get_all_models(request) -> list[dict]:
+    """
+    All models available to chat with, from the snapshot kept by the model
+    catalog. The list is shared between requests, don't modify it in place.
+    """
+    return await request.app.state.MODEL_CATALOG.get_models(request)
+
+
+async def build_all_models(request):
     models = await get_all_base_models(request)
 
     # If there are no models, return an empty list
@@ -193,11 +200,7 @@ async def get_all_models(request):
             ]
 
     def get_function_module_by_id(function_id):
-        if function_id in request.app.state.FUNCTIONS:
-            function_module = request.app.state.FUNCTIONS[function_id]
-        else:
-            function_module, _, _ = load_function_module_by_id(function_id)
-            request.app.state.FUNCTIONS[function_id] = function_module
+        return function_cache.get_function(request, function_id).module
 
     for model in models:
         action_ids = [
@@ -216,7 +219,7 @@ async def get_all_models(request):
             model["actions"].extend(
                 get_action_items_from_module(action_function, function_module)
             )
-    log.debug(f"get_all_models() returned {len(models)} models")
+    log.debug(f"build_all_models() returned {len(models)} models")
 
     request.app.state.MODELS = {model["id"]: model for model in models}
     return models
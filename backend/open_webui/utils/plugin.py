@@ -1,12 +1,19 @@
+import asyncio
+import hashlib
+import marshal
 import os
 import re
 import subprocess
 import sys
 from importlib import util
+from pathlib import Path
 import types
 import tempfile
 import logging
 
+from fastapi import FastAPI
+
+from open_webui.config import CACHE_DIR
 from open_webui.env import SRC_LOG_LEVELS
 from open_webui.models.functions import Functions
 from open_webui.models.tools import Tools
@@ -14,6 +21,8 @@ from open_webui.models.tools import Tools
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["MAIN"])
 
+PLUGIN_CACHE_DIR = Path(CACHE_DIR) / "plugins"
+
 
 def extract_frontmatter(content):
     """
@@ -68,6 +77,44 @@ def replace_imports(content):
     return content
 
 
+def write_file_atomic(path: Path, data: bytes):
+    # Other workers may be writing or reading the same file
+    with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as f:
+        f.write(data)
+    os.replace(f.name, path)
+
+
+def compile_plugin(content: str) -> tuple[types.CodeType, str]:
+    """
+    Compile the source of a tool or function, reusing the code compiled
+    before for the same source. Returns the code and the path of the
+    source file, to be used as the module's `__file__`.
+    """
+    key = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    source_path = PLUGIN_CACHE_DIR / f"{key}.py"
+    code_path = PLUGIN_CACHE_DIR / f"{key}.{sys.implementation.cache_tag}.marshal"
+
+    if source_path.exists():
+        try:
+            with open(code_path, "rb") as f:
+                return marshal.load(f), str(source_path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            log.warning(f"Failed to load compiled plugin {code_path}: {e}")
+
+    code = compile(content, str(source_path), "exec")
+
+    try:
+        PLUGIN_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        write_file_atomic(source_path, content.encode("utf-8"))
+        write_file_atomic(code_path, marshal.dumps(code))
+    except Exception as e:
+        log.warning(f"Failed to cache compiled plugin {code_path}: {e}")
+
+    return code, str(source_path)
+
+
 def load_tools_module_by_id(toolkit_id, content=None):
 
     if content is None:
@@ -75,10 +122,9 @@ def load_tools_module_by_id(toolkit_id, content=None):
         if not tool:
             raise Exception(f"Toolkit not found: {toolkit_id}")
 
-        content = tool.content
-
-        content = replace_imports(content)
-        Tools.update_tool_by_id(toolkit_id, {"content": content})
+        content = replace_imports(tool.content)
+        if content != tool.content:
+            Tools.update_tool_by_id(toolkit_id, {"content": content})
     else:
         frontmatter = extract_frontmatter(content)
         # Install required packages found within the frontmatter
@@ -88,17 +134,13 @@ def load_tools_module_by_id(toolkit_id, content=None):
     module = types.ModuleType(module_name)
     sys.modules[module_name] = module
 
-    # Create a temporary file and use it to define `__file__` so
-    # that it works as expected from the module's perspective.
-    temp_file = tempfile.NamedTemporaryFile(delete=False)
-    temp_file.close()
     try:
-        with open(temp_file.name, "w", encoding="utf-8") as f:
-            f.write(content)
-        module.__dict__["__file__"] = temp_file.name
+        # The source file defines `__file__` so that it works as expected
+        # from the module's perspective.
+        code, module.__dict__["__file__"] = compile_plugin(content)
 
         # Executing the modified content in the created module's namespace
-        exec(content, module.__dict__)
+        exec(code, module.__dict__)
         frontmatter = extract_frontmatter(content)
         log.info(f"Loaded module: {module.__name__}")
 
@@ -111,8 +153,6 @@ def load_tools_module_by_id(toolkit_id, content=None):
         log.error(f"Error loading module: {toolkit_id}: {e}")
         del sys.modules[module_name]  # Clean up
         raise e
-    finally:
-        os.unlink(temp_file.name)
 
 
 def load_function_module_by_id(function_id, content=None):
@@ -120,10 +160,9 @@ def load_function_module_by_id(function_id, content=None):
         function = Functions.get_function_by_id(function_id)
         if not function:
             raise Exception(f"Function not found: {function_id}")
-        content = function.content
-
-        content = replace_imports(content)
-        Functions.update_function_by_id(function_id, {"content": content})
+        content = replace_imports(function.content)
+        if content != function.content:
+            Functions.update_function_by_id(function_id, {"content": content})
     else:
         frontmatter = extract_frontmatter(content)
         install_frontmatter_requirements(frontmatter.get("requirements", ""))
@@ -132,17 +171,13 @@ def load_function_module_by_id(function_id, content=None):
     module = types.ModuleType(module_name)
     sys.modules[module_name] = module
 
-    # Create a temporary file and use it to define `__file__` so
-    # that it works as expected from the module's perspective.
-    temp_file = tempfile.NamedTemporaryFile(delete=False)
-    temp_file.close()
     try:
-        with open(temp_file.name, "w", encoding="utf-8") as f:
-            f.write(content)
-        module.__dict__["__file__"] = temp_file.name
+        # The source file defines `__file__` so that it works as expected
+        # from the module's perspective.
+        code, module.__dict__["__file__"] = compile_plugin(content)
 
         # Execute the modified content in the created module's namespace
-        exec(content, module.__dict__)
+        exec(code, module.__dict__)
         frontmatter = extract_frontmatter(content)
         log.info(f"Loaded module: {module.__name__}")
 
@@ -161,8 +196,6 @@ def load_function_module_by_id(function_id, content=None):
 
         Functions.update_function_by_id(function_id, {"is_active": False})
         raise e
-    finally:
-        os.unlink(temp_file.name)
 
 
 def install_frontmatter_requirements(requirements):
@@ -178,3 +211,32 @@ def install_frontmatter_requirements(requirements):
 
     else:
         log.info("No requirements found in frontmatter.")
+
+
+async def preload_plugins(app: FastAPI):
+    """
+    Load the active functions and the tools in parallel, so that the first
+    chats after a start don't wait for them.
+    """
+
+    def load_function(function_id):
+        if function_id not in app.state.FUNCTIONS:
+            function_module, _, _ = load_function_module_by_id(function_id)
+            app.state.FUNCTIONS[function_id] = function_module
+
+    def load_tool(tool_id):
+        if tool_id not in app.state.TOOLS:
+            tool_module, _ = load_tools_module_by_id(tool_id)
+            app.state.TOOLS[tool_id] = tool_module
+
+    ids = [
+        (load_function, function.id)
+        for function in Functions.get_functions(active_only=True)
+    ] + [(load_tool, tool.id) for tool in Tools.get_tools()]
+
+    results = await asyncio.gather(
+        *[asyncio.to_thread(load, id) for load, id in ids], return_exceptions=True
+    )
+
+    failed = sum(isinstance(result, Exception) for result in results)
+    log.info(f"Preloaded {len(ids) - failed} tools and functions, {failed} failed")
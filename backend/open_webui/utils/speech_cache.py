@@ -0,0 +1,179 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+import aiofiles
+
+from open_webui.config import (
+    CACHE_DIR,
+    AUDIO_SPEECH_CACHE_MAX_AGE,
+    AUDIO_SPEECH_CACHE_MAX_SIZE,
+)
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["AUDIO"])
+
+# Left behind by a worker that died while writing
+STALE_PART_AGE = 60 * 60
+
+
+class SpeechCache:
+    """
+    Synthesized speech on disk, keyed by a hash of the request.
+
+    Once the files take more than `max_size` bytes, the least recently used
+    are evicted, as are files not used for `max_age` seconds. The last use
+    of each file is kept in an index file that all workers update, merging
+    in their own uses, when the janitor runs every `interval` seconds.
+    """
+
+    def __init__(self, dir: Path, max_size: int, max_age: float, interval=300):
+        self.dir = dir
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = dir / "index.json"
+
+        self.max_size = max_size
+        self.max_age = max_age
+        self.interval = interval
+
+        # Uses since the janitor last ran
+        self.accessed: dict[str, float] = {}
+        self.lock = threading.Lock()
+        self.task: Optional[asyncio.Task] = None
+
+    def get_path(self, name: str) -> Path:
+        return self.dir / f"{name}.mp3"
+
+    def get(self, name: str) -> Optional[Path]:
+        path = self.get_path(name)
+        if path.is_file():
+            self.touch(name)
+            return path
+        return None
+
+    def touch(self, name: str):
+        with self.lock:
+            self.accessed[name] = time.time()
+
+    async def tee(
+        self, name: str, chunks: AsyncIterator[bytes], body: dict
+    ) -> AsyncIterator[bytes]:
+        """
+        Yield the chunks while writing them to the cache. The file only
+        replaces the cached one once it is complete.
+        """
+        part_path = self.dir / f".{name}.{uuid.uuid4().hex}.part"
+        try:
+            async with aiofiles.open(part_path, "wb") as f:
+                async for chunk in chunks:
+                    await f.write(chunk)
+                    yield chunk
+        except BaseException:
+            # The upstream failed or the client went away
+            part_path.unlink(missing_ok=True)
+            raise
+
+        os.replace(part_path, self.get_path(name))
+        async with aiofiles.open(self.dir / f"{name}.json", "w") as f:
+            await f.write(json.dumps(body))
+        self.touch(name)
+
+    ####################################
+    # Janitor
+    ####################################
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.clean)
+            except Exception as e:
+                log.exception(f"Failed to clean the speech cache: {e}")
+            await asyncio.sleep(self.interval)
+
+    def load_index(self) -> dict[str, float]:
+        try:
+            with open(self.index_path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            log.warning(f"Failed to read the speech cache index: {e}")
+            return {}
+
+    def save_index(self, index: dict[str, float]):
+        with tempfile.NamedTemporaryFile("w", dir=self.dir, delete=False) as f:
+            json.dump(index, f)
+        os.replace(f.name, self.index_path)
+
+    def clean(self) -> int:
+        """Evict expired and least recently used files, return how many."""
+        now = time.time()
+
+        index = self.load_index()
+        with self.lock:
+            accessed, self.accessed = self.accessed, {}
+        for name, accessed_at in accessed.items():
+            index[name] = max(index.get(name, 0), accessed_at)
+
+        # name -> (last used, size), files cached before the index count
+        # as used when they were written
+        entries = {}
+        for path in self.dir.iterdir():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+
+            if path.suffix == ".mp3":
+                entries[path.stem] = (index.get(path.stem, stat.st_mtime), stat.st_size)
+            elif path.suffix == ".part" and now - stat.st_mtime > STALE_PART_AGE:
+                path.unlink(missing_ok=True)
+
+        size = sum(entry_size for _, entry_size in entries.values())
+        evicted = 0
+        for name, (accessed_at, entry_size) in sorted(
+            entries.items(), key=lambda item: item[1][0]
+        ):
+            if size <= self.max_size and now - accessed_at <= self.max_age:
+                break
+
+            self.get_path(name).unlink(missing_ok=True)
+            (self.dir / f"{name}.json").unlink(missing_ok=True)
+            del entries[name]
+            size -= entry_size
+            evicted += 1
+
+        self.save_index(
+            {name: accessed_at for name, (accessed_at, _) in entries.items()}
+        )
+
+        if evicted:
+            log.info(
+                f"Evicted {evicted} files from the speech cache, "
+                f"{len(entries)} files ({size / 1024 / 1024:.1f} MB) left"
+            )
+        return evicted
+
+
+speech_cache = SpeechCache(
+    Path(CACHE_DIR).joinpath("./audio/speech/"),
+    max_size=AUDIO_SPEECH_CACHE_MAX_SIZE,
+    max_age=AUDIO_SPEECH_CACHE_MAX_AGE,
+)
@@ -0,0 +1,213 @@
+import asyncio
+import base64
+import logging
+import re
+from typing import Awaitable, Callable, Optional
+
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["AUDIO"])
+
+CODE_BLOCK_PATTERN = re.compile(r"```.*?```", re.DOTALL)
+SENTENCE_END_PATTERN = re.compile(r"(?<=[.!?])\s+|(?<=[。！？])|\n+")
+
+# Short sentences are merged with the next one, as on the client
+MIN_SENTENCE_WORDS = 4
+MIN_SENTENCE_LENGTH = 50
+
+# Same as removeFormattings on the client
+FORMATTING_PATTERNS = [
+    (re.compile(r"^\|.*\|$", re.MULTILINE), ""),  # Tables
+    (re.compile(r"(?:\*\*|__)(.*?)(?:\*\*|__)"), r"\1"),  # Bold
+    (re.compile(r"(?:[*_])(.*?)(?:[*_])"), r"\1"),  # Italic
+    (re.compile(r"~~(.*?)~~"), r"\1"),  # Strikethrough
+    (re.compile(r"`([^`]+)`"), r"\1"),  # Inline code
+    (re.compile(r"!?\[([^\]]*)\](?:\([^)]+\)|\[[^\]]*\])"), r"\1"),  # Links
+    (re.compile(r"^\[[^\]]+\]:\s*.*$", re.MULTILINE), ""),  # References
+    (re.compile(r"^#{1,6}\s+", re.MULTILINE), ""),  # Headers
+    (re.compile(r"^\s*[-*+]\s+", re.MULTILINE), ""),  # Lists
+    (re.compile(r"^\s*(?:\d+\.)\s+", re.MULTILINE), ""),  # Numbered lists
+    (re.compile(r"^\s*>[> ]*", re.MULTILINE), ""),  # Blockquotes
+    (re.compile(r"\[\^[^\]]*\]"), ""),  # Footnotes
+    (re.compile(r"[-*_~]"), ""),  # Remaining markers
+    (re.compile(r"[\U0001F000-\U0001FAFF☀-➿]"), ""),  # Emojis
+]
+
+
+def clean_text(text: str) -> str:
+    for pattern, replacement in FORMATTING_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text.strip()
+
+
+class SentenceSegmenter:
+    """
+    Splits streamed text into sentences to speak, skipping code blocks.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        # Short sentence waiting to be merged with the next one
+        self.pending = ""
+
+    def feed(self, text: str) -> list[str]:
+        """Add streamed text, returning the sentences it completes."""
+        self.buffer = CODE_BLOCK_PATTERN.sub("\n", self.buffer + text)
+
+        # A code block may still be open
+        fence = self.buffer.find("```")
+        end = None
+        for match in SENTENCE_END_PATTERN.finditer(
+            self.buffer if fence == -1 else self.buffer[:fence]
+        ):
+            end = match.end()
+        if end is None:
+            return []
+
+        text, self.buffer = self.buffer[:end], self.buffer[end:]
+        return self.merge(SENTENCE_END_PATTERN.split(text))
+
+    def flush(self) -> list[str]:
+        """Return the rest of the text, once the stream has ended."""
+        text, self.buffer = self.buffer.split("```")[0], ""
+        sentences = self.merge(SENTENCE_END_PATTERN.split(text))
+        if self.pending:
+            sentences.append(self.pending)
+            self.pending = ""
+        return sentences
+
+    def merge(self, texts: list[str]) -> list[str]:
+        sentences = []
+        for text in texts:
+            text = clean_text(text)
+            if not text:
+                continue
+
+            self.pending = f"{self.pending} {text}" if self.pending else text
+            if (
+                len(self.pending.split()) >= MIN_SENTENCE_WORDS
+                and len(self.pending) >= MIN_SENTENCE_LENGTH
+            ):
+                sentences.append(self.pending)
+                self.pending = ""
+        return sentences
+
+
+class SpeechStream:
+    """
+    Speaks a response sentence by sentence while it is being streamed.
+
+    Up to `concurrency` sentences are synthesized at the same time, and the
+    audio is emitted in order as "chat:speech" events, followed by a final
+    event with `done` once the response has been spoken.
+
+    Text blocks are read from `content_blocks`, the blocks of the response
+    being parsed. A text block removed from it, e.g. because it turned out
+    to start with a <think> tag split across chunks, is not spoken.
+    """
+
+    def __init__(
+        self,
+        synthesize: Callable[[str], Awaitable[tuple[bytes, str]]],
+        event_emitter,
+        concurrency: int,
+        content_blocks: Optional[list[dict]] = None,
+    ):
+        self.synthesize = synthesize
+        self.event_emitter = event_emitter
+        self.content_blocks = content_blocks
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.segmenter = SentenceSegmenter()
+
+        # Text block being spoken and how much of it has been fed
+        self.block: Optional[dict] = None
+        self.position = 0
+
+        self.index = 0
+        self.ended = False
+        self.tasks: set[asyncio.Task] = set()
+        # Synthesis tasks in order, None once the response has ended
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.sender = asyncio.create_task(self.send())
+
+    def feed_block(self, block: dict, end: int):
+        """Speak the text block's content up to `end`."""
+        if block is not self.block:
+            # The rest of the previous block is final
+            self.feed_rest()
+            self.block, self.position = block, 0
+
+        if end > self.position:
+            self.feed(block["content"][self.position : end])
+            self.position = end
+
+    def feed_rest(self):
+        if self.block is None:
+            return
+        if self.content_blocks is not None and not any(
+            block is self.block for block in self.content_blocks
+        ):
+            return
+        self.feed(self.block["content"][self.position :])
+
+    def feed(self, text: str):
+        for sentence in self.segmenter.feed(text):
+            self.add(sentence)
+
+    def add(self, sentence: str):
+        task = asyncio.create_task(self.synthesize_sentence(sentence))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+        self.queue.put_nowait((self.index, sentence, task))
+        self.index += 1
+
+    async def synthesize_sentence(self, sentence: str) -> tuple[bytes, str]:
+        async with self.semaphore:
+            return await self.synthesize(sentence)
+
+    async def send(self):
+        while (item := await self.queue.get()) is not None:
+            index, sentence, task = item
+            try:
+                audio, content_type = await task
+            except Exception as e:
+                log.warning(f"Failed to synthesize speech: {e}")
+                continue
+
+            await self.event_emitter(
+                {
+                    "type": "chat:speech",
+                    "data": {
+                        "index": index,
+                        "text": sentence,
+                        "audio": base64.b64encode(audio).decode("utf-8"),
+                        "content_type": content_type,
+                    },
+                }
+            )
+
+        await self.event_emitter({"type": "chat:speech", "data": {"done": True}})
+
+    def end(self):
+        """Speak the rest of the response, without waiting for it."""
+        if self.ended:
+            return
+        self.ended = True
+
+        self.feed_rest()
+        for sentence in self.segmenter.flush():
+            self.add(sentence)
+        self.queue.put_nowait(None)
+
+    def cancel(self):
+        self.ended = True
+        self.sender.cancel()
+        for task in self.tasks:
+            task.cancel()
+
+    async def close(self):
+        """Wait until the response has been spoken."""
+        self.end()
+        await asyncio.gather(self.sender, *self.tasks, return_exceptions=True)
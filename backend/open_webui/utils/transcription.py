@@ -0,0 +1,118 @@
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+
+from open_webui.config import WHISPER_CHUNK_LENGTH, WHISPER_WORKERS
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["AUDIO"])
+
+SAMPLING_RATE = 16000
+
+
+class WhisperEngine:
+    """
+    Transcribes audio with faster-whisper.
+
+    Models are loaded with `workers` replicas, so that up to `workers`
+    transcriptions run in parallel, from all requests combined. Recordings
+    are split at pauses into chunks of up to `chunk_length` seconds, which
+    are transcribed in parallel. Silence between the chunks is skipped.
+    """
+
+    def __init__(self, workers: int, chunk_length: int):
+        self.workers = workers
+        self.chunk_length = chunk_length
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="whisper"
+        )
+
+    def get_model_kwargs(self) -> dict:
+        return {
+            "num_workers": self.workers,
+            "cpu_threads": max(1, (os.cpu_count() or 1) // self.workers),
+        }
+
+    def split(self, audio) -> list[tuple[int, int]]:
+        """Split the audio at pauses, in (start, end) samples."""
+        from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+        speech = get_speech_timestamps(
+            audio,
+            VadOptions(
+                min_silence_duration_ms=500,
+                max_speech_duration_s=self.chunk_length,
+            ),
+        )
+
+        max_samples = self.chunk_length * SAMPLING_RATE
+        chunks = []
+        for span in speech:
+            if chunks and span["end"] - chunks[-1][0] <= max_samples:
+                chunks[-1] = (chunks[-1][0], span["end"])
+            else:
+                chunks.append((span["start"], span["end"]))
+        return chunks
+
+    def transcribe(self, model, file_path: str) -> Iterator[dict]:
+        """Yield the segments in order, as soon as they are decoded."""
+        from faster_whisper.audio import decode_audio
+
+        audio = decode_audio(file_path, sampling_rate=SAMPLING_RATE)
+        chunks = self.split(audio)
+        log.debug(f"Transcribing {file_path} in {len(chunks)} chunks")
+
+        stopped = threading.Event()
+        queues = [queue.Queue() for _ in chunks]
+        futures = [
+            self.executor.submit(
+                self.transcribe_chunk, model, audio[start:end], start, queue, stopped
+            )
+            for (start, end), queue in zip(chunks, queues)
+        ]
+
+        try:
+            for segments in queues:
+                while (segment := segments.get()) is not None:
+                    if isinstance(segment, Exception):
+                        raise segment
+                    yield segment
+        finally:
+            # The client went away or a chunk failed
+            stopped.set()
+            for future in futures:
+                future.cancel()
+
+    def transcribe_chunk(self, model, audio, start: int, segments, stopped):
+        try:
+            if stopped.is_set():
+                return
+
+            offset = start / SAMPLING_RATE
+            result, info = model.transcribe(audio, beam_size=5)
+            log.debug(
+                "Detected language '%s' with probability %f"
+                % (info.language, info.language_probability)
+            )
+
+            for segment in result:
+                if stopped.is_set():
+                    return
+                segments.put(
+                    {
+                        "start": round(offset + segment.start, 2),
+                        "end": round(offset + segment.end, 2),
+                        "text": segment.text,
+                    }
+                )
+        except Exception as e:
+            segments.put(e)
+        finally:
+            segments.put(None)
+
+
+whisper_engine = WhisperEngine(WHISPER_WORKERS, WHISPER_CHUNK_LENGTH)